@@ -0,0 +1,153 @@
+"""Cache di processo read-through per le tabelle di riferimento.
+
+Attività, location e utenti sono tabelle piccole che cambiano raramente ma
+vengono lette a ogni render di Streamlit e a ogni richiesta API. La prima
+lettura carica la tabella intera (ordinata per nome) e le successive la
+servono dalla memoria finché una scrittura non chiama ``invalida()``; il
+TTL ``config.ANAGRAFICHE_CACHE_TTL`` è solo una rete di sicurezza per le
+scritture fatte da altri processi.
+
+Le righe restituite (``letture.Riga``, leggibili come ``r.nome`` o
+``r["nome"]``) sono condivise tra i chiamanti: vanno trattate in sola
+lettura.
+
+``derivato()`` conserva strutture calcolate dalle righe (indici, mappe per
+l'autenticazione) e le ricalcola solo quando la tabella viene ricaricata.
+"""
+
+import threading
+import time
+
+from sqlalchemy import select
+
+import config
+from db import get_session, Attivita, Location, Utente
+from letture import riga
+
+
+class CacheAnagrafica:
+    """Righe di una tabella di riferimento, con contatori di hit/miss."""
+
+    def __init__(self, modello):
+        self.modello = modello
+        self._lock = threading.Lock()
+        self._righe = None
+        self._caricata = 0.0
+        # Incrementata a ogni invalidazione: un caricamento iniziato prima
+        # di una scrittura non deve sovrascrivere la cache invalidata
+        self._versione = 0
+        self._derivati = {}
+        self.hit = 0
+        self.miss = 0
+        self.invalidazioni = 0
+
+    def leggi(self):
+        return list(self._tupla())
+
+    def _tupla(self):
+        with self._lock:
+            if (
+                self._righe is not None
+                and time.monotonic() - self._caricata < config.ANAGRAFICHE_CACHE_TTL
+            ):
+                self.hit += 1
+                return self._righe
+            self.miss += 1
+            versione = self._versione
+        righe = self._carica()
+        with self._lock:
+            if versione == self._versione:
+                self._righe = righe
+                self._caricata = time.monotonic()
+        return righe
+
+    def derivato(self, nome, costruisci):
+        """``costruisci(righe)``, ricalcolato solo quando le righe cambiano"""
+        righe = self._tupla()
+        with self._lock:
+            voce = self._derivati.get(nome)
+            if voce is not None and voce[0] is righe:
+                return voce[1]
+        valore = costruisci(righe)
+        with self._lock:
+            self._derivati[nome] = (righe, valore)
+        return valore
+
+    def _carica(self):
+        with get_session() as session:
+            query = select(self.modello).order_by(self.modello.nome)
+            return tuple(riga(r) for r in session.scalars(query))
+
+    def invalida(self):
+        with self._lock:
+            self._righe = None
+            self._versione += 1
+            self.invalidazioni += 1
+
+    def statistiche(self):
+        with self._lock:
+            letture = self.hit + self.miss
+            return {
+                "hit": self.hit,
+                "miss": self.miss,
+                "hit_rate": round(self.hit / letture, 3) if letture else None,
+                "invalidazioni": self.invalidazioni,
+                "righe": len(self._righe) if self._righe is not None else None,
+            }
+
+
+_cache = {
+    "attivita": CacheAnagrafica(Attivita),
+    "locations": CacheAnagrafica(Location),
+    "utenti": CacheAnagrafica(Utente),
+}
+TABELLE_CACHE = tuple(_cache)
+
+
+def get_attivita():
+    """Tutte le attività, ordinate per nome"""
+    return _cache["attivita"].leggi()
+
+
+def get_locations():
+    """Tutte le location, ordinate per nome"""
+    return _cache["locations"].leggi()
+
+
+def get_utenti():
+    """Tutti gli utenti, ordinati per nome"""
+    return _cache["utenti"].leggi()
+
+
+def derivato(entita, nome, costruisci):
+    """Struttura ``nome`` calcolata dalle righe in cache di ``entita``"""
+    return _cache[entita].derivato(nome, costruisci)
+
+
+def _indice_email(utenti):
+    return {u.email.lower(): u for u in utenti if u.email}
+
+
+def utente_per_email(email):
+    """Utente con l'email data (senza distinzione di maiuscole), o None"""
+    if not email:
+        return None
+    return derivato("utenti", "per_email", _indice_email).get(email.lower())
+
+
+def invalida(entita=None):
+    """Invalida la cache di ``entita`` (nome tabella), o di tutte se None.
+
+    Le entità che non sono in cache vengono ignorate, così i percorsi di
+    scrittura possono chiamarla per qualunque tabella.
+    """
+    if entita is None:
+        for cache in _cache.values():
+            cache.invalida()
+    elif entita in _cache:
+        _cache[entita].invalida()
+
+
+def statistiche():
+    """Hit, miss, hit rate e invalidazioni per tabella"""
+    return {nome: cache.statistiche() for nome, cache in _cache.items()}
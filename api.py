@@ -6,19 +6,41 @@ from fastapi import (
     Query,
     UploadFile,
     File,
+    Request,
+    Header,
+    Response,
 )
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
-from db import get_session, Utente, Location, Oggetto, Attivita, Nota, LogOperazione
+from sqlalchemy.exc import IntegrityError
+from db import get_session, stato_pool, Utente, Location, Oggetto, Attivita, Nota
 import os
 import csv
 import io
 from fastapi.middleware.cors import CORSMiddleware
 import json
+import asyncio
+import random
+import time
+import config
+from eventi import bus, pubblica_evento, ENTITA_FEED
+from ricerca import cerca, COLONNE_RICERCA
+import statistiche
+import audit
+import anagrafiche
+import letture
+import profilazione
+from crud import aggiorna_riga, cancella_riga
 
 # --- CONFIG ---
 SECRET_KEY = os.environ.get("API_SECRET_KEY", "supersecretkey")
@@ -27,6 +49,8 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 # --- FastAPI setup ---
 app = FastAPI(title="BoxBoard API", version="1.0.0")
+# Prima di dichiarare le rotte: ogni endpoint può essere profilato
+app.router.route_class = profilazione.RottaProfilata
 
 # --- CORS ---
 CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*").split(",")
@@ -38,6 +62,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# --- VINCOLI DEL DATABASE ---
+@app.exception_handler(IntegrityError)
+async def vincolo_violato(request: Request, exc: IntegrityError):
+    # Es. riferimento a una riga inesistente o email duplicata
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Operazione in conflitto con i dati esistenti"},
+    )
+
+
+# --- PROFILAZIONE ---
+def _ruolo_token(request: Request):
+    """Ruolo dichiarato nel token della richiesta, senza leggere il database"""
+    schema, _, token = request.headers.get("authorization", "").partition(" ")
+    if schema.lower() != "bearer":
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("ruolo")
+    except JWTError:
+        return None
+
+
+def _profilazione_richiesta(request: Request):
+    if request.headers.get("x-profila", "").lower() in ("1", "true", "si"):
+        if _ruolo_token(request) == "Coordinatore":
+            return profilazione.Profilazione("richiesta")
+    if config.PROFILAZIONE_ATTIVA and random.random() < config.PROFILAZIONE_CAMPIONE:
+        return profilazione.Profilazione("soglia")
+    return None
+
+
+@app.middleware("http")
+async def profila_richieste(request: Request, call_next):
+    corrente = _profilazione_richiesta(request)
+    if corrente is None:
+        return await call_next(request)
+    contesto = profilazione.profilo_corrente.set(corrente)
+    inizio = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        profilazione.profilo_corrente.reset(contesto)
+    durata_ms = (time.perf_counter() - inizio) * 1000
+    if corrente.eseguito and (
+        corrente.motivo == "richiesta" or durata_ms >= config.PROFILAZIONE_SOGLIA_MS
+    ):
+        id_profilo = await run_in_threadpool(
+            profilazione.archivio.salva,
+            corrente,
+            {
+                "metodo": request.method,
+                "percorso": request.url.path,
+                "query": request.url.query,
+                "stato": response.status_code,
+                "durata_ms": round(durata_ms, 1),
+            },
+        )
+        response.headers["X-Profilo"] = id_profilo
+    return response
+
+
 # --- Password hashing ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -129,6 +215,11 @@ class OggettoOut(BaseModel):
         orm_mode = True
 
 
+class OggettoElenco(OggettoOut):
+    location_nome: Optional[str] = None
+    contenitore_nome: Optional[str] = None
+
+
 class OggettoCreate(BaseModel):
     nome: str
     descrizione: Optional[str] = None
@@ -201,17 +292,31 @@ class NotaUpdate(BaseModel):
 
 class LogOperazioneOut(BaseModel):
     id: int
-    utente_id: int
+    utente_id: Optional[int] = None
     azione: str
     entita: str
     entita_id: Optional[int] = None
     dettagli: Optional[str] = None
     timestamp: datetime
+    utente_nome: Optional[str] = None
 
     class Config:
         orm_mode = True
 
 
+class RisultatoRicerca(BaseModel):
+    entita: str
+    id: int
+    titolo: Optional[str] = None
+    estratto: Optional[str] = None
+    punteggio: float
+
+
+class RicercaOut(BaseModel):
+    totale: int
+    risultati: list[RisultatoRicerca]
+
+
 # --- UTILITY JWT ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -234,9 +339,11 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     user = get_user_by_email(form_data.username)
     if not user:
         raise HTTPException(status_code=400, detail="Email o password non validi")
-    # Per ora la password è hash(email) se non presente
-    if user.password:
-        valid = verify_password(form_data.password, user.password)
+    # Per ora la password è hash(email) se non presente (il modello Utente
+    # non ha ancora una colonna password)
+    password = getattr(user, "password", None)
+    if password:
+        valid = verify_password(form_data.password, password)
     else:
         valid = form_data.password == form_data.username
     if not valid:
@@ -294,11 +401,10 @@ def healthcheck():
 # --- ENDPOINT CRUD UTENTI ---
 @app.get("/utenti", response_model=list[UserOut], tags=["Utenti"])
 def list_utenti(admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        utenti = session.query(Utente).all()
-        return [
-            UserOut(id=u.id, nome=u.nome, email=u.email, ruolo=u.ruolo) for u in utenti
-        ]
+    return [
+        UserOut(id=u.id, nome=u.nome, email=u.email, ruolo=u.ruolo)
+        for u in anagrafiche.get_utenti()
+    ]
 
 
 @app.get("/utenti/{utente_id}", response_model=UserOut, tags=["Utenti"])
@@ -321,6 +427,7 @@ def create_utente(user: UserCreate, admin: Utente = Depends(require_admin)):
         )
         session.add(nuovo)
         session.commit()
+        anagrafiche.invalida("utenti")
         return UserOut(
             id=nuovo.id, nome=nuovo.nome, email=nuovo.email, ruolo=nuovo.ruolo
         )
@@ -330,31 +437,19 @@ def create_utente(user: UserCreate, admin: Utente = Depends(require_admin)):
 def update_utente_api(
     utente_id: int, user: UserUpdate, admin: Utente = Depends(require_admin)
 ):
-    with get_session() as session:
-        u = session.get(Utente, utente_id)
-        if not u:
-            raise HTTPException(404, "Utente non trovato")
-        if user.nome is not None:
-            u.nome = user.nome
-        if user.email is not None:
-            u.email = user.email
-        if user.ruolo is not None:
-            u.ruolo = user.ruolo
-        if user.password is not None:
-            u.password = get_password_hash(user.password)
-        session.commit()
-        return UserOut(id=u.id, nome=u.nome, email=u.email, ruolo=u.ruolo)
+    # Il modello Utente non ha ancora una colonna password: il campo è ignorato
+    valori = user.dict(exclude={"password"}, exclude_none=True)
+    u = aggiorna_riga("utenti", utente_id, valori)
+    if u is None:
+        raise HTTPException(404, "Utente non trovato")
+    return UserOut(id=u["id"], nome=u["nome"], email=u["email"], ruolo=u["ruolo"])
 
 
 @app.delete("/utenti/{utente_id}", tags=["Utenti"])
 def delete_utente_api(utente_id: int, admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        u = session.get(Utente, utente_id)
-        if not u:
-            raise HTTPException(404, "Utente non trovato")
-        session.delete(u)
-        session.commit()
-        return {"detail": "Utente eliminato"}
+    if not cancella_riga("utenti", utente_id):
+        raise HTTPException(404, "Utente non trovato")
+    return {"detail": "Utente eliminato"}
 
 
 # --- CAMBIO PASSWORD PERSONALE ---
@@ -372,28 +467,24 @@ def change_password(
         u = session.get(Utente, current_user.id)
         u.password = get_password_hash(data.new_password)
         session.commit()
+    anagrafiche.invalida("utenti")
     return {"detail": "Password aggiornata"}
 
 
 # --- AGGIORNA PROFILO PERSONALE ---
 @app.put("/me", response_model=UserOut, tags=["Auth"])
 def update_me(user: UserUpdate, current_user: Utente = Depends(get_current_user)):
-    with get_session() as session:
-        u = session.get(Utente, current_user.id)
-        if user.nome is not None:
-            u.nome = user.nome
-        if user.email is not None:
-            u.email = user.email
-        session.commit()
-        return UserOut(id=u.id, nome=u.nome, email=u.email, ruolo=u.ruolo)
+    valori = user.dict(include={"nome", "email"}, exclude_none=True)
+    u = aggiorna_riga("utenti", current_user.id, valori)
+    if u is None:
+        raise HTTPException(404, "Utente non trovato")
+    return UserOut(id=u["id"], nome=u["nome"], email=u["email"], ruolo=u["ruolo"])
 
 
 # --- ENDPOINT CRUD LOCATION ---
 @app.get("/locations", response_model=list[LocationOut], tags=["Location"])
 def list_locations(user: Utente = Depends(get_current_user)):
-    with get_session() as session:
-        locations = session.query(Location).all()
-        return locations
+    return anagrafiche.get_locations()
 
 
 @app.get("/locations/{location_id}", response_model=LocationOut, tags=["Location"])
@@ -414,6 +505,8 @@ def create_location(location: LocationCreate, admin: Utente = Depends(require_ad
         session.add(nuova)
         session.commit()
         session.refresh(nuova)
+        anagrafiche.invalida("locations")
+        pubblica_evento("locations", "create", nuova.id)
         return nuova
 
 
@@ -421,37 +514,32 @@ def create_location(location: LocationCreate, admin: Utente = Depends(require_ad
 def update_location(
     location_id: int, location: LocationUpdate, admin: Utente = Depends(require_admin)
 ):
-    with get_session() as session:
-        loc = session.get(Location, location_id)
-        if not loc:
-            raise HTTPException(404, "Location non trovata")
-        if location.nome is not None:
-            loc.nome = location.nome
-        if location.indirizzo is not None:
-            loc.indirizzo = location.indirizzo
-        if location.note is not None:
-            loc.note = location.note
-        session.commit()
-        return loc
+    aggiornato = aggiorna_riga(
+        "locations", location_id, location.dict(exclude_none=True)
+    )
+    if aggiornato is None:
+        raise HTTPException(404, "Location non trovata")
+    return aggiornato
 
 
 @app.delete("/locations/{location_id}", tags=["Location"])
 def delete_location(location_id: int, admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        loc = session.get(Location, location_id)
-        if not loc:
-            raise HTTPException(404, "Location non trovata")
-        session.delete(loc)
-        session.commit()
-        return {"detail": "Location eliminata"}
+    if not cancella_riga("locations", location_id):
+        raise HTTPException(404, "Location non trovata")
+    return {"detail": "Location eliminata"}
 
 
 # --- ENDPOINT CRUD OGGETTI ---
-@app.get("/oggetti", response_model=list[OggettoOut], tags=["Oggetti"])
-def list_oggetti(user: Utente = Depends(get_current_user)):
-    with get_session() as session:
-        oggetti = session.query(Oggetto).all()
-        return oggetti
+@app.get("/oggetti", response_model=list[OggettoElenco], tags=["Oggetti"])
+def list_oggetti(
+    location_id: Optional[int] = None,
+    stato: Optional[str] = None,
+    tipo: Optional[str] = None,
+    contenitore_id: Optional[int] = None,
+    user: Utente = Depends(get_current_user),
+):
+    """Oggetti con nomi di location e contenitore, filtrati in SQL"""
+    return letture.oggetti(location_id, stato, tipo, contenitore_id)
 
 
 @app.get("/oggetti/{oggetto_id}", response_model=OggettoOut, tags=["Oggetti"])
@@ -478,6 +566,7 @@ def create_oggetto(oggetto: OggettoCreate, admin: Utente = Depends(require_admin
         session.add(nuovo)
         session.commit()
         session.refresh(nuovo)
+        pubblica_evento("oggetti", "create", nuovo.id)
         return nuovo
 
 
@@ -485,45 +574,23 @@ def create_oggetto(oggetto: OggettoCreate, admin: Utente = Depends(require_admin
 def update_oggetto(
     oggetto_id: int, oggetto: OggettoUpdate, admin: Utente = Depends(require_admin)
 ):
-    with get_session() as session:
-        obj = session.get(Oggetto, oggetto_id)
-        if not obj:
-            raise HTTPException(404, "Oggetto non trovato")
-        if oggetto.nome is not None:
-            obj.nome = oggetto.nome
-        if oggetto.descrizione is not None:
-            obj.descrizione = oggetto.descrizione
-        if oggetto.stato is not None:
-            obj.stato = oggetto.stato
-        if oggetto.tipo is not None:
-            obj.tipo = oggetto.tipo
-        if oggetto.location_id is not None:
-            obj.location_id = oggetto.location_id
-        if oggetto.contenitore_id is not None:
-            obj.contenitore_id = oggetto.contenitore_id
-        if oggetto.data_rilevamento is not None:
-            obj.data_rilevamento = oggetto.data_rilevamento
-        session.commit()
-        return obj
+    aggiornato = aggiorna_riga("oggetti", oggetto_id, oggetto.dict(exclude_none=True))
+    if aggiornato is None:
+        raise HTTPException(404, "Oggetto non trovato")
+    return aggiornato
 
 
 @app.delete("/oggetti/{oggetto_id}", tags=["Oggetti"])
 def delete_oggetto(oggetto_id: int, admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        obj = session.get(Oggetto, oggetto_id)
-        if not obj:
-            raise HTTPException(404, "Oggetto non trovato")
-        session.delete(obj)
-        session.commit()
-        return {"detail": "Oggetto eliminato"}
+    if not cancella_riga("oggetti", oggetto_id):
+        raise HTTPException(404, "Oggetto non trovato")
+    return {"detail": "Oggetto eliminato"}
 
 
 # --- ENDPOINT CRUD ATTIVITA ---
 @app.get("/attivita", response_model=list[AttivitaOut], tags=["Attivita"])
 def list_attivita(user: Utente = Depends(get_current_user)):
-    with get_session() as session:
-        attivita = session.query(Attivita).all()
-        return attivita
+    return anagrafiche.get_attivita()
 
 
 @app.get("/attivita/{attivita_id}", response_model=AttivitaOut, tags=["Attivita"])
@@ -542,6 +609,7 @@ def create_attivita(attivita: AttivitaCreate, admin: Utente = Depends(require_ad
         session.add(nuova)
         session.commit()
         session.refresh(nuova)
+        anagrafiche.invalida("attivita")
         return nuova
 
 
@@ -549,27 +617,19 @@ def create_attivita(attivita: AttivitaCreate, admin: Utente = Depends(require_ad
 def update_attivita(
     attivita_id: int, attivita: AttivitaUpdate, admin: Utente = Depends(require_admin)
 ):
-    with get_session() as session:
-        att = session.get(Attivita, attivita_id)
-        if not att:
-            raise HTTPException(404, "Attività non trovata")
-        if attivita.nome is not None:
-            att.nome = attivita.nome
-        if attivita.descrizione is not None:
-            att.descrizione = attivita.descrizione
-        session.commit()
-        return att
+    aggiornato = aggiorna_riga(
+        "attivita", attivita_id, attivita.dict(exclude_none=True)
+    )
+    if aggiornato is None:
+        raise HTTPException(404, "Attività non trovata")
+    return aggiornato
 
 
 @app.delete("/attivita/{attivita_id}", tags=["Attivita"])
 def delete_attivita(attivita_id: int, admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        att = session.get(Attivita, attivita_id)
-        if not att:
-            raise HTTPException(404, "Attività non trovata")
-        session.delete(att)
-        session.commit()
-        return {"detail": "Attività eliminata"}
+    if not cancella_riga("attivita", attivita_id):
+        raise HTTPException(404, "Attività non trovata")
+    return {"detail": "Attività eliminata"}
 
 
 # --- ENDPOINT CRUD NOTE ---
@@ -603,50 +663,227 @@ def create_nota(nota: NotaCreate, admin: Utente = Depends(require_admin)):
         session.add(nuova)
         session.commit()
         session.refresh(nuova)
+        pubblica_evento("note", "create", nuova.id)
         return nuova
 
 
 @app.put("/note/{nota_id}", response_model=NotaOut, tags=["Note"])
 def update_nota(nota_id: int, nota: NotaUpdate, admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        n = session.get(Nota, nota_id)
-        if not n:
-            raise HTTPException(404, "Nota non trovata")
-        if nota.testo is not None:
-            n.testo = nota.testo
-        if nota.oggetto_id is not None:
-            n.oggetto_id = nota.oggetto_id
-        if nota.attivita_id is not None:
-            n.attivita_id = nota.attivita_id
-        if nota.location_id is not None:
-            n.location_id = nota.location_id
-        if nota.autore_id is not None:
-            n.autore_id = nota.autore_id
-        if nota.data is not None:
-            n.data = nota.data
-        session.commit()
-        return n
+    aggiornato = aggiorna_riga("note", nota_id, nota.dict(exclude_none=True))
+    if aggiornato is None:
+        raise HTTPException(404, "Nota non trovata")
+    return aggiornato
 
 
 @app.delete("/note/{nota_id}", tags=["Note"])
 def delete_nota(nota_id: int, admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        n = session.get(Nota, nota_id)
-        if not n:
-            raise HTTPException(404, "Nota non trovata")
-        session.delete(n)
-        session.commit()
-        return {"detail": "Nota eliminata"}
+    if not cancella_riga("note", nota_id):
+        raise HTTPException(404, "Nota non trovata")
+    return {"detail": "Nota eliminata"}
 
 
 # --- ENDPOINT LOG OPERAZIONI (SOLO ADMIN) ---
 @app.get("/log-operazioni", response_model=list[LogOperazioneOut], tags=["Log"])
-def list_log_operazioni(admin: Utente = Depends(require_admin)):
-    with get_session() as session:
-        logs = (
-            session.query(LogOperazione).order_by(LogOperazione.timestamp.desc()).all()
+def list_log_operazioni(
+    response: Response,
+    dal: Optional[datetime] = Query(None, description="Timestamp minimo (incluso)"),
+    al: Optional[datetime] = Query(None, description="Timestamp massimo (escluso)"),
+    utente_id: Optional[int] = None,
+    entita: Optional[str] = None,
+    azione: Optional[str] = None,
+    cursore: Optional[str] = Query(
+        None, description="Valore di X-Next-Cursor della pagina precedente"
+    ),
+    limit: int = Query(100, ge=1, le=1000),
+    includi_archivio: bool = Query(
+        False, description="Cerca anche nei segmenti archiviati su file"
+    ),
+    admin: Utente = Depends(require_admin),
+):
+    try:
+        righe, prossimo = audit.cerca_log(
+            dal=dal,
+            al=al,
+            utente_id=utente_id,
+            entita=entita,
+            azione=azione,
+            cursore=cursore,
+            limit=limit,
+            includi_archivio=includi_archivio,
         )
-        return logs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if prossimo:
+        response.headers["X-Next-Cursor"] = prossimo
+    return righe
+
+
+# --- RICERCA FULL-TEXT ---
+@app.get("/search", response_model=RicercaOut, tags=["Ricerca"])
+def search(
+    q: str = Query(..., min_length=1, description="Testo da cercare"),
+    entita: Optional[str] = Query(
+        None, description="oggetti, note, locations separate da virgola"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    user: Utente = Depends(get_current_user),
+):
+    """Ricerca full-text ordinata per rilevanza su oggetti, note e location"""
+    filtro = None
+    if entita:
+        filtro = [e.strip() for e in entita.split(",") if e.strip()]
+        non_valide = [e for e in filtro if e not in COLONNE_RICERCA]
+        if non_valide:
+            raise HTTPException(400, f"Entità non supportate: {', '.join(non_valide)}")
+    return cerca(q, entita=filtro, limit=limit, offset=offset)
+
+
+# --- STATISTICHE AGGREGATE ---
+@app.get("/stats/conteggi", tags=["Statistiche"])
+def stats_conteggi(user: Utente = Depends(get_current_user)):
+    return statistiche.conteggi_dashboard()
+
+
+@app.get("/stats/oggetti-per-location", tags=["Statistiche"])
+def stats_oggetti_per_location(user: Utente = Depends(get_current_user)):
+    return statistiche.oggetti_per_location()
+
+
+@app.get("/stats/attivita-per-utente", tags=["Statistiche"])
+def stats_attivita_per_utente(user: Utente = Depends(get_current_user)):
+    return statistiche.attivita_per_utente()
+
+
+@app.get("/stats/performance-utenti", tags=["Statistiche"])
+def stats_performance_utenti(user: Utente = Depends(get_current_user)):
+    return statistiche.performance_utenti()
+
+
+@app.get("/stats/andamento-mensile", tags=["Statistiche"])
+def stats_andamento_mensile(
+    mesi: int = Query(12, ge=1, le=120), user: Utente = Depends(get_current_user)
+):
+    return statistiche.andamento_mensile(mesi)
+
+
+@app.get("/stats/contenitori", tags=["Statistiche"])
+def stats_contenitori(
+    limit: int = Query(10, ge=1, le=100), user: Utente = Depends(get_current_user)
+):
+    return statistiche.contenitori_piu_utilizzati(limit)
+
+
+@app.get("/stats/oggetti-movimentati", tags=["Statistiche"])
+def stats_oggetti_movimentati(
+    limit: int = Query(5, ge=1, le=100), user: Utente = Depends(get_current_user)
+):
+    return statistiche.oggetti_piu_movimentati(limit)
+
+
+@app.get("/stats/attivita-urgenti", tags=["Statistiche"])
+def stats_attivita_urgenti(
+    giorni: int = Query(3, ge=0, le=365),
+    limit: int = Query(10, ge=1, le=100),
+    user: Utente = Depends(get_current_user),
+):
+    return statistiche.attivita_urgenti(giorni, limit)
+
+
+@app.get("/stats/cache", tags=["Statistiche"])
+def stats_cache(admin: Utente = Depends(require_admin)):
+    """Hit rate della cache di attività, location e utenti"""
+    return anagrafiche.statistiche()
+
+
+@app.get("/stats/pool", tags=["Statistiche"])
+def stats_pool(admin: Utente = Depends(require_admin)):
+    """Connessioni del pool del database in uso in questo processo"""
+    return stato_pool()
+
+
+@app.get("/profili", tags=["Profilazione"])
+def list_profili(admin: Utente = Depends(require_admin)):
+    """Profili delle richieste lente conservati, dal più recente"""
+    return profilazione.archivio.elenco()
+
+
+@app.get("/profili/{id_profilo}", tags=["Profilazione"])
+def get_profilo(
+    id_profilo: str,
+    formato: str = Query("prof", enum=["prof", "testo"]),
+    righe: int = Query(50, ge=1, le=1000),
+    admin: Utente = Depends(require_admin),
+):
+    """File ``pstats`` del profilo, o il riepilogo testuale con ``formato=testo``"""
+    if formato == "testo":
+        testo = profilazione.archivio.testo(id_profilo, righe)
+        if testo is None:
+            raise HTTPException(404, "Profilo non trovato")
+        return PlainTextResponse(testo)
+    percorso = profilazione.archivio.file(id_profilo)
+    if percorso is None:
+        raise HTTPException(404, "Profilo non trovato")
+    return FileResponse(
+        percorso,
+        media_type="application/octet-stream",
+        filename=f"{id_profilo}.prof",
+    )
+
+
+# --- CHANGE FEED (SSE) ---
+def formatta_sse(evento):
+    """Serializza un evento nel formato text/event-stream"""
+    righe = []
+    if evento.get("id") is not None:
+        righe.append(f"id: {evento['id']}")
+    righe.append(f"event: {evento['azione']}")
+    righe.append(f"data: {json.dumps(evento)}")
+    return "\n".join(righe) + "\n\n"
+
+
+@app.get("/eventi", tags=["Eventi"])
+async def stream_eventi(
+    request: Request,
+    entita: Optional[str] = Query(
+        None, description="Entità separate da virgola (default: tutte)"
+    ),
+    dal_id: Optional[int] = Query(None, description="Riprendi dopo questo id"),
+    last_event_id: Optional[int] = Header(None),
+    user: Utente = Depends(get_current_user),
+):
+    """Stream SSE degli eventi create/update/delete.
+
+    Un evento ``reset`` indica che alcuni eventi sono andati persi (client
+    lento o resume troppo vecchio): il client deve rileggere i dati.
+    """
+    richieste = ENTITA_FEED
+    if entita:
+        richieste = tuple(e.strip() for e in entita.split(",") if e.strip())
+        non_valide = [e for e in richieste if e not in ENTITA_FEED]
+        if non_valide:
+            raise HTTPException(400, f"Entità non supportate: {', '.join(non_valide)}")
+    # Il browser si riconnette inviando Last-Event-ID
+    riparti_da = dal_id if dal_id is not None else last_event_id
+    sott = bus.sottoscrivi(richieste, riparti_da, loop=asyncio.get_running_loop())
+
+    async def genera():
+        try:
+            yield f"retry: {config.EVENTI_KEEPALIVE_SEC * 1000}\n\n"
+            while not await request.is_disconnected():
+                eventi = await bus.attendi(sott, config.EVENTI_KEEPALIVE_SEC)
+                if not eventi:
+                    yield ": keepalive\n\n"
+                for evento in eventi:
+                    yield formatta_sse(evento)
+        finally:
+            bus.annulla(sott)
+
+    return StreamingResponse(
+        genera(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # --- ENDPOINT EXPORT DATI (SOLO ADMIN) ---
@@ -702,7 +939,7 @@ def export_data(
         else:
             raise HTTPException(400, "Entità non supportata")
         if formato == "json":
-            return [{{col: getattr(row, col) for col in columns}} for row in data]
+            return [{col: getattr(row, col) for col in columns} for row in data]
         elif formato == "csv":
             output = to_csv(data, columns)
             return StreamingResponse(
@@ -792,4 +1029,7 @@ def import_bulk(
         else:
             raise HTTPException(400, "Entità non supportata")
         session.commit()
+    # Un solo evento per l'intero import: i client rileggono l'entità
+    anagrafiche.invalida(entita)
+    pubblica_evento(entita, "import")
     return {"detail": f"Importati/aggiornati {count} record in {entita}"}
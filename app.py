@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import warnings
 import hashlib
+import functools
 
 warnings.filterwarnings("ignore")
 from db import (
@@ -14,28 +15,39 @@ from db import (
     OggettoAttivita,
     Nota,
     LogOperazione,
-    test_db_connection,
+    bootstrap_schema,
 )
+import config
+import statistiche
+import anagrafiche
+import audit
+import cruscotto
+import prestazioni
+import letture
 from crud import add_utente, add_location, add_oggetto, add_attivita, add_oggetto_attivita, add_nota, log_operazione, update_utente, delete_utente, update_location, delete_location, update_oggetto, delete_oggetto, update_attivita, delete_attivita, update_oggetto_attivita, delete_oggetto_attivita, update_nota, delete_nota
-# --- CONTROLLO TABELLE E POPOLAMENTO AUTOMATICO ---
-try:
-    with get_session() as session:
-        utenti_count = session.query(Utente).count()
-    if utenti_count == 0:
-        test_db_connection()
-        from mock_data import popola_mock
-        popola_mock()
-except Exception:
-    # Se la tabella non esiste, crea tutto e popola
-    test_db_connection()
-    from mock_data import popola_mock
-    popola_mock()
-# --- FINE CONTROLLO ---
+from mock_data import popola_mock
+
+
+# --- BOOTSTRAP DELLO SCHEMA (una volta per processo) ---
+@st.cache_resource(show_spinner=False)
+def bootstrap_database():
+    """Crea o aggiorna lo schema e popola un database nuovo con i dati di esempio.
+
+    In cache di risorsa: i rerun successivi non toccano il database, e i
+    riavvii successivi confrontano solo la riga ``versione_schema``.
+    """
+    return bootstrap_schema(popola=popola_mock)
+
+
+bootstrap_database()
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import streamlit_authenticator as stauth
 import yaml
 from yaml.loader import SafeLoader
 from streamlit_components.crud_browser import st_crud_browser
+from streamlit_components.tabella_paginata import st_tabella_paginata
+from streamlit_components.selettore import st_selettore
+from streamlit_components.pannello_prestazioni import st_pannello_prestazioni
 import os
 from authlib.integrations.requests_client import OAuth2Session
 import requests
@@ -52,55 +64,101 @@ st.set_page_config(
 
 
 def get_utenti():
-    """Recupera tutti gli utenti"""
-    with get_session() as session:
-        return session.query(Utente).order_by(Utente.nome).all()
+    """Recupera tutti gli utenti (cache di processo, vedi anagrafiche.py)"""
+    return anagrafiche.get_utenti()
 
 
 def get_locations():
-    """Recupera tutte le location"""
-    with get_session() as session:
-        return session.query(Location).order_by(Location.nome).all()
-
-
-def get_oggetti(location_id=None, stato=None, tipo=None):
-    """Recupera oggetti con filtri opzionali"""
-    with get_session() as session:
-        query = session.query(Oggetto)
-        if location_id:
-            query = query.filter(Oggetto.location_id == location_id)
-        if stato:
-            query = query.filter(Oggetto.stato == stato)
-        if tipo:
-            query = query.filter(Oggetto.tipo == tipo)
-        return query.order_by(Oggetto.nome).all()
+    """Recupera tutte le location (cache di processo)"""
+    return anagrafiche.get_locations()
 
 
 def get_attivita():
-    """Recupera tutte le attività"""
-    with get_session() as session:
-        return session.query(Attivita).order_by(Attivita.nome).all()
+    """Recupera tutte le attività (cache di processo)"""
+    return anagrafiche.get_attivita()
 
 
+@st.cache_data(ttl=config.UI_CACHE_TTL, show_spinner=False)
 def get_oggetto_attivita():
-    """Recupera tutte le assegnazioni oggetto-attività"""
-    with get_session() as session:
-        return (
-            session.query(OggettoAttivita).order_by(OggettoAttivita.data_prevista).all()
-        )
+    """Recupera tutte le assegnazioni oggetto-attività (in cache)"""
+    return letture.oggetto_attivita()
+
+
+@st.cache_data(ttl=config.UI_CACHE_TTL, show_spinner=False)
+def get_pagina(entita, filtri, ordina, discendente, limit, dopo):
+    """Una pagina di ``entita`` (vedi letture.pagina), in cache"""
+    return letture.pagina(entita, filtri, ordina, discendente, limit, dopo)
+
+
+@st.cache_data(ttl=config.UI_CACHE_TTL, show_spinner=False)
+def get_totale(entita, filtri):
+    """Numero di righe di ``entita`` con i filtri dati, in cache"""
+    return letture.conta(entita, filtri)
+
+
+def tabella_paginata(entita, colonne, filtri=None, ordina="id", etichette=None):
+    """Tabella di ``entita`` letta dal server una pagina alla volta"""
+    return st_tabella_paginata(
+        f"tabella_{entita}",
+        lambda o, d, n, dopo: get_pagina(entita, filtri, o, d, n, dopo),
+        lambda: get_totale(entita, filtri),
+        colonne,
+        ordina=ordina,
+        etichette=etichette,
+        filtri=filtri,
+    )
+
+
+@st.cache_data(ttl=config.UI_CACHE_TTL, show_spinner=False)
+def cerca_nomi(entita, prefisso, limit, tipo=None):
+    """Righe di ``entita`` il cui nome inizia con ``prefisso``, in cache"""
+    filtri = {"tipo": tipo} if tipo else {}
+    return letture.cerca_per_nome(entita, prefisso, limit, **filtri)
+
+
+def selettore(chiave, entita, etichetta, nessuno=None, tipo=None, formato=None):
+    """Selettore con ricerca per prefisso del nome su ``entita``"""
+    return st_selettore(
+        chiave,
+        etichetta,
+        lambda prefisso, limit: cerca_nomi(entita, prefisso, limit, tipo),
+        formato=formato,
+        nessuno=nessuno,
+    )
+
 
+def formato_oggetto(obj):
+    return f"{obj['nome']} (ID: {obj['id']})"
 
-def get_note(oggetto_id=None, attivita_id=None, location_id=None):
-    """Recupera note con filtri opzionali"""
-    with get_session() as session:
-        query = session.query(Nota)
-        if oggetto_id:
-            query = query.filter(Nota.oggetto_id == oggetto_id)
-        if attivita_id:
-            query = query.filter(Nota.attivita_id == attivita_id)
-        if location_id:
-            query = query.filter(Nota.location_id == location_id)
-        return query.order_by(Nota.data).all()
+
+@st.cache_resource
+def get_istantanea_dashboard():
+    """Istantanea della Dashboard condivisa da tutte le sessioni del processo"""
+    cruscotto.istantanea.avvia()
+    return cruscotto.istantanea
+
+
+def mostra_eta(aggiornato_il):
+    """Didascalia con l'età dei dati di un widget"""
+    if aggiornato_il is None:
+        st.caption("Dati non disponibili")
+        return
+    secondi = int((datetime.now() - aggiornato_il).total_seconds())
+    st.caption(f"🕒 Aggiornato {secondi} s fa ({aggiornato_il:%H:%M:%S})")
+
+
+def invalida_cache_ui():
+    """Svuota le letture in cache dopo una scrittura fatta dai form.
+
+    Le anagrafiche (utenti, location, attività) sono già invalidate da crud;
+    qui si svuotano le liste in ``st.cache_data``, condivise tra le sessioni.
+    Le scritture fatte da altri processi (API) diventano visibili al più
+    dopo ``config.UI_CACHE_TTL`` secondi.
+    """
+    get_oggetto_attivita.clear()
+    get_pagina.clear()
+    get_totale.clear()
+    cerca_nomi.clear()
 
 
 # === INTERFACCIA UTENTE ===
@@ -109,16 +167,8 @@ def get_note(oggetto_id=None, attivita_id=None, location_id=None):
 def show_utenti(current_user):
     """Sezione gestione utenti con controllo ruoli"""
     st.header("👥 Gestione Utenti")
-    utenti = get_utenti()
-    if utenti:
-        df = pd.DataFrame(
-            [
-                {"id": u.id, "nome": u.nome, "ruolo": u.ruolo, "email": u.email}
-                for u in utenti
-            ]
-        )
-        st.subheader("Utenti Registrati")
-        st.dataframe(df, use_container_width=True)
+    st.subheader("Utenti Registrati")
+    tabella_paginata("utenti", ["id", "nome", "ruolo", "email"], ordina="nome")
 
     # Solo admin (Coordinatore) può aggiungere/modificare/cancellare
     if current_user and current_user.ruolo == "Coordinatore":
@@ -133,16 +183,20 @@ def show_utenti(current_user):
             if st.form_submit_button("Aggiungi Utente"):
                 if nome:
                     add_utente(nome, ruolo, email if email else None, current_user.id)
+                    invalida_cache_ui()
                     st.success(f"Utente '{nome}' aggiunto con successo!")
                     st.rerun()
                 else:
                     st.error("Il nome è obbligatorio!")
         st.subheader("Modifica/Cancella Utente")
-        utente_nomi = [f"{u.nome} ({u.email})" for u in utenti]
-        selected_idx = st.selectbox(
-            "Seleziona utente", range(len(utenti)), format_func=lambda x: utente_nomi[x]
+        utente_sel = selettore(
+            "sel_utente_modifica",
+            "utenti",
+            "Seleziona utente",
+            formato=lambda u: f"{u['nome']} ({u['email']})",
         )
-        utente_sel = utenti[selected_idx]
+        if utente_sel is None:
+            return
         with st.form("modifica_utente"):
             col1, col2 = st.columns(2)
             with col1:
@@ -164,6 +218,7 @@ def show_utenti(current_user):
                     email=nuova_email,
                     current_user_id=current_user.id,
                 )
+                invalida_cache_ui()
                 st.success("Utente aggiornato!")
                 st.rerun()
             if st.form_submit_button("Elimina Utente"):
@@ -171,6 +226,7 @@ def show_utenti(current_user):
                     st.error("Non puoi eliminare te stesso!")
                 else:
                     delete_utente(utente_sel.id, current_user.id)
+                    invalida_cache_ui()
                     st.success("Utente eliminato!")
                     st.rerun()
     else:
@@ -182,11 +238,10 @@ def show_locations():
     st.header("📍 Gestione Location")
 
     # Visualizzazione location esistenti
-    locations = get_locations()
-    if locations:
-        df = pd.DataFrame(locations)
-        st.subheader("Location Registrate")
-        st.dataframe(df, use_container_width=True)
+    st.subheader("Location Registrate")
+    tabella_paginata(
+        "locations", ["id", "nome", "indirizzo", "note", "data_creazione"], ordina="nome"
+    )
 
     # Form per nuova location
     st.subheader("Aggiungi Nuova Location")
@@ -197,11 +252,8 @@ def show_locations():
 
         if st.form_submit_button("Aggiungi Location"):
             if nome:
-                # result = execute_query(query, (nome, indirizzo, note))  # TODO: Convertire a ORM
-                location = Location(nome=nome, indirizzo=indirizzo, note=note)
-                with get_session() as session:
-                    session.add(location)
-                    session.commit()
+                if add_location(nome, indirizzo, note):
+                    invalida_cache_ui()
                     st.success(f"Location '{nome}' aggiunta con successo!")
                     st.rerun()
             else:
@@ -215,14 +267,11 @@ def show_oggetti():
     # Filtri
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        locations = get_locations()
-        location_options = {0: "Tutte le location"}
-        if locations:
-            location_options.update({loc["id"]: loc["nome"] for loc in locations})
-        selected_location = st.selectbox(
+        location_filtro = selettore(
+            "sel_oggetti_location",
+            "locations",
             "Filtra per Location",
-            options=list(location_options.keys()),
-            format_func=lambda x: location_options[x],
+            nessuno="Tutte le location",
         )
 
     with col2:
@@ -241,59 +290,54 @@ def show_oggetti():
         selected_tipo = st.selectbox("Filtra per Tipo", tipi)
 
     with col4:
-        contenitori = get_contenitori()
-        contenitore_options = {0: "Tutti i contenitori"}
-        if contenitori:
-            contenitore_options.update(
-                {cont["id"]: cont["nome"] for cont in contenitori}
-            )
-        selected_contenitore = st.selectbox(
+        contenitore_filtro = selettore(
+            "sel_oggetti_contenitore",
+            "oggetti",
             "Filtra per Contenitore",
-            options=list(contenitore_options.keys()),
-            format_func=lambda x: contenitore_options[x],
+            nessuno="Tutti i contenitori",
+            tipo="contenitore",
         )
 
-    # Applica filtri
-    location_filter = selected_location if selected_location != 0 else None
-    stato_filter = selected_stato if selected_stato != "Tutti" else None
-    tipo_filter = selected_tipo if selected_tipo != "Tutti" else None
+    # Applica filtri (tutti in SQL, solo la pagina visibile viene letta)
+    filtri = {
+        "location_id": location_filtro["id"] if location_filtro else None,
+        "stato": selected_stato if selected_stato != "Tutti" else None,
+        "tipo": selected_tipo if selected_tipo != "Tutti" else None,
+        "contenitore_id": contenitore_filtro["id"] if contenitore_filtro else None,
+    }
 
     # Visualizzazione oggetti
-    oggetti = get_oggetti(location_filter, stato_filter, tipo_filter)
-
-    if selected_contenitore != 0:
-        # Mostra solo oggetti nel contenitore selezionato
-        oggetti = [
-            obj for obj in oggetti if obj.get("contenitore_id") == selected_contenitore
-        ]
-
-    if oggetti:
-        df = pd.DataFrame(oggetti)
-        # Riordina colonne per visualizzazione
-        cols = [
-            "id",
-            "nome",
-            "tipo",
-            "stato",
-            "location_nome",
-            "contenitore_nome",
-            "data_rilevamento",
-        ]
-        df_display = df[[col for col in cols if col in df.columns]]
-        st.subheader(f"Oggetti Trovati ({len(oggetti)})")
-        st.dataframe(df_display, use_container_width=True)
-
+    st.subheader("Oggetti Trovati")
+    cols = [
+        "id",
+        "nome",
+        "tipo",
+        "stato",
+        "location_nome",
+        "contenitore_nome",
+        "data_rilevamento",
+    ]
+    if tabella_paginata("oggetti", cols, filtri=filtri, ordina="nome"):
         # Mostra gerarchia contenitori
-        if selected_contenitore != 0:
+        if contenitore_filtro:
             st.subheader("🗂️ Contenuto del Contenitore")
-            contenitore_info = next(
-                (c for c in contenitori if c["id"] == selected_contenitore), None
-            )
-            if contenitore_info:
-                st.info(f"Contenitore: **{contenitore_info['nome']}**")
+            st.info(f"Contenitore: **{contenitore_filtro['nome']}**")
 
-    # Form per nuovo oggetto
+    # Form per nuovo oggetto (i selettori con ricerca stanno fuori dal form)
     st.subheader("Aggiungi Nuovo Oggetto")
+    col1, col2 = st.columns(2)
+    with col1:
+        location_sel = selettore(
+            "sel_nuovo_oggetto_location", "locations", "Location", nessuno="Nessuna"
+        )
+    with col2:
+        contenitore_sel = selettore(
+            "sel_nuovo_oggetto_contenitore",
+            "oggetti",
+            "Contenitore (solo per tipo oggetto)",
+            nessuno="Nessuno",
+            tipo="contenitore",
+        )
     with st.form("nuovo_oggetto"):
         col1, col2 = st.columns(2)
         with col1:
@@ -305,46 +349,19 @@ def show_oggetti():
             )
 
         with col2:
-            # Location
-            location_id = None
-            if locations:
-                location_names = ["Nessuna"] + [loc["nome"] for loc in locations]
-                selected_loc = st.selectbox("Location", location_names)
-                if selected_loc != "Nessuna":
-                    location_id = next(
-                        loc["id"] for loc in locations if loc["nome"] == selected_loc
-                    )
-
-            # Contenitore (solo se tipo è 'oggetto')
-            contenitore_id = None
-            if tipo == "oggetto" and contenitori:
-                contenitore_names = ["Nessuno"] + [cont["nome"] for cont in contenitori]
-                selected_cont = st.selectbox("Contenitore", contenitore_names)
-                if selected_cont != "Nessuno":
-                    contenitore_id = next(
-                        cont["id"]
-                        for cont in contenitori
-                        if cont["nome"] == selected_cont
-                    )
-
-        descrizione = st.text_area("Descrizione")
+            descrizione = st.text_area("Descrizione")
 
         if st.form_submit_button("Aggiungi Oggetto"):
+            location_id = location_sel["id"] if location_sel else None
+            # Contenitore solo se tipo è 'oggetto'
+            contenitore_id = (
+                contenitore_sel["id"] if contenitore_sel and tipo == "oggetto" else None
+            )
             if nome:
-                # result = execute_query(
-                #     query, (nome, descrizione, stato, tipo, location_id, contenitore_id)
-                # )  # TODO: Convertire a ORM
-                oggetto = Oggetto(
-                    nome=nome,
-                    descrizione=descrizione,
-                    stato=stato,
-                    tipo=tipo,
-                    location_id=location_id,
-                    contenitore_id=contenitore_id,
-                )
-                with get_session() as session:
-                    session.add(oggetto)
-                    session.commit()
+                if add_oggetto(
+                    nome, descrizione, stato, tipo, location_id, contenitore_id
+                ):
+                    invalida_cache_ui()
                     st.success(f"Oggetto '{nome}' aggiunto con successo!")
                     st.rerun()
             else:
@@ -360,7 +377,7 @@ def show_attivita():
     if attivita:
         df = pd.DataFrame(attivita)
         st.subheader("Attività Disponibili")
-        st.dataframe(df, use_container_width=True)
+        prestazioni.mostra(st.dataframe, df, use_container_width=True)
 
     # Form per nuova attività
     st.subheader("Aggiungi Nuova Attività")
@@ -370,11 +387,8 @@ def show_attivita():
 
         if st.form_submit_button("Aggiungi Attività"):
             if nome:
-                # result = execute_query(query, (nome, descrizione))  # TODO: Convertire a ORM
-                attivita = Attivita(nome=nome, descrizione=descrizione)
-                with get_session() as session:
-                    session.add(attivita)
-                    session.commit()
+                if add_attivita(nome, descrizione):
+                    invalida_cache_ui()
                     st.success(f"Attività '{nome}' aggiunta con successo!")
                     st.rerun()
             else:
@@ -382,20 +396,24 @@ def show_attivita():
 
     # Assegnazione attività agli oggetti
     st.subheader("Assegnazione Attività")
-    oggetti = get_oggetti()
-    utenti = get_utenti()
 
-    if oggetti and attivita:
+    if attivita:
+        # Selettori con ricerca fuori dal form, così si aggiornano mentre si digita
+        col1, col2 = st.columns(2)
+        with col1:
+            oggetto_sel = selettore(
+                "sel_assegna_oggetto",
+                "oggetti",
+                "Seleziona Oggetto",
+                formato=formato_oggetto,
+            )
+        with col2:
+            utente_sel = selettore(
+                "sel_assegna_utente", "utenti", "Assegna a", nessuno="Nessuno"
+            )
         with st.form("assegna_attivita"):
             col1, col2 = st.columns(2)
             with col1:
-                oggetto_names = [f"{obj['nome']} (ID: {obj['id']})" for obj in oggetti]
-                selected_obj = st.selectbox(
-                    "Seleziona Oggetto",
-                    range(len(oggetti)),
-                    format_func=lambda x: oggetto_names[x],
-                )
-
                 attivita_names = [att["nome"] for att in attivita]
                 selected_att = st.selectbox(
                     "Seleziona Attività",
@@ -406,34 +424,16 @@ def show_attivita():
             with col2:
                 data_prevista = st.date_input("Data Prevista")
 
-                utente_names = (
-                    ["Nessuno"] + [utente["nome"] for utente in utenti]
-                    if utenti
-                    else ["Nessuno"]
-                )
-                selected_utente = st.selectbox("Assegna a", utente_names)
-
             if st.form_submit_button("Assegna Attività"):
-                oggetto_id = oggetti[selected_obj]["id"]
                 attivita_id = attivita[selected_att]["id"]
-                utente_id = None
-                if selected_utente != "Nessuno" and utenti:
-                    utente_id = next(
-                        u["id"] for u in utenti if u["nome"] == selected_utente
-                    )
-
-                # result = execute_query(
-                #     query, (oggetto_id, attivita_id, data_prevista, utente_id)
-                # )  # TODO: Convertire a ORM
-                oa = OggettoAttivita(
-                    oggetto_id=oggetto_id,
-                    attivita_id=attivita_id,
-                    data_prevista=data_prevista,
-                    assegnato_a=utente_id,
-                )
-                with get_session() as session:
-                    session.add(oa)
-                    session.commit()
+                utente_id = utente_sel["id"] if utente_sel else None
+
+                if oggetto_sel is None:
+                    st.error("Seleziona un oggetto!")
+                elif add_oggetto_attivita(
+                    oggetto_sel["id"], attivita_id, data_prevista, utente_id
+                ):
+                    invalida_cache_ui()
                     st.success("Attività assegnata con successo!")
                     st.rerun()
 
@@ -442,7 +442,7 @@ def show_attivita():
     if assegnazioni:
         st.subheader("Attività Assegnate")
         df = pd.DataFrame(assegnazioni)
-        st.dataframe(df, use_container_width=True)
+        prestazioni.mostra(st.dataframe, df, use_container_width=True)
 
         # Opzione per completare attività
         st.subheader("Completa Attività")
@@ -461,11 +461,10 @@ def show_attivita():
 
                 if st.form_submit_button("Completa Attività"):
                     attivita_id = attivita_incomplete[selected_idx]["id"]
-                    # result = execute_query(query, (attivita_id,))  # TODO: Convertire a ORM
-                    query = "UPDATE oggetto_attivita SET completata = TRUE, data_completamento = CURRENT_DATE WHERE id = %s"
-                    with get_session() as session:
-                        session.execute(query, (attivita_id,))
-                        session.commit()
+                    update_oggetto_attivita(
+                        attivita_id, completata=True, data_completamento=date.today()
+                    )
+                    invalida_cache_ui()
                     st.success("Attività completata!")
                     st.rerun()
 
@@ -477,12 +476,13 @@ def show_note():
     # Filtri per visualizzazione note
     col1, col2, col3 = st.columns(3)
     with col1:
-        oggetti = get_oggetti()
-        if oggetti:
-            oggetto_options = ["Tutti gli oggetti"] + [
-                f"{obj['nome']} (ID: {obj['id']})" for obj in oggetti
-            ]
-            selected_obj = st.selectbox("Filtra per Oggetto", oggetto_options)
+        oggetto_filtro = selettore(
+            "sel_note_oggetto",
+            "oggetti",
+            "Filtra per Oggetto",
+            nessuno="Tutti gli oggetti",
+            formato=formato_oggetto,
+        )
 
     with col2:
         attivita = get_attivita()
@@ -491,104 +491,88 @@ def show_note():
             selected_att = st.selectbox("Filtra per Attività", attivita_options)
 
     with col3:
-        locations = get_locations()
-        if locations:
-            location_options = ["Tutte le location"] + [
-                loc["nome"] for loc in locations
-            ]
-            selected_loc = st.selectbox("Filtra per Location", location_options)
+        location_filtro = selettore(
+            "sel_note_location",
+            "locations",
+            "Filtra per Location",
+            nessuno="Tutte le location",
+        )
 
     # Applica filtri
-    oggetto_filter = None
+    oggetto_filter = oggetto_filtro["id"] if oggetto_filtro else None
     attivita_filter = None
-    location_filter = None
-
-    if oggetti and selected_obj != "Tutti gli oggetti":
-        obj_idx = oggetto_options.index(selected_obj) - 1
-        oggetto_filter = oggetti[obj_idx]["id"]
+    location_filter = location_filtro["id"] if location_filtro else None
 
     if attivita and selected_att != "Tutte le attività":
         att_idx = attivita_options.index(selected_att) - 1
         attivita_filter = attivita[att_idx]["id"]
 
-    if locations and selected_loc != "Tutte le location":
-        loc_idx = location_options.index(selected_loc) - 1
-        location_filter = locations[loc_idx]["id"]
-
     # Visualizzazione note
-    note = get_note(oggetto_filter, attivita_filter, location_filter)
-    if note:
-        st.subheader("Note Esistenti")
-        df = pd.DataFrame(note)
-        cols = [
-            "id",
-            "testo",
-            "oggetto_nome",
-            "attivita_nome",
-            "location_nome",
-            "autore_nome",
-            "data",
-        ]
-        df_display = df[[col for col in cols if col in df.columns]]
-        st.dataframe(df_display, use_container_width=True)
+    st.subheader("Note Esistenti")
+    cols = [
+        "id",
+        "testo",
+        "oggetto_nome",
+        "attivita_nome",
+        "location_nome",
+        "autore_nome",
+        "data",
+    ]
+    filtri = {
+        "oggetto_id": oggetto_filter,
+        "attivita_id": attivita_filter,
+        "location_id": location_filter,
+    }
+    tabella_paginata("note", cols, filtri=filtri, ordina="data")
 
     # Form per nuova nota
     st.subheader("Aggiungi Nuova Nota")
-    utenti = get_utenti()
 
-    with st.form("nuova_nota"):
-        testo = st.text_area("Testo della Nota*")
+    # Associazione e autore fuori dal form: i selettori con ricerca si
+    # aggiornano solo con i rerun, che dentro un form non partono
+    col1, col2 = st.columns(2)
+    with col1:
+        # Selezione tipo di associazione
+        tipo_associazione = st.selectbox(
+            "Associa a:", ["Nessuno", "Oggetto", "Attività", "Location"]
+        )
 
-        col1, col2 = st.columns(2)
-        with col1:
-            # Selezione tipo di associazione
-            tipo_associazione = st.selectbox(
-                "Associa a:", ["Nessuno", "Oggetto", "Attività", "Location"]
+        associazione_id = None
+        if tipo_associazione == "Oggetto":
+            oggetto_sel = selettore(
+                "sel_nota_oggetto",
+                "oggetti",
+                "Seleziona Oggetto",
+                formato=formato_oggetto,
             )
+            if oggetto_sel:
+                associazione_id = ("oggetto", oggetto_sel["id"])
+
+        elif tipo_associazione == "Attività" and attivita:
+            att_names = [att["nome"] for att in attivita]
+            selected_att_idx = st.selectbox(
+                "Seleziona Attività",
+                range(len(attivita)),
+                format_func=lambda x: att_names[x],
+            )
+            associazione_id = ("attivita", attivita[selected_att_idx]["id"])
 
-            associazione_id = None
-            if tipo_associazione == "Oggetto" and oggetti:
-                obj_names = [f"{obj['nome']} (ID: {obj['id']})" for obj in oggetti]
-                selected_obj_idx = st.selectbox(
-                    "Seleziona Oggetto",
-                    range(len(oggetti)),
-                    format_func=lambda x: obj_names[x],
-                )
-                associazione_id = ("oggetto", oggetti[selected_obj_idx]["id"])
+        elif tipo_associazione == "Location":
+            location_sel = selettore(
+                "sel_nota_location", "locations", "Seleziona Location"
+            )
+            if location_sel:
+                associazione_id = ("location", location_sel["id"])
 
-            elif tipo_associazione == "Attività" and attivita:
-                att_names = [att["nome"] for att in attivita]
-                selected_att_idx = st.selectbox(
-                    "Seleziona Attività",
-                    range(len(attivita)),
-                    format_func=lambda x: att_names[x],
-                )
-                associazione_id = ("attivita", attivita[selected_att_idx]["id"])
-
-            elif tipo_associazione == "Location" and locations:
-                loc_names = [loc["nome"] for loc in locations]
-                selected_loc_idx = st.selectbox(
-                    "Seleziona Location",
-                    range(len(locations)),
-                    format_func=lambda x: loc_names[x],
-                )
-                associazione_id = ("location", locations[selected_loc_idx]["id"])
+    with col2:
+        autore_sel = selettore("sel_nota_autore", "utenti", "Autore", nessuno="Nessuno")
+        autore_id = autore_sel["id"] if autore_sel else None
 
-        with col2:
-            autore_id = None
-            if utenti:
-                autore_names = ["Nessuno"] + [utente["nome"] for utente in utenti]
-                selected_autore = st.selectbox("Autore", autore_names)
-                if selected_autore != "Nessuno":
-                    autore_id = next(
-                        u["id"] for u in utenti if u["nome"] == selected_autore
-                    )
+    with st.form("nuova_nota"):
+        testo = st.text_area("Testo della Nota*")
 
         if st.form_submit_button("Aggiungi Nota"):
             if testo:
-                # result = execute_query(
-                #     query, (testo, oggetto_id, attivita_id, location_id, autore_id)
-                # )  # TODO: Convertire a ORM
                 oggetto_id = (
                     associazione_id[1]
                     if associazione_id and associazione_id[0] == "oggetto"
@@ -605,16 +589,8 @@ def show_note():
                     else None
                 )
 
-                nota = Nota(
-                    testo=testo,
-                    oggetto_id=oggetto_id,
-                    attivita_id=attivita_id,
-                    location_id=location_id,
-                    autore_id=autore_id,
-                )
-                with get_session() as session:
-                    session.add(nota)
-                    session.commit()
+                if add_nota(testo, oggetto_id, attivita_id, location_id, autore_id):
+                    invalida_cache_ui()
                     st.success("Nota aggiunta con successo!")
                     st.rerun()
             else:
@@ -625,160 +601,87 @@ def show_dashboard():
     """Dashboard con panoramica del sistema"""
     st.header("📊 Dashboard")
 
-    # Statistiche generali
+    # Statistiche generali: quattro COUNT in un'unica query
+    conteggi = statistiche.conteggi_dashboard()
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        # utenti_count = execute_query("SELECT COUNT(*) as count FROM utenti", fetch=True)  # TODO: Convertire a ORM
-        count = len(get_utenti()) if get_utenti() else 0
-        st.metric("👥 Totale Utenti", count)
+        st.metric("👥 Totale Utenti", conteggi["utenti"])
     with col2:
-        # locations_count = execute_query("SELECT COUNT(*) as count FROM locations", fetch=True)  # TODO: Convertire a ORM
-        count = len(get_locations()) if get_locations() else 0
-        st.metric("📍 Totale Location", count)
+        st.metric("📍 Totale Location", conteggi["locations"])
     with col3:
-        # oggetti_count = execute_query("SELECT COUNT(*) as count FROM oggetti", fetch=True)  # TODO: Convertire a ORM
-        count = len(get_oggetti()) if get_oggetti() else 0
-        st.metric("📦 Totale Oggetti", count)
+        st.metric("📦 Totale Oggetti", conteggi["oggetti"])
     with col4:
-        # attivita_count = execute_query("SELECT COUNT(*) as count FROM oggetto_attivita WHERE completata = FALSE", fetch=True)  # TODO: Convertire a ORM
-        count = len([ass for ass in get_oggetto_attivita() if not ass["completata"]])
-        st.metric("⚡ Attività Pendenti", count)
+        st.metric("⚡ Attività Pendenti", conteggi["attivita_pendenti"])
 
     st.divider()
 
     # --- FILTRI AVANZATI ---
     with st.expander("🔎 Filtri avanzati attività per utente", expanded=True):
         # utenti_lista = execute_query("SELECT nome FROM utenti", fetch=True)  # TODO: Convertire a ORM
-        utenti_nomi = [u["nome"] for u in get_utenti()] if get_utenti() else []
+        utenti_nomi = [u.nome for u in get_utenti()]
         utenti_sel = st.multiselect("Filtra per utente", utenti_nomi)
         stato_sel = st.multiselect("Stato attività", ["completate", "in_corso"])
         search_txt = st.text_input("Ricerca full-text (nome utente, attività)")
 
+    istantanea = get_istantanea_dashboard()
+
     # Attività per utente
     st.subheader("📋 Attività per Utente")
-    query = """
-    SELECT u.nome, 
-           COUNT(oa.id) as totale_attivita,
-           SUM(CASE WHEN oa.completata = TRUE THEN 1 ELSE 0 END) as completate,
-           SUM(CASE WHEN oa.completata = FALSE THEN 1 ELSE 0 END) as in_corso
-    FROM utenti u
-    LEFT JOIN oggetto_attivita oa ON u.id = oa.assegnato_a
-    GROUP BY u.id, u.nome
-    ORDER BY totale_attivita DESC
-    """
-    # attivita_utenti = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-    attivita_utenti = [
-        {
-            "nome": u["nome"],
-            "totale_attivita": u["totale_attivita"],
-            "completate": u["completate"],
-            "in_corso": u["in_corso"],
-        }
-        for u in get_utenti()
-    ]
-    if utenti_sel:
-        df = pd.DataFrame(attivita_utenti)
-        df = df[df["nome"].isin(utenti_sel)]
-        if stato_sel:
-            if "completate" in stato_sel and "in_corso" not in stato_sel:
-                df = df[df["completate"] > 0]
-            elif "in_corso" in stato_sel and "completate" not in stato_sel:
-                df = df[df["in_corso"] > 0]
-        if search_txt:
-            mask = df["nome"].str.contains(search_txt, case=False)
-            df = df[mask]
-        st.dataframe(df, use_container_width=True)
+    attivita_utenti, aggiornato_il = istantanea.leggi("attivita_per_utente")
+    mostra_eta(aggiornato_il)
+    # Sezione mai calcolata (errore del database): la didascalia lo segnala
+    if utenti_sel and attivita_utenti is not None:
+        df = cruscotto.filtra_attivita_per_utente(
+            attivita_utenti, utenti_sel, stato_sel, search_txt
+        )
+        if df.empty:
+            st.info("Nessuna attività per i filtri scelti.")
+        else:
+            prestazioni.mostra(st.dataframe, df, use_container_width=True)
 
     # --- WIDGET AGGIUNTIVI E RESPONSIVE ---
     st.divider()
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("⏰ Attività Urgenti (entro 3 giorni)")
-        query = """
-        SELECT o.nome as oggetto, a.nome as attivita, u.nome as assegnato_a, oa.data_prevista, DATEDIFF(oa.data_prevista, CURDATE()) as giorni_rimanenti
-        FROM oggetto_attivita oa
-        JOIN oggetti o ON oa.oggetto_id = o.id
-        JOIN attivita a ON oa.attivita_id = a.id
-        LEFT JOIN utenti u ON oa.assegnato_a = u.id
-        WHERE oa.completata = FALSE AND oa.data_prevista IS NOT NULL AND DATEDIFF(oa.data_prevista, CURDATE()) <= 3
-        ORDER BY oa.data_prevista ASC
-        LIMIT 10
-        """
-        # urgenti = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-        urgenti = [
-            {
-                "oggetto": u["oggetto"],
-                "attivita": u["attivita"],
-                "assegnato_a": u["assegnato_a"],
-                "data_prevista": u["data_prevista"],
-                "giorni_rimanenti": u["giorni_rimanenti"],
-            }
-            for u in get_oggetto_attivita()
-            if not u["completata"] and u["data_prevista"] and u["data_prevista"] >= datetime.now().date()
-        ]
+        urgenti, aggiornato_il = istantanea.leggi("attivita_urgenti")
+        mostra_eta(aggiornato_il)
         if urgenti:
             df = pd.DataFrame(urgenti)
             df["countdown"] = df["giorni_rimanenti"].apply(
                 lambda x: f"{x} giorni" if x >= 0 else "Scaduta"
             )
-            st.dataframe(
+            prestazioni.mostra(
+                st.dataframe,
                 df[
                     ["oggetto", "attivita", "assegnato_a", "data_prevista", "countdown"]
                 ],
                 use_container_width=True,
             )
-        else:
+        elif urgenti is not None:
             st.info("Nessuna attività urgente.")
     with col2:
         st.subheader("📦 Oggetti più movimentati (top 5)")
-        query = """
-        SELECT o.nome, COUNT(oa.id) as movimenti
-        FROM oggetti o
-        JOIN oggetto_attivita oa ON o.id = oa.oggetto_id
-        GROUP BY o.id, o.nome
-        ORDER BY movimenti DESC
-        LIMIT 5
-        """
-        # movimentati = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-        movimentati = [
-            {
-                "nome": u["nome"],
-                "movimenti": u["movimenti"],
-            }
-            for u in get_oggetti()
-        ]
+        movimentati, aggiornato_il = istantanea.leggi("oggetti_piu_movimentati")
+        mostra_eta(aggiornato_il)
         if movimentati:
             df = pd.DataFrame(movimentati)
-            st.bar_chart(df.set_index("nome")["movimenti"])
-            st.dataframe(df, use_container_width=True)
-        else:
+            prestazioni.mostra(st.bar_chart, df.set_index("nome")["movimenti"])
+            prestazioni.mostra(st.dataframe, df, use_container_width=True)
+        elif movimentati is not None:
             st.info("Nessun oggetto movimentato.")
 
     with st.expander("📝 Storico modifiche recenti", expanded=False):
-        query = """
-        SELECT l.id, u.nome as utente, l.azione, l.entita, l.entita_id, l.dettagli, l.timestamp
-        FROM log_operazione l
-        LEFT JOIN utenti u ON l.utente_id = u.id
-        ORDER BY l.timestamp DESC
-        LIMIT 20
-        """
-        # logs = execute_query(query, fetch=True)  # TODO: Convertire a ORM
+        log_recenti, aggiornato_il = istantanea.leggi("log_recenti")
+        mostra_eta(aggiornato_il)
         logs = [
-            {
-                "id": log["id"],
-                "utente": log["utente"],
-                "azione": log["azione"],
-                "entita": log["entita"],
-                "entita_id": log["entita_id"],
-                "dettagli": log["dettagli"],
-                "timestamp": log["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
-            }
-            for log in get_log_operazioni()
+            {**log, "timestamp": log["timestamp"].strftime("%Y-%m-%d %H:%M:%S")}
+            for log in log_recenti or []
         ]
         if logs:
             df = pd.DataFrame(logs)
-            st.dataframe(df, use_container_width=True)
-        else:
+            prestazioni.mostra(st.dataframe, df, use_container_width=True)
+        elif log_recenti is not None:
             st.info("Nessuna modifica recente.")
 
 
@@ -788,170 +691,127 @@ def show_statistiche():
 
     # Oggetti per location
     st.subheader("📍 Oggetti per Location")
-    query = """
-    SELECT l.nome as location, 
-           COUNT(o.id) as totale_oggetti,
-           SUM(CASE WHEN o.tipo = 'contenitore' THEN 1 ELSE 0 END) as contenitori,
-           SUM(CASE WHEN o.tipo = 'oggetto' THEN 1 ELSE 0 END) as oggetti_semplici
-    FROM locations l
-    LEFT JOIN oggetti o ON l.id = o.location_id
-    GROUP BY l.id, l.nome
-    ORDER BY totale_oggetti DESC
-    """
-    # oggetti_location = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-    oggetti_location = [
-        {
-            "location": u["location"],
-            "totale_oggetti": u["totale_oggetti"],
-            "contenitori": u["contenitori"],
-            "oggetti_semplici": u["oggetti_semplici"],
-        }
-        for u in get_locations()
-    ]
+    oggetti_location = statistiche.oggetti_per_location()
 
     if oggetti_location:
         df = pd.DataFrame(oggetti_location)
-        st.dataframe(df, use_container_width=True)
+        prestazioni.mostra(st.dataframe, df, use_container_width=True)
 
         # Grafico a barre
-        st.bar_chart(df.set_index("location")["totale_oggetti"])
+        prestazioni.mostra(st.bar_chart, df.set_index("location")["totale_oggetti"])
 
     # Statistiche temporali
     st.subheader("📅 Andamento Temporale")
+    andamento = statistiche.andamento_mensile(mesi=12)
 
     col1, col2 = st.columns(2)
 
     with col1:
         st.write("**Oggetti Rilevati per Mese**")
-        query = """
-        SELECT DATE_FORMAT(data_rilevamento, '%Y-%m') as mese, COUNT(*) as count
-        FROM oggetti
-        WHERE data_rilevamento >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-        GROUP BY DATE_FORMAT(data_rilevamento, '%Y-%m')
-        ORDER BY mese
-        """
-        # rilevamenti_mese = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-        rilevamenti_mese = [
-            {
-                "mese": u["mese"],
-                "count": u["count"],
-            }
-            for u in get_oggetti()
-            if u["data_rilevamento"] >= datetime.now().date() - timedelta(days=365)
-        ]
+        rilevamenti_mese = andamento["rilevamenti"]
 
         if rilevamenti_mese:
             df = pd.DataFrame(rilevamenti_mese)
-            st.line_chart(df.set_index("mese"))
+            prestazioni.mostra(st.line_chart, df.set_index("mese"))
 
     with col2:
         st.write("**Attività Completate per Mese**")
-        query = """
-        SELECT DATE_FORMAT(data_completamento, '%Y-%m') as mese, COUNT(*) as count
-        FROM oggetto_attivita
-        WHERE completata = TRUE AND data_completamento >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-        GROUP BY DATE_FORMAT(data_completamento, '%Y-%m')
-        ORDER BY mese
-        """
-        # completamenti_mese = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-        completamenti_mese = [
-            {
-                "mese": u["mese"],
-                "count": u["count"],
-            }
-            for u in get_oggetto_attivita()
-            if u["completata"] and u["data_completamento"] >= datetime.now().date() - timedelta(days=365)
-        ]
+        completamenti_mese = andamento["completamenti"]
 
         if completamenti_mese:
             df = pd.DataFrame(completamenti_mese)
-            st.line_chart(df.set_index("mese"))
+            prestazioni.mostra(st.line_chart, df.set_index("mese"))
 
     # Performance utenti
     st.subheader("🏆 Performance Utenti")
-    query = """
-    SELECT u.nome,
-           COUNT(oa.id) as attivita_assegnate,
-           SUM(CASE WHEN oa.completata = TRUE THEN 1 ELSE 0 END) as completate,
-           ROUND(
-               (SUM(CASE WHEN oa.completata = TRUE THEN 1 ELSE 0 END) * 100.0 / 
-                NULLIF(COUNT(oa.id), 0)), 2
-           ) as percentuale_completamento,
-           AVG(DATEDIFF(oa.data_completamento, oa.data_prevista)) as ritardo_medio_giorni
-    FROM utenti u
-    LEFT JOIN oggetto_attivita oa ON u.id = oa.assegnato_a
-    GROUP BY u.id, u.nome
-    HAVING attivita_assegnate > 0
-    ORDER BY percentuale_completamento DESC
-    """
-    # performance = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-    performance = [
-        {
-            "nome": u["nome"],
-            "attivita_assegnate": u["attivita_assegnate"],
-            "completate": u["completate"],
-            "percentuale_completamento": u["percentuale_completamento"],
-            "ritardo_medio_giorni": u["ritardo_medio_giorni"],
-        }
-        for u in get_utenti()
-    ]
+    performance = statistiche.performance_utenti()
 
     if performance:
         df = pd.DataFrame(performance)
-        st.dataframe(df, use_container_width=True)
+        prestazioni.mostra(st.dataframe, df, use_container_width=True)
 
     # Contenitori più utilizzati
     st.subheader("📦 Contenitori più Utilizzati")
-    query = """
-    SELECT c.nome as contenitore, COUNT(o.id) as oggetti_contenuti
-    FROM oggetti c
-    JOIN oggetti o ON c.id = o.contenitore_id
-    WHERE c.tipo = 'contenitore'
-    GROUP BY c.id, c.nome
-    ORDER BY oggetti_contenuti DESC
-    LIMIT 10
-    """
-    # contenitori_utilizzati = execute_query(query, fetch=True)  # TODO: Convertire a ORM
-    contenitori_utilizzati = [
-        {
-            "contenitore": u["contenitore"],
-            "oggetti_contenuti": u["oggetti_contenuti"],
-        }
-        for u in get_oggetti()
-        if u["tipo"] == "contenitore"
-    ]
+    contenitori_utilizzati = statistiche.contenitori_piu_utilizzati(limit=10)
 
     if contenitori_utilizzati:
         df = pd.DataFrame(contenitori_utilizzati)
-        st.dataframe(df, use_container_width=True)
-        st.bar_chart(df.set_index("contenitore"))
+        prestazioni.mostra(st.dataframe, df, use_container_width=True)
+        prestazioni.mostra(st.bar_chart, df.set_index("contenitore"))
 
 
 def show_log_operazioni():
     st.header("📝 Log Operazioni")
-    with get_session() as session:
-        logs = (
-            session.query(LogOperazione)
-            .order_by(LogOperazione.timestamp.desc())
-            .limit(100)
-            .all()
+    # Una query per pagina (autore in join, vedi audit.cerca_log) più la
+    # ricerca per prefisso del selettore utente
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        utente = selettore("sel_log_utente", "utenti", "Utente", nessuno="Tutti")
+        utente_id = utente["id"] if utente else None
+    with col2:
+        azione = st.selectbox(
+            "Azione",
+            [None] + audit.AZIONI_LOG,
+            format_func=lambda a: "Tutte" if a is None else a,
+            key="log_azione",
         )
-        if logs:
-            data = [
-                {
-                    "id": log.id,
-                    "utente": log.utente.nome if log.utente else "",
-                    "azione": log.azione,
-                    "entita": log.entita,
-                    "entita_id": log.entita_id,
-                    "dettagli": log.dettagli,
-                    "timestamp": log.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-                for log in logs
-            ]
-            st.dataframe(data, use_container_width=True)
-        else:
-            st.info("Nessuna operazione registrata.")
+    with col3:
+        entita = st.text_input("Entità", key="log_entita").strip() or None
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        dal = st.date_input("Dal", value=None, key="log_dal")
+    with col2:
+        al = st.date_input("Al (incluso)", value=None, key="log_al")
+    with col3:
+        limit = st.selectbox("Righe per pagina", (50, 100, 200, 500), key="log_limit")
+
+    filtri = {
+        "utente_id": utente_id,
+        "azione": azione,
+        "entita": entita,
+        "dal": datetime.combine(dal, datetime.min.time()) if dal else None,
+        "al": datetime.combine(al + timedelta(days=1), datetime.min.time()) if al else None,
+    }
+    # Pila dei cursori keyset delle pagine viste; nuovi filtri ripartono da capo
+    firma = (repr(filtri), limit)
+    if st.session_state.get("log_firma") != firma:
+        st.session_state["log_firma"] = firma
+        st.session_state["log_cursori"] = [None]
+    cursori = st.session_state["log_cursori"]
+
+    try:
+        logs, prossimo = audit.cerca_log(cursore=cursori[-1], limit=limit, **filtri)
+    except SQLAlchemyError as e:
+        st.error(f"Errore lettura log: {e}")
+        return
+    if logs:
+        data = [
+            {
+                "id": log["id"],
+                "utente": log["utente_nome"] or "",
+                "azione": log["azione"],
+                "entita": log["entita"],
+                "entita_id": log["entita_id"],
+                "dettagli": log["dettagli"],
+                "timestamp": log["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for log in logs
+        ]
+        prestazioni.mostra(st.dataframe, data, use_container_width=True)
+    else:
+        st.info("Nessuna operazione registrata.")
+
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        if st.button("◀ Più recenti", key="log_prec", disabled=len(cursori) == 1):
+            cursori.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Pagina {len(cursori)}")
+    with col3:
+        if st.button("Più vecchie ▶", key="log_succ", disabled=prossimo is None):
+            cursori.append(prossimo)
+            st.rerun()
 
 
 # === MAIN APP ===
@@ -1022,17 +882,22 @@ def main():
 
 
 # --- AUTENTICAZIONE ---
-def get_users_for_auth():
-    """Recupera utenti dal DB e li formatta per streamlit-authenticator"""
-    utenti = get_utenti()
+@functools.lru_cache(maxsize=4096)
+def _hash_password(password):
+    # bcrypt costa decine di millisecondi: ogni password è cifrata una volta
+    # per processo, anche quando la mappa delle credenziali viene ricostruita
+    return password if stauth.Hasher.is_hash(password) else stauth.Hasher.hash(password)
+
+
+def _credenziali_auth(utenti):
     users = {"usernames": {}}
     for u in utenti:
-        users["usernames"][u.email] = {
+        if not u.email:
+            continue
+        users["usernames"][u.email.lower()] = {
             "name": u.nome,
-            "password": (
-                u.password
-                if hasattr(u, "password") and u.password
-                else hashlib.sha256(u.email.encode()).hexdigest()
+            "password": _hash_password(
+                u.get("password") or hashlib.sha256(u.email.encode()).hexdigest()
             ),
             "email": u.email,
             "ruolo": u.ruolo,
@@ -1040,11 +905,26 @@ def get_users_for_auth():
     return users
 
 
+def get_users_for_auth():
+    """Credenziali per streamlit-authenticator, già cifrate con bcrypt.
+
+    La mappa è calcolata una volta dalla cache degli utenti e ricostruita
+    solo quando gli utenti cambiano (vedi ``anagrafiche.derivato``).
+    """
+    return anagrafiche.derivato("utenti", "credenziali_auth", _credenziali_auth)
+
+
 users = get_users_for_auth()
 
-# Configurazione autenticazione (può essere estesa per ruoli, ecc.)
+# Configurazione autenticazione (può essere estesa per ruoli, ecc.).
+# Le password sono già cifrate: auto_hash le ricifrerebbe a ogni rerun.
+# Il dict esterno è una copia perché Authenticate riassegna "usernames"
 authenticator = stauth.Authenticate(
-    users, "boxboard_cookie", "boxboard_auth_key", cookie_expiry_days=7
+    {"usernames": users["usernames"]},
+    "boxboard_cookie",
+    "boxboard_auth_key",
+    cookie_expiry_days=7,
+    auto_hash=False,
 )
 
 # --- LOGIN UI ---
@@ -1098,15 +978,19 @@ elif login_method == "Classico":
             authenticator.logout("Logout")
         st.sidebar.success(f"Autenticato come {name}")
         
-        utenti = get_utenti()
-        for u in utenti:
-            if u.email == username:
-                current_user = u
-                break
-        
-        st.session_state["user_email"] = current_user.email
-        st.session_state["user_nome"] = current_user.nome
-        st.session_state["user_ruolo"] = current_user.ruolo
+        current_user = anagrafiche.utente_per_email(username)
+        if current_user is None:
+            # Utente creato o modificato da un altro processo (o dalle API)
+            # dopo il caricamento della cache: rilegge gli utenti una volta
+            anagrafiche.invalida("utenti")
+            current_user = anagrafiche.utente_per_email(username)
+        if current_user is None:
+            st.error(f"Utente {username} non trovato: accesso annullato")
+            authenticator.logout(location="unrendered")
+        else:
+            st.session_state["user_email"] = current_user.email
+            st.session_state["user_nome"] = current_user.nome
+            st.session_state["user_ruolo"] = current_user.ruolo
 
 # --- ROUTING SOLO SE AUTENTICATO ---
 if current_user:
@@ -1129,22 +1013,28 @@ if current_user:
         )
         page = menu_options[selected]
         
-        if page == "utenti":
-            show_utenti(current_user)
-        elif page == "dashboard":
-            show_dashboard()
-        elif page == "locations":
-            show_locations()
-        elif page == "oggetti":
-            show_oggetti()
-        elif page == "attivita":
-            show_attivita()
-        elif page == "note":
-            show_note()
-        elif page == "statistiche":
-            show_statistiche()
-        elif page == "log":
-            show_log_operazioni()
+        # Tempo, query SQL e DataFrame del render (vedi prestazioni.py)
+        with prestazioni.misura(page) as misura:
+            if page == "utenti":
+                show_utenti(current_user)
+            elif page == "dashboard":
+                show_dashboard()
+            elif page == "locations":
+                show_locations()
+            elif page == "oggetti":
+                show_oggetti()
+            elif page == "attivita":
+                show_attivita()
+            elif page == "note":
+                show_note()
+            elif page == "statistiche":
+                show_statistiche()
+            elif page == "log":
+                show_log_operazioni()
+        if current_user and current_user.ruolo == "Coordinatore":
+            st_pannello_prestazioni(
+                misura, prestazioni.storico(page), prestazioni.riepilogo()
+            )
         
         st.sidebar.markdown("---")
         st.sidebar.markdown("**Sistema Svuotacantine v1.0**")
@@ -1222,30 +1112,13 @@ def login_google_authlib():
                 utenti = get_utenti()
                 utente = next((u for u in utenti if u.email == email), None)
                 if not utente:
-                    with get_session() as session:
-                        nuovo = Utente(
-                            nome=nome or email.split("@")[0],
-                            email=email,
-                            ruolo="Operatore",
-                        )
-                        session.add(nuovo)
-                        session.commit()
-                        utente = nuovo
+                    nuovo_id = add_utente(
+                        nome or email.split("@")[0], "Operatore", email
+                    )
+                    utente = next((u for u in get_utenti() if u.id == nuovo_id), None)
                 return utente
         return None
 
 
 if __name__ == "__main__":
-    try:
-        with get_session() as session:
-            utenti_count = session.query(Utente).count()
-        if utenti_count == 0:
-            test_db_connection()
-            from mock_data import popola_mock
-            popola_mock()
-    except Exception:
-        # Se la tabella non esiste, crea tutto e popola
-        test_db_connection()
-        from mock_data import popola_mock
-        popola_mock()
     main()
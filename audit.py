@@ -0,0 +1,419 @@
+"""Consultazione, retention e archiviazione del log operazioni.
+
+Il log è letto con paginazione keyset su ``(timestamp, id)`` discendente,
+servita dall'indice ``ix_log_operazioni_timestamp_id``. Le righe più vecchie
+di N giorni possono essere spostate in segmenti NDJSON compressi (gzip)
+nella cartella ``config.AUDIT_ARCHIVIO_DIR``; il nome di ogni segmento
+contiene l'intervallo temporale coperto, così la consultazione apre solo i
+segmenti che possono contenere righe utili.
+
+Le nuove righe sono scritte da ``ScrittoreAudit``: una coda limitata in
+memoria svuotata a batch da un thread in background, così ogni operazione
+registrata non costa una transazione in più.
+
+Uso da riga di comando (es. da cron):
+
+    python audit.py archivia --giorni 180
+"""
+
+import argparse
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+
+import config
+import anagrafiche
+from db import get_session, LogOperazione, Utente
+
+CAMPI_LOG = [
+    "id",
+    "utente_id",
+    "azione",
+    "entita",
+    "entita_id",
+    "dettagli",
+    "timestamp",
+]
+# Azioni scritte da crud.log_operazione (filtro della pagina Log Operazioni)
+AZIONI_LOG = ["create", "update", "delete"]
+_FORMATO_NOME = "%Y%m%dT%H%M%S%f"
+
+
+# --- CURSORE KEYSET ---
+def codifica_cursore(riga):
+    return f"{riga['timestamp'].isoformat()}_{riga['id']}"
+
+
+def decodifica_cursore(cursore):
+    try:
+        ts, id_ = cursore.rsplit("_", 1)
+        return datetime.fromisoformat(ts), int(id_)
+    except (ValueError, AttributeError):
+        raise ValueError(f"Cursore non valido: {cursore}")
+
+
+def _riga_dict(log):
+    return {campo: getattr(log, campo) for campo in CAMPI_LOG}
+
+
+def _nomi_utenti(utenti):
+    return {u.id: u.nome for u in utenti}
+
+
+def _passa_filtri(riga, dal, al, utente_id, entita, azione, dopo):
+    ts = riga["timestamp"]
+    if dal and ts < dal:
+        return False
+    if al and ts >= al:
+        return False
+    if utente_id is not None and riga["utente_id"] != utente_id:
+        return False
+    if entita and riga["entita"] != entita:
+        return False
+    if azione and riga["azione"] != azione:
+        return False
+    if dopo and (ts, riga["id"]) >= dopo:
+        return False
+    return True
+
+
+# --- CONSULTAZIONE ---
+def query_log(
+    dal=None, al=None, utente_id=None, entita=None, azione=None, dopo=None, limit=100
+):
+    """Pagina del log con l'autore in join, dal più recente"""
+    query = select(LogOperazione, Utente.nome).outerjoin(
+        Utente, LogOperazione.utente_id == Utente.id
+    )
+    if dal:
+        query = query.where(LogOperazione.timestamp >= dal)
+    if al:
+        query = query.where(LogOperazione.timestamp < al)
+    if utente_id is not None:
+        query = query.where(LogOperazione.utente_id == utente_id)
+    if entita:
+        query = query.where(LogOperazione.entita == entita)
+    if azione:
+        query = query.where(LogOperazione.azione == azione)
+    if dopo:
+        ts, id_ = dopo
+        # Il limite "timestamp <= ts", ridondante, fa partire la lettura
+        # dell'indice dal cursore: con il solo OR SQLite lo scorre dall'inizio
+        query = query.where(
+            LogOperazione.timestamp <= ts,
+            or_(
+                LogOperazione.timestamp < ts,
+                and_(LogOperazione.timestamp == ts, LogOperazione.id < id_),
+            ),
+        )
+    query = query.order_by(
+        LogOperazione.timestamp.desc(), LogOperazione.id.desc()
+    ).limit(limit)
+    return query
+
+
+def cerca_log(
+    dal=None,
+    al=None,
+    utente_id=None,
+    entita=None,
+    azione=None,
+    cursore=None,
+    limit=100,
+    includi_archivio=False,
+):
+    """Restituisce ``(righe, prossimo_cursore)`` in ordine dal più recente.
+
+    ``dal`` è incluso, ``al`` escluso. ``prossimo_cursore`` è None quando
+    non ci sono altre pagine. Ogni riga ha anche ``utente_nome``, letto con
+    una join nella stessa query (per le righe d'archivio dalla cache utenti).
+    """
+    dopo = decodifica_cursore(cursore) if cursore else None
+    query = query_log(dal, al, utente_id, entita, azione, dopo, limit + 1)
+    with get_session() as session:
+        righe = [
+            dict(_riga_dict(log), utente_nome=nome)
+            for log, nome in session.execute(query)
+        ]
+
+    if includi_archivio:
+        filtri = (dal, al, utente_id, entita, azione, dopo)
+        righe = _unisci(righe, _leggi_archivio(filtri, limit + 1), limit + 1)
+        nomi = anagrafiche.derivato("utenti", "nomi_per_id", _nomi_utenti)
+        for riga in righe:
+            if "utente_nome" not in riga:
+                riga["utente_nome"] = nomi.get(riga["utente_id"])
+
+    prossimo = codifica_cursore(righe[limit - 1]) if len(righe) > limit else None
+    return righe[:limit], prossimo
+
+
+def _unisci(live, archivio, n):
+    visti = set()
+    unite = []
+    for riga in sorted(
+        live + archivio, key=lambda r: (r["timestamp"], r["id"]), reverse=True
+    ):
+        # Un segmento scritto prima di un crash può duplicare righe ancora nel DB
+        if riga["id"] in visti:
+            continue
+        visti.add(riga["id"])
+        unite.append(riga)
+        if len(unite) >= n:
+            break
+    return unite
+
+
+# --- ARCHIVIO SU FILE ---
+def _segmenti(directory=None):
+    """Segmenti disponibili come ``(inizio, fine, percorso)``, dal più recente"""
+    directory = directory or config.AUDIT_ARCHIVIO_DIR
+    if not os.path.isdir(directory):
+        return []
+    segmenti = []
+    for nome in os.listdir(directory):
+        if not (nome.startswith("log-") and nome.endswith(".ndjson.gz")):
+            continue
+        try:
+            inizio, fine = nome[len("log-") : -len(".ndjson.gz")].split("-")
+            segmenti.append(
+                (
+                    datetime.strptime(inizio, _FORMATO_NOME),
+                    datetime.strptime(fine.split("_")[0], _FORMATO_NOME),
+                    os.path.join(directory, nome),
+                )
+            )
+        except ValueError:
+            continue
+    return sorted(segmenti, key=lambda s: s[1], reverse=True)
+
+
+def leggi_segmento(percorso):
+    with gzip.open(percorso, "rt", encoding="utf-8") as f:
+        for linea in f:
+            riga = json.loads(linea)
+            riga["timestamp"] = datetime.fromisoformat(riga["timestamp"])
+            yield riga
+
+
+def _leggi_archivio(filtri, n, directory=None):
+    dal, al, utente_id, entita, azione, dopo = filtri
+    trovate = []
+    for inizio, fine, percorso in _segmenti(directory):
+        if dal and fine < dal:
+            continue
+        if (al and inizio >= al) or (dopo and inizio > dopo[0]):
+            continue
+        # Segmenti in ordine di fine decrescente: se ho già n righe più
+        # recenti della fine di questo segmento posso fermarmi
+        if len(trovate) >= n and trovate[n - 1]["timestamp"] > fine:
+            break
+        for riga in leggi_segmento(percorso):
+            if _passa_filtri(riga, dal, al, utente_id, entita, azione, dopo):
+                trovate.append(riga)
+        trovate.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+    return trovate[:n]
+
+
+def _scrivi_segmento(righe, directory):
+    os.makedirs(directory, exist_ok=True)
+    inizio = righe[0]["timestamp"].strftime(_FORMATO_NOME)
+    fine = righe[-1]["timestamp"].strftime(_FORMATO_NOME)
+    percorso = os.path.join(directory, f"log-{inizio}-{fine}.ndjson.gz")
+    n = 1
+    while os.path.exists(percorso):
+        # Stesso intervallo temporale di un segmento esistente: non sovrascrivo
+        percorso = os.path.join(directory, f"log-{inizio}-{fine}_{n}.ndjson.gz")
+        n += 1
+    temporaneo = percorso + ".tmp"
+    with gzip.open(temporaneo, "wt", encoding="utf-8") as f:
+        for riga in righe:
+            f.write(json.dumps(riga, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaneo, percorso)
+    return percorso
+
+
+def archivia_log(giorni=None, directory=None, righe_per_segmento=None):
+    """Sposta nei segmenti NDJSON le righe più vecchie di ``giorni`` giorni.
+
+    Ogni segmento viene scritto su disco prima di cancellare le righe dal
+    database. Restituisce la lista dei segmenti creati.
+    """
+    giorni = giorni if giorni is not None else config.AUDIT_RETENTION_GIORNI
+    directory = directory or config.AUDIT_ARCHIVIO_DIR
+    righe_per_segmento = righe_per_segmento or config.AUDIT_SEGMENTO_RIGHE
+    limite = datetime.utcnow() - timedelta(days=giorni)
+    creati = []
+    while True:
+        with get_session() as session:
+            logs = session.scalars(
+                select(LogOperazione)
+                .where(LogOperazione.timestamp < limite)
+                .order_by(LogOperazione.timestamp, LogOperazione.id)
+                .limit(righe_per_segmento)
+            ).all()
+            if not logs:
+                break
+            righe = [_riga_dict(log) for log in logs]
+            creati.append(_scrivi_segmento(righe, directory))
+            ids = [r["id"] for r in righe]
+            for i in range(0, len(ids), 500):
+                session.execute(
+                    delete(LogOperazione).where(LogOperazione.id.in_(ids[i : i + 500]))
+                )
+            session.commit()
+    return creati
+
+
+# --- SCRITTURA ASINCRONA A BATCH ---
+class _Segnale:
+    """Elemento di controllo in coda: flush (ed eventuale arresto) del writer"""
+
+    def __init__(self, ferma=False):
+        self.ferma = ferma
+        self.evento = threading.Event()
+
+
+class ScrittoreAudit:
+    """Scrive le righe di log a batch da un thread in background.
+
+    Un batch parte quando raggiunge ``batch`` righe o ``intervallo`` secondi
+    dopo la prima riga in attesa. A coda piena la politica ``"attendi"``
+    blocca il chiamante fino a ``attesa_max`` secondi (backpressure) e poi
+    scarta la riga; ``"scarta"`` la scarta subito. Il thread parte alla
+    prima riga registrata.
+    """
+
+    def __init__(
+        self, coda_max=None, batch=None, intervallo=None, politica=None, attesa_max=None
+    ):
+        self.batch = batch or config.AUDIT_BATCH
+        self.intervallo = intervallo or config.AUDIT_INTERVALLO_SEC
+        self.politica = politica or config.AUDIT_POLITICA_CODA
+        self.attesa_max = (
+            attesa_max if attesa_max is not None else config.AUDIT_ATTESA_MAX_SEC
+        )
+        if self.politica not in ("attendi", "scarta"):
+            raise ValueError(f"Politica coda non valida: {self.politica}")
+        self._coda = queue.Queue(maxsize=coda_max or config.AUDIT_CODA_MAX)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._contatori = {"scritte": 0, "scartate": 0, "errori": 0}
+
+    def registra(self, utente_id, azione, entita, entita_id=None, dettagli=None):
+        """Accoda una riga di log; restituisce False se è stata scartata"""
+        riga = {
+            "utente_id": utente_id,
+            "azione": azione,
+            "entita": entita,
+            "entita_id": entita_id,
+            "dettagli": dettagli,
+            # L'ora è quella dell'operazione, non quella della scrittura
+            "timestamp": datetime.utcnow(),
+        }
+        self._avvia()
+        try:
+            if self.politica == "attendi":
+                self._coda.put(riga, timeout=self.attesa_max)
+            else:
+                self._coda.put_nowait(riga)
+            return True
+        except queue.Full:
+            self._conta("scartate", 1)
+            return False
+
+    def flush(self, timeout=None):
+        """Attende che tutte le righe accodate finora siano scritte"""
+        return self._invia(_Segnale(), timeout)
+
+    def chiudi(self, timeout=5):
+        """Scrive le righe in attesa e ferma il thread (chiamato all'uscita)"""
+        return self._invia(_Segnale(ferma=True), timeout)
+
+    def statistiche(self):
+        with self._lock:
+            return dict(self._contatori, in_coda=self._coda.qsize())
+
+    def _invia(self, segnale, timeout):
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        self._coda.put(segnale)
+        return segnale.evento.wait(timeout)
+
+    def _avvia(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._ciclo, name="scrittore-audit", daemon=True
+                )
+                self._thread.start()
+
+    def _conta(self, chiave, n):
+        with self._lock:
+            self._contatori[chiave] += n
+
+    def _ciclo(self):
+        in_attesa = []
+        scadenza = None
+        while True:
+            attesa = None if scadenza is None else max(0, scadenza - time.monotonic())
+            try:
+                elemento = self._coda.get(timeout=attesa)
+            except queue.Empty:
+                elemento = None
+            if isinstance(elemento, _Segnale):
+                self._scrivi(in_attesa)
+                in_attesa, scadenza = [], None
+                elemento.evento.set()
+                if elemento.ferma:
+                    return
+                continue
+            if elemento is not None:
+                in_attesa.append(elemento)
+                if scadenza is None:
+                    scadenza = time.monotonic() + self.intervallo
+            if len(in_attesa) >= self.batch or (
+                scadenza is not None and time.monotonic() >= scadenza
+            ):
+                self._scrivi(in_attesa)
+                in_attesa, scadenza = [], None
+
+    def _scrivi(self, righe):
+        if not righe:
+            return
+        try:
+            with get_session() as session:
+                session.execute(insert(LogOperazione), righe)
+                session.commit()
+            self._conta("scritte", len(righe))
+        except SQLAlchemyError as e:
+            print(f"Errore scrittura log operazioni ({len(righe)} righe perse): {e}")
+            self._conta("errori", len(righe))
+
+
+scrittore = ScrittoreAudit()
+atexit.register(scrittore.chiudi)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retention del log operazioni")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_arch = sub.add_parser("archivia", help="Sposta le righe vecchie su file")
+    p_arch.add_argument("--giorni", type=int, default=config.AUDIT_RETENTION_GIORNI)
+    p_arch.add_argument("--directory", default=config.AUDIT_ARCHIVIO_DIR)
+    args = parser.parse_args()
+    if args.comando == "archivia":
+        segmenti = archivia_log(args.giorni, args.directory)
+        print(f"Creati {len(segmenti)} segmenti in {args.directory}")
@@ -0,0 +1,400 @@
+"""Suite di benchmark di crud, API e letture della Dashboard su SQLite.
+
+Per ogni scala genera (o riusa) un database con ``dati_sintetici``, ne fa
+una copia di lavoro e misura in un processo separato, con ``DB_NAME`` che
+punta alla copia: così ogni modulo (crud, api, letture, statistiche...) usa
+il proprio engine come in produzione e nessuna cache passa da una scala
+all'altra.
+
+Metriche:
+
+- ``crud.*``: operazioni al secondo di add/update/delete singoli e righe al
+  secondo di ``add_many``/``delete_many``;
+- ``api.*``: latenza (mediana e p95, ms) di elenco, dettaglio, export e
+  import via client ASGI in-process (httpx), con un token da Coordinatore;
+- ``dashboard.*``: latenza delle funzioni dietro Dashboard e tabelle di
+  ``app.py`` (conteggi, sezioni dell'istantanea, prima pagina e ricerca per
+  prefisso), senza cache.
+
+    python benchmark.py esegui --scale piccola,media --output risultati.json
+    python benchmark.py confronta baseline.json risultati.json --soglia 0.25
+
+``confronta`` (o ``esegui --baseline``) termina con codice 1 se una metrica
+peggiora oltre la soglia relativa rispetto alla baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import dati_sintetici
+
+SCALE = {
+    "piccola": {
+        "utenti": 20,
+        "locations": 20,
+        "oggetti_per_location": 50,
+        "assegnazioni": 2_000,
+        "note": 1_000,
+        "log": 5_000,
+    },
+    "media": {
+        "utenti": 50,
+        "locations": 200,
+        "oggetti_per_location": 100,
+        "assegnazioni": 40_000,
+        "note": 20_000,
+        "log": 100_000,
+    },
+    "grande": {
+        "utenti": 200,
+        "locations": 1_000,
+        "oggetti_per_location": 200,
+        "assegnazioni": 400_000,
+        "note": 200_000,
+        "log": 1_000_000,
+    },
+}
+# Data di riferimento fissa: la stessa scala produce sempre lo stesso database
+DATA_RIFERIMENTO = date(2026, 1, 1)
+# Sotto questa differenza assoluta una latenza non conta come regressione
+MIN_DIFFERENZA_MS = 0.5
+
+
+# --- MISURE (processo figlio, DB_NAME già impostato) ---
+def _latenza(tempi):
+    tempi = sorted(tempi)
+    p95 = tempi[min(len(tempi) - 1, round(0.95 * (len(tempi) - 1)))]
+    return {
+        "valore": round(statistics.median(tempi), 3),
+        "p95": round(p95, 3),
+        "unita": "ms",
+        "migliore": "basso",
+    }
+
+
+def _velocita(n, secondi, unita="op/s"):
+    return {"valore": round(n / secondi, 1), "unita": unita, "migliore": "alto"}
+
+
+def _cronometra(funzione, ripetizioni):
+    funzione()  # riscaldamento: cache di SQLite e import pigri
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione()
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return _latenza(tempi)
+
+
+def _durata(funzione):
+    inizio = time.perf_counter()
+    risultato = funzione()
+    return risultato, time.perf_counter() - inizio
+
+
+def misura_crud(operazioni):
+    import crud
+    from db import get_session, Location
+    from sqlalchemy import select
+
+    with get_session() as session:
+        location_id = session.scalars(select(Location.id).limit(1)).first()
+    metriche = {}
+    ids, secondi = _durata(
+        lambda: [
+            crud.add_oggetto(f"Bench {i}", "", "in_attesa", "oggetto", location_id)
+            for i in range(operazioni)
+        ]
+    )
+    metriche["crud.add_oggetto"] = _velocita(operazioni, secondi)
+    _, secondi = _durata(lambda: [crud.update_oggetto(i, stato="venduto") for i in ids])
+    metriche["crud.update_oggetto"] = _velocita(operazioni, secondi)
+    _, secondi = _durata(lambda: [crud.delete_oggetto(i) for i in ids])
+    metriche["crud.delete_oggetto"] = _velocita(operazioni, secondi)
+
+    righe = [
+        {"nome": f"Bulk {i}", "tipo": "oggetto", "location_id": location_id}
+        for i in range(operazioni * 20)
+    ]
+    ids, secondi = _durata(lambda: crud.add_many("oggetti", righe))
+    metriche["crud.add_many"] = _velocita(len(righe), secondi, "righe/s")
+    _, secondi = _durata(lambda: crud.delete_many("oggetti", ids))
+    metriche["crud.delete_many"] = _velocita(len(righe), secondi, "righe/s")
+    return metriche
+
+
+async def _misura_api_async(ripetizioni):
+    import httpx
+
+    import api
+    from db import get_session, Location, Nota, Oggetto, Utente
+    from sqlalchemy import func, select
+
+    with get_session() as session:
+        admin = session.scalars(
+            select(Utente).where(Utente.ruolo == "Coordinatore").limit(1)
+        ).first()
+        location_id = session.scalars(select(Location.id).limit(1)).first()
+        oggetto_id = session.scalar(select(func.max(Oggetto.id))) // 2
+        nota_max = session.scalar(select(func.max(Nota.id))) or 0
+    token = api.create_access_token({"sub": admin.email, "ruolo": admin.ruolo})
+    intestazioni = {"Authorization": f"Bearer {token}"}
+    # Id fissi oltre l'ultima nota: il riscaldamento inserisce, poi aggiorna
+    note = json.dumps(
+        [
+            {"id": nota_max + i + 1, "testo": f"Import {i}", "autore_id": admin.id}
+            for i in range(200)
+        ]
+    )
+
+    chiamate = {
+        "api.GET /oggetti?location_id": lambda c: c.get(
+            f"/oggetti?location_id={location_id}"
+        ),
+        "api.GET /oggetti/{id}": lambda c: c.get(f"/oggetti/{oggetto_id}"),
+        "api.GET /locations": lambda c: c.get("/locations"),
+        "api.GET /export/oggetti csv": lambda c: c.get("/export/oggetti?formato=csv"),
+        "api.GET /export/note json": lambda c: c.get("/export/note?formato=json"),
+        "api.POST /import-bulk/note (200)": lambda c: c.post(
+            "/import-bulk/note",
+            files={"file": ("note.json", note, "application/json")},
+        ),
+    }
+    metriche = {}
+    trasporto = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(
+        transport=trasporto, base_url="http://bench", headers=intestazioni
+    ) as client:
+        for nome, chiamata in chiamate.items():
+            risposta = await chiamata(client)  # riscaldamento
+            risposta.raise_for_status()
+            tempi = []
+            for _ in range(ripetizioni):
+                inizio = time.perf_counter()
+                risposta = await chiamata(client)
+                tempi.append((time.perf_counter() - inizio) * 1000)
+                risposta.raise_for_status()
+            metriche[nome] = _latenza(tempi)
+    return metriche
+
+
+def misura_api(ripetizioni):
+    return asyncio.run(_misura_api_async(ripetizioni))
+
+
+def misura_dashboard(ripetizioni):
+    import audit
+    import cruscotto
+    import letture
+    import statistiche
+
+    funzioni = {
+        "dashboard.conteggi": statistiche.conteggi_dashboard,
+        "dashboard.log_operazioni pagina": lambda: audit.cerca_log(limit=100),
+        "dashboard.oggetti prima pagina": lambda: letture.pagina(
+            "oggetti", ordina="nome", limit=50
+        ),
+        "dashboard.oggetti totale": lambda: letture.conta("oggetti"),
+        "dashboard.selettore oggetti": lambda: letture.cerca_per_nome("oggetti", "sca"),
+    }
+    for nome, sezione in cruscotto.SEZIONI.items():
+        funzioni[f"dashboard.{nome}"] = sezione
+    return {nome: _cronometra(f, ripetizioni) for nome, f in funzioni.items()}
+
+
+def misura(ripetizioni, operazioni):
+    metriche = {}
+    metriche.update(misura_dashboard(ripetizioni))
+    metriche.update(misura_api(ripetizioni))
+    # Per ultime: le scritture cambiano il database di lavoro
+    metriche.update(misura_crud(operazioni))
+    return metriche
+
+
+# --- ORCHESTRAZIONE ---
+def database_scala(scala, cartella, seme):
+    """Percorso del database sintetico della scala, generato se manca"""
+    os.makedirs(cartella, exist_ok=True)
+    percorso = os.path.join(cartella, f"benchmark-{scala}-s{seme}.db")
+    if not os.path.exists(percorso):
+        print(f"[{scala}] genero {percorso}...", flush=True)
+        dati_sintetici.crea_database(
+            percorso, seme=seme, oggi=DATA_RIFERIMENTO, **SCALE[scala]
+        )
+    return percorso
+
+
+def esegui_scala(scala, cartella, seme, ripetizioni, operazioni):
+    originale = database_scala(scala, cartella, seme)
+    lavoro = tempfile.mkdtemp(prefix="benchmark-")
+    try:
+        copia = os.path.join(lavoro, "lavoro.db")
+        shutil.copyfile(originale, copia)
+        uscita = os.path.join(lavoro, "metriche.json")
+        ambiente = dict(
+            os.environ,
+            DB_TYPE="sqlite",
+            DB_NAME=copia[: -len(".db")],
+            AUDIT_ARCHIVIO_DIR=os.path.join(lavoro, "archivio"),
+        )
+        print(f"[{scala}] misuro...", flush=True)
+        subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "_misura",
+                "--output",
+                uscita,
+                "--ripetizioni",
+                str(ripetizioni),
+                "--operazioni",
+                str(operazioni),
+            ],
+            env=ambiente,
+            check=True,
+        )
+        with open(uscita, encoding="utf-8") as f:
+            metriche = json.load(f)
+    finally:
+        shutil.rmtree(lavoro, ignore_errors=True)
+    return {"parametri": SCALE[scala], "metriche": metriche}
+
+
+def _meta(seme, ripetizioni, operazioni):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "piattaforma": platform.platform(),
+        "cpu": os.cpu_count(),
+        "seme": seme,
+        "ripetizioni": ripetizioni,
+        "operazioni": operazioni,
+    }
+
+
+# --- CONFRONTO CON LA BASELINE ---
+def confronta(baseline, risultati, soglia):
+    """Restituisce ``(righe, regressioni)`` per le metriche presenti in
+    entrambi i file; ``righe`` sono ``(scala, metrica, prima, dopo,
+    variazione, regressione)`` con variazione > 0 = peggioramento."""
+    righe = []
+    for scala, dati in risultati["scale"].items():
+        riferimento = baseline.get("scale", {}).get(scala)
+        if not riferimento:
+            continue
+        for nome, dopo in dati["metriche"].items():
+            prima = riferimento["metriche"].get(nome)
+            if not prima or not prima["valore"] or not dopo["valore"]:
+                continue
+            if dopo["migliore"] == "basso":
+                variazione = dopo["valore"] / prima["valore"] - 1
+                rilevante = dopo["valore"] - prima["valore"] > MIN_DIFFERENZA_MS
+            else:
+                variazione = prima["valore"] / dopo["valore"] - 1
+                rilevante = True
+            regressione = variazione > soglia and rilevante
+            righe.append(
+                (scala, nome, prima["valore"], dopo["valore"], variazione, regressione)
+            )
+    return righe, [r for r in righe if r[5]]
+
+
+def stampa_confronto(righe, soglia):
+    for scala, nome, prima, dopo, variazione, regressione in righe:
+        segno = "REGRESSIONE" if regressione else ""
+        print(
+            f"{scala:<8} {nome:<40} {prima:>12.3f} -> {dopo:>12.3f}"
+            f" {variazione:+7.1%} {segno}"
+        )
+    regressioni = sum(1 for r in righe if r[5])
+    print(f"{regressioni} regressioni oltre la soglia del {soglia:.0%}")
+
+
+def _leggi(percorso):
+    with open(percorso, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_esegui = sub.add_parser("esegui", help="esegue la suite e scrive il JSON")
+    p_esegui.add_argument("--scale", default="piccola,media")
+    p_esegui.add_argument("--output", default="benchmark.json")
+    p_esegui.add_argument("--cartella", default=tempfile.gettempdir())
+    p_esegui.add_argument("--seme", type=int, default=1)
+    p_esegui.add_argument("--ripetizioni", type=int, default=10)
+    p_esegui.add_argument("--operazioni", type=int, default=200)
+    p_esegui.add_argument("--baseline", help="JSON con cui confrontare i risultati")
+    p_esegui.add_argument("--soglia", type=float, default=0.25)
+
+    p_confronta = sub.add_parser("confronta", help="confronta due file JSON")
+    p_confronta.add_argument("baseline")
+    p_confronta.add_argument("risultati")
+    p_confronta.add_argument("--soglia", type=float, default=0.25)
+
+    p_misura = sub.add_parser("_misura")  # processo figlio
+    p_misura.add_argument("--output", required=True)
+    p_misura.add_argument("--ripetizioni", type=int, required=True)
+    p_misura.add_argument("--operazioni", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.comando == "_misura":
+        metriche = misura(args.ripetizioni, args.operazioni)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(metriche, f)
+        return 0
+
+    if args.comando == "esegui":
+        scale = [s.strip() for s in args.scale.split(",") if s.strip()]
+        sconosciute = [s for s in scale if s not in SCALE]
+        if sconosciute:
+            parser.error(f"scale sconosciute: {', '.join(sconosciute)}")
+        risultati = {
+            "meta": _meta(args.seme, args.ripetizioni, args.operazioni),
+            "scale": {
+                scala: esegui_scala(
+                    scala, args.cartella, args.seme, args.ripetizioni, args.operazioni
+                )
+                for scala in scale
+            },
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(risultati, f, indent=2)
+        print(f"Risultati in {args.output}")
+        if not args.baseline:
+            return 0
+        baseline = _leggi(args.baseline)
+    else:
+        baseline, risultati = _leggi(args.baseline), _leggi(args.risultati)
+
+    righe, regressioni = confronta(baseline, risultati, args.soglia)
+    stampa_confronto(righe, args.soglia)
+    return 1 if regressioni else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
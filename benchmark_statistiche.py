@@ -0,0 +1,141 @@
+"""Benchmark della pagina Statistiche su un database SQLite sintetico.
+
+Misura il tempo per calcolare i dati della pagina (le stesse chiamate di
+``show_statistiche`` senza cache TTL, più la costruzione dei DataFrame) e,
+con ``--colonnare``, lo confronta con l'alternativa "lettura colonnare +
+pandas": una SELECT per tabella con ``pd.read_sql`` e aggregazioni
+groupby/resample in memoria.
+
+    python benchmark_statistiche.py --righe 100000 --ripetizioni 5 --colonnare
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+from sqlalchemy import create_engine, select
+
+import dati_sintetici
+import statistiche
+from db import Oggetto, OggettoAttivita, crea_indici_mancanti
+
+
+def crea_database(percorso, righe, seme=1):
+    """Database sintetico con circa ``righe`` oggetti e ``righe`` assegnazioni"""
+    return dati_sintetici.crea_database(
+        percorso,
+        seme=seme,
+        locations=20,
+        oggetti_per_location=max(1, righe // 20),
+        assegnazioni=righe,
+        note=0,
+        log=0,
+    )
+
+
+def pagina_sql():
+    """Dati della pagina Statistiche con le query aggregate di ``statistiche``"""
+    df = {}
+    for nome, chiamata in (
+        ("oggetti_per_location", lambda f: f()),
+        ("andamento_mensile", lambda f: f(12)),
+        ("performance_utenti", lambda f: f()),
+        ("contenitori_piu_utilizzati", lambda f: f(10)),
+    ):
+        # Senza cache TTL: si misura il calcolo, non la memoria
+        risultato = chiamata(getattr(statistiche, nome).__wrapped__)
+        if isinstance(risultato, dict):
+            for chiave, righe in risultato.items():
+                df[chiave] = pd.DataFrame(righe)
+        else:
+            df[nome] = pd.DataFrame(risultato)
+    return df
+
+
+def pagina_colonnare(engine):
+    """Stessi dati da una lettura colonnare per tabella e aggregazioni pandas"""
+    with engine.connect() as conn:
+        oggetti = pd.read_sql(
+            select(
+                Oggetto.id,
+                Oggetto.nome,
+                Oggetto.tipo,
+                Oggetto.location_id,
+                Oggetto.contenitore_id,
+                Oggetto.data_rilevamento,
+            ),
+            conn,
+            parse_dates=["data_rilevamento"],
+        )
+        assegnazioni = pd.read_sql(
+            select(
+                OggettoAttivita.assegnato_a,
+                OggettoAttivita.completata,
+                OggettoAttivita.data_prevista,
+                OggettoAttivita.data_completamento,
+            ),
+            conn,
+            parse_dates=["data_prevista", "data_completamento"],
+        )
+    dal = pd.Timestamp(date.today() - timedelta(days=12 * 31))
+    recenti = oggetti[oggetti["data_rilevamento"] >= dal]
+    completate = assegnazioni[assegnazioni["completata"].astype(bool)]
+    completate = completate[completate["data_completamento"] >= dal]
+    assegnazioni["ritardo"] = (
+        assegnazioni["data_completamento"] - assegnazioni["data_prevista"]
+    ).dt.days
+    return {
+        "oggetti_per_location": oggetti.assign(
+            contenitore=oggetti["tipo"].eq("contenitore")
+        )
+        .groupby("location_id")
+        .agg(totale=("id", "size"), contenitori=("contenitore", "sum")),
+        "rilevamenti": recenti.set_index("data_rilevamento").resample("MS").size(),
+        "completamenti": completate.set_index("data_completamento")
+        .resample("MS")
+        .size(),
+        "performance_utenti": assegnazioni.groupby("assegnato_a").agg(
+            assegnate=("completata", "size"),
+            completate=("completata", "sum"),
+            ritardo_medio=("ritardo", "mean"),
+        ),
+        "contenitori_piu_utilizzati": oggetti["contenitore_id"].value_counts().head(10),
+    }
+
+
+def misura(funzione, ripetizioni):
+    funzione()  # riscaldamento: cache di SQLite e del sistema operativo
+    inizio = time.perf_counter()
+    for _ in range(ripetizioni):
+        funzione()
+    return (time.perf_counter() - inizio) / ripetizioni * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--righe", type=int, default=100_000)
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--colonnare", action="store_true")
+    parser.add_argument("--database", help="file SQLite da usare (default: temporaneo)")
+    args = parser.parse_args()
+
+    percorso = args.database or os.path.join(tempfile.mkdtemp(), "statistiche.db")
+    if os.path.exists(percorso):
+        engine = create_engine(f"sqlite:///{percorso}")
+        crea_indici_mancanti(engine)
+    else:
+        print(f"Creo {args.righe} oggetti e assegnazioni in {percorso}...")
+        engine = crea_database(percorso, args.righe)
+    statistiche.engine = engine
+
+    print(f"Query aggregate SQL: {misura(pagina_sql, args.ripetizioni):.0f} ms")
+    if args.colonnare:
+        tempo = misura(lambda: pagina_colonnare(engine), args.ripetizioni)
+        print(f"Lettura colonnare + pandas: {tempo:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""Test di carico concorrente delle API su un database SQLite sintetico.
+
+``--utenti`` utenti virtuali ripetono per ``--durata`` secondi un mix pesato
+di operazioni (``--mix``): login, elenco oggetti di una location, dettaglio
+di un oggetto, creazione di una nota ed export CSV degli oggetti, con una
+pausa casuale tra una richiesta e l'altra (``--pausa``). Alla fine stampa
+per rotta richieste, errori, throughput e latenze p50/p95/p99, e per ogni
+intervallo di tempo throughput, errori, richieste in volo e connessioni del
+pool del database in uso (``db.stato_pool``).
+
+Tre modalità:
+
+- default: app in-process tramite ``httpx.ASGITransport``, in un processo
+  figlio che punta alla copia del database; client e server condividono
+  processo e GIL, gli endpoint sincroni girano nel threadpool di anyio (40
+  thread);
+- ``--uvicorn``: avvia ``uvicorn api:app`` (``--workers``) sulla copia del
+  database e lo interroga via HTTP, pool letto da ``GET /stats/pool``;
+- ``--url``: server già avviato; il database è quello del server.
+
+Nelle prime due modalità il database è una copia di lavoro del database
+sintetico della scala (``benchmark.database_scala``), così le scritture non
+si accumulano tra un'esecuzione e l'altra.
+
+    python carico.py --scala media --utenti 50 --durata 60
+    python carico.py --uvicorn --workers 2 --mix elenco=5,dettaglio=5,crea=1
+    python carico.py --url http://127.0.0.1:8000 --email utente10@sintetico.boxboard
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+import benchmark
+
+MIX_DEFAULT = "login=1,elenco=10,dettaglio=20,crea=3,export=1"
+# Primo Coordinatore dei database sintetici; la password è l'email finché
+# gli utenti non hanno una password
+EMAIL_DEFAULT = "utente10@sintetico.boxboard"
+
+
+# --- OPERAZIONI ---
+# Ogni operazione restituisce (rotta, risposta); la rotta usa i segnaposto
+# del percorso, così le statistiche non si frammentano per id
+async def op_login(client, vu, dati):
+    risposta = await client.post(
+        "/login", data={"username": vu["email"], "password": vu["email"]}
+    )
+    if risposta.status_code == 200:
+        vu["token"] = risposta.json()["access_token"]
+    return "POST /login", risposta
+
+
+async def op_elenco(client, vu, dati):
+    location_id = vu["rnd"].choice(dati["locations"])
+    risposta = await client.get(
+        "/oggetti", params={"location_id": location_id}, headers=_auth(vu)
+    )
+    return "GET /oggetti?location_id", risposta
+
+
+async def op_dettaglio(client, vu, dati):
+    oggetto_id = vu["rnd"].choice(dati["oggetti"])
+    risposta = await client.get(f"/oggetti/{oggetto_id}", headers=_auth(vu))
+    return "GET /oggetti/{id}", risposta
+
+
+async def op_crea(client, vu, dati):
+    nota = {
+        "testo": f"Nota di carico {vu['id']}",
+        "oggetto_id": vu["rnd"].choice(dati["oggetti"]),
+        "autore_id": vu["utente_id"],
+    }
+    risposta = await client.post("/note", json=nota, headers=_auth(vu))
+    return "POST /note", risposta
+
+
+async def op_export(client, vu, dati):
+    risposta = await client.get(
+        "/export/oggetti", params={"formato": "csv"}, headers=_auth(vu)
+    )
+    return "GET /export/oggetti", risposta
+
+
+OPERAZIONI = {
+    "login": op_login,
+    "elenco": op_elenco,
+    "dettaglio": op_dettaglio,
+    "crea": op_crea,
+    "export": op_export,
+}
+
+
+def _auth(vu):
+    return {"Authorization": f"Bearer {vu['token']}"}
+
+
+def leggi_mix(testo):
+    """``"login=1,elenco=10"`` -> ``{"login": 1.0, "elenco": 10.0}``"""
+    mix = {}
+    for voce in testo.split(","):
+        if not voce.strip():
+            continue
+        nome, _, peso = voce.partition("=")
+        nome = nome.strip()
+        if nome not in OPERAZIONI:
+            raise ValueError(f"Operazione sconosciuta: {nome}")
+        mix[nome] = float(peso or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Il mix deve contenere almeno un'operazione con peso > 0")
+    return mix
+
+
+# --- PREPARAZIONE ---
+async def prepara(client, email):
+    """Token dell'amministratore, Coordinatori e id da usare nelle richieste"""
+    risposta = await client.post("/login", data={"username": email, "password": email})
+    risposta.raise_for_status()
+    intestazioni = {"Authorization": f"Bearer {risposta.json()['access_token']}"}
+    risposta = await client.get("/utenti", headers=intestazioni)
+    risposta.raise_for_status()
+    coordinatori = [u for u in risposta.json() if u["ruolo"] == "Coordinatore"]
+    risposta = await client.get("/locations", headers=intestazioni)
+    risposta.raise_for_status()
+    locations = [loc["id"] for loc in risposta.json()]
+    oggetti = []
+    for location_id in locations[:10]:
+        risposta = await client.get(
+            "/oggetti", params={"location_id": location_id}, headers=intestazioni
+        )
+        risposta.raise_for_status()
+        oggetti.extend(o["id"] for o in risposta.json())
+    if not locations or not oggetti:
+        raise RuntimeError("Il database non contiene location e oggetti")
+    return {
+        "intestazioni": intestazioni,
+        "coordinatori": coordinatori,
+        "locations": locations,
+        "oggetti": oggetti,
+    }
+
+
+# --- ESECUZIONE ---
+class Registro:
+    """Esiti delle richieste e campioni del pool, in secondi dall'avvio"""
+
+    def __init__(self):
+        self.inizio = time.perf_counter()
+        self.richieste = []  # (istante, rotta, ms, esito)
+        self.campioni = []  # (istante, in volo, stato del pool)
+        self.in_volo = 0
+
+    def adesso(self):
+        return time.perf_counter() - self.inizio
+
+
+async def utente_virtuale(client, vu, dati, mix, fine, pausa, registro):
+    nomi, pesi = list(mix), list(mix.values())
+    while registro.adesso() < fine:
+        operazione = OPERAZIONI[vu["rnd"].choices(nomi, pesi)[0]]
+        registro.in_volo += 1
+        inizio = time.perf_counter()
+        try:
+            rotta, risposta = await operazione(client, vu, dati)
+            esito = risposta.status_code
+        except httpx.HTTPError as e:
+            rotta, esito = operazione.__name__, type(e).__name__
+        finally:
+            registro.in_volo -= 1
+        ms = (time.perf_counter() - inizio) * 1000
+        registro.richieste.append((registro.adesso(), rotta, ms, esito))
+        if pausa:
+            await asyncio.sleep(vu["rnd"].expovariate(1 / pausa))
+
+
+async def campiona(leggi_pool, intestazioni, intervallo, fine, registro):
+    while registro.adesso() < fine:
+        try:
+            pool = await leggi_pool(intestazioni)
+        except (httpx.HTTPError, ValueError) as e:
+            pool = {"errore": type(e).__name__}
+        registro.campioni.append((registro.adesso(), registro.in_volo, pool))
+        await asyncio.sleep(intervallo)
+
+
+async def esegui(client, leggi_pool, args):
+    mix = leggi_mix(args.mix)
+    dati = await prepara(client, args.email)
+    coordinatori = dati["coordinatori"] or [{"id": None, "email": args.email}]
+    token = dati["intestazioni"]["Authorization"].split()[1]
+    utenti = []
+    for i in range(args.utenti):
+        utente = coordinatori[i % len(coordinatori)]
+        utenti.append(
+            {
+                "id": i,
+                "rnd": random.Random(f"{args.seme}-{i}"),
+                "email": utente["email"],
+                "utente_id": utente["id"],
+                # Il token iniziale è dell'amministratore: "login" lo
+                # sostituisce con quello dell'utente assegnato
+                "token": token,
+            }
+        )
+    registro = Registro()
+    fine = args.rampa + args.durata
+
+    async def avvia(i, vu):
+        # Rampa: gli utenti partono distribuiti nei primi --rampa secondi
+        await asyncio.sleep(args.rampa * i / max(args.utenti, 1))
+        await utente_virtuale(client, vu, dati, mix, fine, args.pausa, registro)
+
+    await asyncio.gather(
+        campiona(leggi_pool, dati["intestazioni"], args.intervallo, fine, registro),
+        *(avvia(i, vu) for i, vu in enumerate(utenti)),
+    )
+    return registro
+
+
+# --- REPORT ---
+def _percentile(ordinati, p):
+    if not ordinati:
+        return None
+    indice = min(len(ordinati) - 1, max(0, round(p / 100 * len(ordinati)) - 1))
+    return round(ordinati[indice], 1)
+
+
+def _errore(esito):
+    return not isinstance(esito, int) or esito >= 400
+
+
+def riepilogo(registro, durata, intervallo):
+    """Statistiche per rotta e serie temporale per intervallo"""
+    per_rotta = {}
+    for _, rotta, ms, esito in registro.richieste:
+        per_rotta.setdefault(rotta, []).append((ms, esito))
+    rotte = {}
+    for rotta, esiti in sorted(per_rotta.items()):
+        tempi = sorted(ms for ms, _ in esiti)
+        errori = {}
+        for _, esito in esiti:
+            if _errore(esito):
+                errori[str(esito)] = errori.get(str(esito), 0) + 1
+        rotte[rotta] = {
+            "richieste": len(esiti),
+            "errori": sum(errori.values()),
+            "esiti_errore": errori,
+            "rps": round(len(esiti) / durata, 1),
+            "p50": _percentile(tempi, 50),
+            "p95": _percentile(tempi, 95),
+            "p99": _percentile(tempi, 99),
+            "max": round(tempi[-1], 1),
+        }
+
+    serie = {}
+    for istante, _, ms, esito in registro.richieste:
+        voce = serie.setdefault(int(istante // intervallo), {"tempi": [], "errori": 0})
+        voce["tempi"].append(ms)
+        voce["errori"] += _errore(esito)
+    for istante, in_volo, pool in registro.campioni:
+        voce = serie.setdefault(int(istante // intervallo), {"tempi": [], "errori": 0})
+        voce["in_volo"] = max(voce.get("in_volo", 0), in_volo)
+        if "in_uso" in pool:
+            voce["pool_in_uso"] = max(voce.get("pool_in_uso", 0), pool["in_uso"])
+            voce["pool_massimo"] = pool["massimo"]
+            voce["saturazione"] = max(voce.get("saturazione", 0), pool["saturazione"])
+    tempo = []
+    for passo, voce in sorted(serie.items()):
+        tempi = sorted(voce.pop("tempi"))
+        tempo.append(
+            {
+                "secondo": round(passo * intervallo, 1),
+                "rps": round(len(tempi) / intervallo, 1),
+                "p95": _percentile(tempi, 95),
+                **voce,
+            }
+        )
+    totale = len(registro.richieste)
+    return {
+        "richieste": totale,
+        "errori": sum(r["errori"] for r in rotte.values()),
+        "rps": round(totale / durata, 1),
+        "rotte": rotte,
+        "serie": tempo,
+    }
+
+
+def stampa(risultato):
+    print(
+        f"\n{'rotta':<28} {'rich.':>7} {'err.':>6} {'req/s':>7}"
+        f" {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    for rotta, r in risultato["rotte"].items():
+        print(
+            f"{rotta:<28} {r['richieste']:>7} {r['errori']:>6} {r['rps']:>7}"
+            f" {r['p50']:>8} {r['p95']:>8} {r['p99']:>8} {r['max']:>8}"
+        )
+        if r["esiti_errore"]:
+            print(f"{'':<28} errori: {r['esiti_errore']}")
+    print(
+        f"Totale: {risultato['richieste']} richieste, {risultato['errori']} errori,"
+        f" {risultato['rps']} req/s (latenze in ms)"
+    )
+    print(f"\n{'s':>6} {'req/s':>7} {'p95':>8} {'err.':>5} {'in volo':>8} {'pool':>9}")
+    for t in risultato["serie"]:
+        pool = f"{t['pool_in_uso']}/{t['pool_massimo']}" if "pool_in_uso" in t else "-"
+        print(
+            f"{t['secondo']:>6} {t['rps']:>7} {str(t['p95']):>8} {t['errori']:>5}"
+            f" {t.get('in_volo', '-'):>8} {pool:>9}"
+        )
+
+
+# --- MODALITÀ ---
+def _ambiente_database(copia, lavoro):
+    return {
+        "DB_TYPE": "sqlite",
+        "DB_NAME": copia[: -len(".db")],
+        "AUDIT_ARCHIVIO_DIR": os.path.join(lavoro, "archivio"),
+    }
+
+
+async def _in_process(args):
+    import api
+    import db
+
+    async def leggi_pool(intestazioni):
+        return db.stato_pool()
+
+    trasporto = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(
+        transport=trasporto, base_url="http://carico", timeout=args.timeout
+    ) as client:
+        return await esegui(client, leggi_pool, args)
+
+
+async def _via_http(url, args):
+    limiti = httpx.Limits(max_connections=args.utenti + 1)
+    async with httpx.AsyncClient(
+        base_url=url, timeout=args.timeout, limits=limiti
+    ) as client:
+
+        async def leggi_pool(intestazioni):
+            # Con più worker uvicorn il campione è quello del worker che
+            # risponde: ogni processo ha il proprio pool
+            risposta = await client.get("/stats/pool", headers=intestazioni)
+            risposta.raise_for_status()
+            return risposta.json()
+
+        return await esegui(client, leggi_pool, args)
+
+
+def _porta_libera():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _avvia_uvicorn(ambiente, workers):
+    porta = _porta_libera()
+    processo = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "api:app",
+            "--port",
+            str(porta),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=dict(os.environ, **ambiente),
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    url = f"http://127.0.0.1:{porta}"
+    for _ in range(100):
+        if processo.poll() is not None:
+            raise RuntimeError("uvicorn è terminato durante l'avvio")
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return processo, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("uvicorn non risponde su /health")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utenti", type=int, default=20, help="utenti virtuali")
+    parser.add_argument("--durata", type=float, default=30, help="secondi")
+    parser.add_argument("--rampa", type=float, default=5, help="secondi di avvio")
+    parser.add_argument("--pausa", type=float, default=0.1, help="pausa media (s)")
+    parser.add_argument("--mix", default=MIX_DEFAULT)
+    parser.add_argument("--intervallo", type=float, default=1, help="passo serie")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seme", type=int, default=1)
+    parser.add_argument("--scala", default="piccola", choices=list(benchmark.SCALE))
+    parser.add_argument("--cartella", default=tempfile.gettempdir())
+    parser.add_argument("--email", default=EMAIL_DEFAULT, help="Coordinatore")
+    parser.add_argument("--uvicorn", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--url", help="server già avviato (nessuna copia del DB)")
+    parser.add_argument("--output", help="file JSON con il riepilogo completo")
+    # Processo figlio della modalità in-process, con DB_NAME già impostato
+    parser.add_argument("--in-process", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    try:
+        leggi_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.in_process:
+        registro = asyncio.run(_in_process(args))
+    elif args.url:
+        registro = asyncio.run(_via_http(args.url.rstrip("/"), args))
+    else:
+        originale = benchmark.database_scala(args.scala, args.cartella, args.seme)
+        lavoro = tempfile.mkdtemp(prefix="carico-")
+        try:
+            copia = os.path.join(lavoro, "lavoro.db")
+            shutil.copyfile(originale, copia)
+            ambiente = _ambiente_database(copia, lavoro)
+            if args.uvicorn:
+                processo, url = _avvia_uvicorn(ambiente, args.workers)
+                try:
+                    registro = asyncio.run(_via_http(url, args))
+                finally:
+                    processo.terminate()
+                    processo.wait()
+            else:
+                # In un processo separato: db legge DB_NAME all'import
+                return subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), *sys.argv[1:]]
+                    + ["--in-process"],
+                    env=dict(os.environ, **ambiente),
+                ).returncode
+        finally:
+            shutil.rmtree(lavoro, ignore_errors=True)
+
+    risultato = riepilogo(registro, args.rampa + args.durata, args.intervallo)
+    stampa(risultato)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(risultato, f, indent=2)
+        print(f"Riepilogo in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,5 +11,60 @@ DB_NAME = os.getenv("DB_NAME", "boxboard")
 DB_USER = os.getenv("DB_USER", "root")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 
+# Pool di connessioni per processo (default di SQLAlchemy)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", 30))
+
 # Fallback per Streamlit Cloud (se non si riesce a connettere a MySQL/Postgres, usa SQLite)
 DB_FALLBACK_TO_SQLITE = True
+
+# Change feed (SSE): eventi conservati per il resume e buffer massimo per client
+EVENTI_STORICO_MAX = int(os.getenv("EVENTI_STORICO_MAX", 1000))
+EVENTI_BUFFER_CLIENT = int(os.getenv("EVENTI_BUFFER_CLIENT", 100))
+EVENTI_KEEPALIVE_SEC = int(os.getenv("EVENTI_KEEPALIVE_SEC", 15))
+
+# Ricerca full-text: configurazione testuale PostgreSQL (es. 'italian', 'simple')
+RICERCA_PG_CONFIG = os.getenv("RICERCA_PG_CONFIG", "italian")
+
+# Statistiche aggregate: durata della cache in secondi
+STATISTICHE_CACHE_TTL = int(os.getenv("STATISTICHE_CACHE_TTL", 30))
+
+# Log operazioni: retention (giorni) e archivio NDJSON compresso
+AUDIT_RETENTION_GIORNI = int(os.getenv("AUDIT_RETENTION_GIORNI", 180))
+AUDIT_ARCHIVIO_DIR = os.getenv("AUDIT_ARCHIVIO_DIR", "log_archivio")
+AUDIT_SEGMENTO_RIGHE = int(os.getenv("AUDIT_SEGMENTO_RIGHE", 50000))
+
+# Scrittura del log operazioni: asincrona a batch (default) o nella stessa
+# transazione della modifica (AUDIT_SINCRONO=1). Politica a coda piena:
+# "attendi" (backpressure fino a AUDIT_ATTESA_MAX_SEC, poi scarta) o "scarta"
+AUDIT_SINCRONO = os.getenv("AUDIT_SINCRONO", "0").lower() in ("1", "true", "si")
+AUDIT_CODA_MAX = int(os.getenv("AUDIT_CODA_MAX", 10000))
+AUDIT_BATCH = int(os.getenv("AUDIT_BATCH", 200))
+AUDIT_INTERVALLO_SEC = float(os.getenv("AUDIT_INTERVALLO_SEC", 1.0))
+AUDIT_POLITICA_CODA = os.getenv("AUDIT_POLITICA_CODA", "attendi")
+AUDIT_ATTESA_MAX_SEC = float(os.getenv("AUDIT_ATTESA_MAX_SEC", 2.0))
+
+# Cache di processo per attività, location e utenti (secondi, rete di sicurezza)
+ANAGRAFICHE_CACHE_TTL = int(os.getenv("ANAGRAFICHE_CACHE_TTL", 300))
+
+# Interfaccia Streamlit: durata in secondi delle liste in st.cache_data
+# (oggetti, assegnazioni, note); i form svuotano la cache a ogni scrittura
+UI_CACHE_TTL = int(os.getenv("UI_CACHE_TTL", 60))
+
+# Istantanea condivisa della Dashboard: ricalcolo periodico (secondi) e
+# attesa minima tra due ricalcoli innescati dal bus eventi
+DASHBOARD_INTERVALLO_SEC = float(os.getenv("DASHBOARD_INTERVALLO_SEC", 60))
+DASHBOARD_ATTESA_MIN_SEC = float(os.getenv("DASHBOARD_ATTESA_MIN_SEC", 2))
+
+# Profilazione delle richieste API: attiva per tutte le richieste campionate
+# (PROFILAZIONE=1) o per singola richiesta con l'header X-Profila da admin.
+# Si conservano i profili oltre la soglia, al massimo PROFILAZIONE_MAX
+PROFILAZIONE_ATTIVA = os.getenv("PROFILAZIONE", "0").lower() in ("1", "true", "si")
+PROFILAZIONE_CAMPIONE = float(os.getenv("PROFILAZIONE_CAMPIONE", 1.0))
+PROFILAZIONE_SOGLIA_MS = float(os.getenv("PROFILAZIONE_SOGLIA_MS", 500))
+PROFILAZIONE_DIR = os.getenv("PROFILAZIONE_DIR", "profili")
+PROFILAZIONE_MAX = int(os.getenv("PROFILAZIONE_MAX", 50))
+
+# Pannello "Performance" di Streamlit: misure conservate per pagina
+PRESTAZIONI_STORICO = int(os.getenv("PRESTAZIONI_STORICO", 50))
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import anagrafiche
+import audit
+import crud
+import dati_sintetici
+import letture
+import statistiche
+from db import Base
+
+# Data di riferimento fissa: lo stesso seme dà lo stesso database in ogni giorno
+DATA_SINTETICA = date(2026, 1, 1)
+
+
+@pytest.fixture(scope="session")
+def database_sintetico(tmp_path_factory):
+    """``database_sintetico(seme=1, **parametri)`` restituisce l'engine di un
+    database SQLite di ``dati_sintetici``, creato una volta per sessione per
+    ogni combinazione di parametri."""
+    creati = {}
+
+    def crea(seme=1, **parametri):
+        chiave = (seme, tuple(sorted(parametri.items())))
+        if chiave not in creati:
+            percorso = tmp_path_factory.mktemp("sintetico") / "sintetico.db"
+            creati[chiave] = dati_sintetici.crea_database(
+                str(percorso), seme=seme, oggi=DATA_SINTETICA, **parametri
+            )
+        return creati[chiave]
+
+    return crea
+
+
+@pytest.fixture()
+def motore(tmp_path, monkeypatch):
+    """Engine di un database SQLite vuoto in ``tmp_path``, usato da crud,
+    letture, anagrafiche, audit e statistiche al posto di quello
+    configurato; cache delle anagrafiche e delle statistiche vuote."""
+    eng = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(eng)
+    sessioni = sessionmaker(bind=eng)
+    for modulo in (crud, letture, anagrafiche, audit):
+        monkeypatch.setattr(modulo, "get_session", sessioni)
+    monkeypatch.setattr(statistiche, "engine", eng)
+    statistiche.svuota_cache()
+    for nome, cache in list(anagrafiche._cache.items()):
+        monkeypatch.setitem(
+            anagrafiche._cache, nome, anagrafiche.CacheAnagrafica(cache.modello)
+        )
+    yield eng
+    # Le righe di log accodate durante il test finiscono in questo database
+    audit.scrittore.flush(timeout=5)
@@ -76,11 +76,52 @@ CREATE TABLE note (
 -- 7. LOG OPERAZIONI
 CREATE TABLE IF NOT EXISTS log_operazioni (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    utente_id INT NOT NULL,
+    utente_id INT,
     azione VARCHAR(50) NOT NULL,
     entita VARCHAR(50) NOT NULL,
     entita_id INT,
     dettagli TEXT,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (utente_id) REFERENCES utenti(id) ON DELETE CASCADE
+    FOREIGN KEY (utente_id) REFERENCES utenti(id) ON DELETE SET NULL
 );
+
+-- 8. RICERCA FULL-TEXT
+ALTER TABLE oggetti ADD FULLTEXT INDEX ft_oggetti (nome, descrizione);
+ALTER TABLE note ADD FULLTEXT INDEX ft_note (testo);
+ALTER TABLE locations ADD FULLTEXT INDEX ft_locations (nome, indirizzo);
+
+-- 9. INDICI LOG OPERAZIONI (paginazione keyset e filtri)
+CREATE INDEX ix_log_operazioni_timestamp_id ON log_operazioni (timestamp, id);
+CREATE INDEX ix_log_operazioni_utente_timestamp ON log_operazioni (utente_id, timestamp);
+CREATE INDEX ix_log_operazioni_entita_timestamp ON log_operazioni (entita, timestamp);
+CREATE INDEX ix_log_operazioni_azione_timestamp ON log_operazioni (azione, timestamp);
+
+-- 10. INDICI ATTIVITÀ (pendenti e scadenze in Dashboard, completamenti in Statistiche; cancellazioni a cascata)
+CREATE INDEX ix_oggetto_attivita_completata_data ON oggetto_attivita (completata, data_prevista);
+CREATE INDEX ix_oggetto_attivita_completata_completamento ON oggetto_attivita (completata, data_completamento);
+CREATE INDEX ix_oggetto_attivita_oggetto ON oggetto_attivita (oggetto_id);
+CREATE INDEX ix_oggetto_attivita_attivita ON oggetto_attivita (attivita_id);
+CREATE INDEX ix_oggetto_attivita_assegnato ON oggetto_attivita (assegnato_a);
+
+-- 11. INDICI OGGETTI (ordinamento, paginazione keyset, filtri e andamento mensile)
+CREATE INDEX ix_oggetti_nome ON oggetti (nome, id);
+CREATE INDEX ix_oggetti_location_nome ON oggetti (location_id, nome, id);
+CREATE INDEX ix_oggetti_contenitore ON oggetti (contenitore_id);
+CREATE INDEX ix_oggetti_data_rilevamento ON oggetti (data_rilevamento);
+
+-- 12. INDICI NOTE (note di un oggetto, un'attività o una location per data; cancellazioni a cascata)
+CREATE INDEX ix_note_oggetto_data ON note (oggetto_id, data, id);
+CREATE INDEX ix_note_attivita_data ON note (attivita_id, data, id);
+CREATE INDEX ix_note_location_data ON note (location_id, data, id);
+
+-- 13. INDICI NOMI (ordinamento e ricerca per prefisso nei selettori; collazione case-insensitive)
+CREATE INDEX ix_utenti_nome ON utenti (nome, id);
+CREATE INDEX ix_locations_nome ON locations (nome, id);
+
+-- 14. METADATI SCHEMA (versione letta dal bootstrap dell'app: db.SCHEMA_VERSIONE)
+CREATE TABLE IF NOT EXISTS metadati_schema (
+    chiave VARCHAR(64) PRIMARY KEY,
+    valore VARCHAR(255)
+);
+INSERT INTO metadati_schema (chiave, valore) VALUES ('versione_schema', '8')
+    ON DUPLICATE KEY UPDATE valore = VALUES(valore);
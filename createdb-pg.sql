@@ -46,7 +46,7 @@ CREATE TABLE oggetto_attivita (
     completata BOOLEAN DEFAULT FALSE,
     data_prevista DATE,
     data_completamento DATE,
-    assegnato_a INT REFERENCES utenti(id)
+    assegnato_a INT REFERENCES utenti(id) ON DELETE SET NULL
 );
 
 -- NOTE
@@ -56,17 +56,61 @@ CREATE TABLE note (
     oggetto_id INT REFERENCES oggetti(id) ON DELETE CASCADE,
     attivita_id INT REFERENCES attivita(id) ON DELETE CASCADE,
     location_id INT REFERENCES locations(id) ON DELETE CASCADE,
-    autore_id INT REFERENCES utenti(id),
+    autore_id INT REFERENCES utenti(id) ON DELETE SET NULL,
     data TIMESTAMP DEFAULT NOW()
 );
 
 -- LOG OPERAZIONI
 CREATE TABLE IF NOT EXISTS log_operazioni (
     id SERIAL PRIMARY KEY,
-    utente_id INT NOT NULL REFERENCES utenti(id),
+    utente_id INT REFERENCES utenti(id) ON DELETE SET NULL,
     azione VARCHAR(50) NOT NULL,
     entita VARCHAR(50) NOT NULL,
     entita_id INT,
     dettagli TEXT,
     timestamp TIMESTAMP DEFAULT NOW()
 );
+
+-- RICERCA FULL-TEXT (tsvector + GIN): le espressioni devono coincidere con ricerca.py
+CREATE INDEX IF NOT EXISTS ix_oggetti_fts ON oggetti USING GIN (to_tsvector('italian'::regconfig, coalesce(nome, '') || ' ' || coalesce(descrizione, '')));
+CREATE INDEX IF NOT EXISTS ix_note_fts ON note USING GIN (to_tsvector('italian'::regconfig, coalesce(testo, '')));
+CREATE INDEX IF NOT EXISTS ix_locations_fts ON locations USING GIN (to_tsvector('italian'::regconfig, coalesce(nome, '') || ' ' || coalesce(indirizzo, '')));
+
+-- INDICI LOG OPERAZIONI (paginazione keyset e filtri)
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_timestamp_id ON log_operazioni (timestamp, id);
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_utente_timestamp ON log_operazioni (utente_id, timestamp);
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_entita_timestamp ON log_operazioni (entita, timestamp);
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_azione_timestamp ON log_operazioni (azione, timestamp);
+
+-- INDICI ATTIVITÀ (pendenti e scadenze in Dashboard, completamenti in Statistiche; cancellazioni a cascata)
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_completata_data ON oggetto_attivita (completata, data_prevista);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_completata_completamento ON oggetto_attivita (completata, data_completamento);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_oggetto ON oggetto_attivita (oggetto_id);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_attivita ON oggetto_attivita (attivita_id);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_assegnato ON oggetto_attivita (assegnato_a);
+
+-- INDICI OGGETTI (ordinamento, paginazione keyset, filtri e andamento mensile)
+CREATE INDEX IF NOT EXISTS ix_oggetti_nome ON oggetti (nome, id);
+CREATE INDEX IF NOT EXISTS ix_oggetti_location_nome ON oggetti (location_id, nome, id);
+CREATE INDEX IF NOT EXISTS ix_oggetti_contenitore ON oggetti (contenitore_id);
+CREATE INDEX IF NOT EXISTS ix_oggetti_data_rilevamento ON oggetti (data_rilevamento);
+
+-- INDICI NOTE (note di un oggetto, un'attività o una location per data; cancellazioni a cascata)
+CREATE INDEX IF NOT EXISTS ix_note_oggetto_data ON note (oggetto_id, data, id);
+CREATE INDEX IF NOT EXISTS ix_note_attivita_data ON note (attivita_id, data, id);
+CREATE INDEX IF NOT EXISTS ix_note_location_data ON note (location_id, data, id);
+
+-- INDICI NOMI (ordinamento e ricerca per prefisso su lower(nome) nei selettori)
+CREATE INDEX IF NOT EXISTS ix_utenti_nome ON utenti (nome, id);
+CREATE INDEX IF NOT EXISTS ix_locations_nome ON locations (nome, id);
+CREATE INDEX IF NOT EXISTS ix_utenti_nome_prefisso ON utenti (lower(nome) varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_locations_nome_prefisso ON locations (lower(nome) varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_oggetti_nome_prefisso ON oggetti (lower(nome) varchar_pattern_ops);
+
+-- METADATI SCHEMA (versione letta dal bootstrap dell'app: db.SCHEMA_VERSIONE)
+CREATE TABLE IF NOT EXISTS metadati_schema (
+    chiave VARCHAR(64) PRIMARY KEY,
+    valore VARCHAR(255)
+);
+INSERT INTO metadati_schema (chiave, valore) VALUES ('versione_schema', '8')
+    ON CONFLICT (chiave) DO UPDATE SET valore = EXCLUDED.valore;
@@ -49,7 +49,7 @@ CREATE TABLE oggetto_attivita (
     assegnato_a INTEGER,
     FOREIGN KEY (oggetto_id) REFERENCES oggetti(id) ON DELETE CASCADE,
     FOREIGN KEY (attivita_id) REFERENCES attivita(id) ON DELETE CASCADE,
-    FOREIGN KEY (assegnato_a) REFERENCES utenti(id)
+    FOREIGN KEY (assegnato_a) REFERENCES utenti(id) ON DELETE SET NULL
 );
 
 -- NOTE
@@ -64,17 +64,93 @@ CREATE TABLE note (
     FOREIGN KEY (oggetto_id) REFERENCES oggetti(id) ON DELETE CASCADE,
     FOREIGN KEY (attivita_id) REFERENCES attivita(id) ON DELETE CASCADE,
     FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE CASCADE,
-    FOREIGN KEY (autore_id) REFERENCES utenti(id)
+    FOREIGN KEY (autore_id) REFERENCES utenti(id) ON DELETE SET NULL
 );
 
 -- LOG OPERAZIONI
 CREATE TABLE IF NOT EXISTS log_operazioni (
     id INTEGER PRIMARY KEY,
-    utente_id INTEGER NOT NULL,
+    utente_id INTEGER,
     azione TEXT NOT NULL,
     entita TEXT NOT NULL,
     entita_id INTEGER,
     dettagli TEXT,
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (utente_id) REFERENCES utenti(id)
+    FOREIGN KEY (utente_id) REFERENCES utenti(id) ON DELETE SET NULL
 );
+
+-- RICERCA FULL-TEXT (FTS5): rowid = id * 4 + codice entità (1 oggetti, 2 note, 3 locations)
+CREATE VIRTUAL TABLE IF NOT EXISTS ricerca_fts USING fts5(
+    titolo, testo, tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS oggetti_fts_ai AFTER INSERT ON oggetti BEGIN
+    INSERT INTO ricerca_fts(rowid, titolo, testo) VALUES (new.id * 4 + 1, coalesce(new.nome, ''), coalesce(new.descrizione, ''));
+END;
+CREATE TRIGGER IF NOT EXISTS oggetti_fts_au AFTER UPDATE OF nome, descrizione ON oggetti BEGIN
+    DELETE FROM ricerca_fts WHERE rowid = old.id * 4 + 1;
+    INSERT INTO ricerca_fts(rowid, titolo, testo) VALUES (new.id * 4 + 1, coalesce(new.nome, ''), coalesce(new.descrizione, ''));
+END;
+CREATE TRIGGER IF NOT EXISTS oggetti_fts_ad AFTER DELETE ON oggetti BEGIN
+    DELETE FROM ricerca_fts WHERE rowid = old.id * 4 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS note_fts_ai AFTER INSERT ON note BEGIN
+    INSERT INTO ricerca_fts(rowid, titolo, testo) VALUES (new.id * 4 + 2, '', coalesce(new.testo, ''));
+END;
+CREATE TRIGGER IF NOT EXISTS note_fts_au AFTER UPDATE OF testo ON note BEGIN
+    DELETE FROM ricerca_fts WHERE rowid = old.id * 4 + 2;
+    INSERT INTO ricerca_fts(rowid, titolo, testo) VALUES (new.id * 4 + 2, '', coalesce(new.testo, ''));
+END;
+CREATE TRIGGER IF NOT EXISTS note_fts_ad AFTER DELETE ON note BEGIN
+    DELETE FROM ricerca_fts WHERE rowid = old.id * 4 + 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS locations_fts_ai AFTER INSERT ON locations BEGIN
+    INSERT INTO ricerca_fts(rowid, titolo, testo) VALUES (new.id * 4 + 3, coalesce(new.nome, ''), coalesce(new.indirizzo, ''));
+END;
+CREATE TRIGGER IF NOT EXISTS locations_fts_au AFTER UPDATE OF nome, indirizzo ON locations BEGIN
+    DELETE FROM ricerca_fts WHERE rowid = old.id * 4 + 3;
+    INSERT INTO ricerca_fts(rowid, titolo, testo) VALUES (new.id * 4 + 3, coalesce(new.nome, ''), coalesce(new.indirizzo, ''));
+END;
+CREATE TRIGGER IF NOT EXISTS locations_fts_ad AFTER DELETE ON locations BEGIN
+    DELETE FROM ricerca_fts WHERE rowid = old.id * 4 + 3;
+END;
+
+-- INDICI LOG OPERAZIONI (paginazione keyset e filtri)
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_timestamp_id ON log_operazioni (timestamp, id);
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_utente_timestamp ON log_operazioni (utente_id, timestamp);
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_entita_timestamp ON log_operazioni (entita, timestamp);
+CREATE INDEX IF NOT EXISTS ix_log_operazioni_azione_timestamp ON log_operazioni (azione, timestamp);
+
+-- INDICI ATTIVITÀ (pendenti e scadenze in Dashboard, completamenti in Statistiche; cancellazioni a cascata)
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_completata_data ON oggetto_attivita (completata, data_prevista);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_completata_completamento ON oggetto_attivita (completata, data_completamento);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_oggetto ON oggetto_attivita (oggetto_id);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_attivita ON oggetto_attivita (attivita_id);
+CREATE INDEX IF NOT EXISTS ix_oggetto_attivita_assegnato ON oggetto_attivita (assegnato_a);
+
+-- INDICI OGGETTI (ordinamento, paginazione keyset, filtri e andamento mensile)
+CREATE INDEX IF NOT EXISTS ix_oggetti_nome ON oggetti (nome, id);
+CREATE INDEX IF NOT EXISTS ix_oggetti_location_nome ON oggetti (location_id, nome, id);
+CREATE INDEX IF NOT EXISTS ix_oggetti_contenitore ON oggetti (contenitore_id);
+CREATE INDEX IF NOT EXISTS ix_oggetti_data_rilevamento ON oggetti (data_rilevamento);
+
+-- INDICI NOTE (note di un oggetto, un'attività o una location per data; cancellazioni a cascata)
+CREATE INDEX IF NOT EXISTS ix_note_oggetto_data ON note (oggetto_id, data, id);
+CREATE INDEX IF NOT EXISTS ix_note_attivita_data ON note (attivita_id, data, id);
+CREATE INDEX IF NOT EXISTS ix_note_location_data ON note (location_id, data, id);
+
+-- INDICI NOMI (ordinamento; ricerca per prefisso nei selettori: LIKE usa solo indici NOCASE)
+CREATE INDEX IF NOT EXISTS ix_utenti_nome ON utenti (nome, id);
+CREATE INDEX IF NOT EXISTS ix_locations_nome ON locations (nome, id);
+CREATE INDEX IF NOT EXISTS ix_utenti_nome_nocase ON utenti (nome COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ix_locations_nome_nocase ON locations (nome COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ix_oggetti_nome_nocase ON oggetti (nome COLLATE NOCASE);
+
+-- METADATI SCHEMA (versione letta dal bootstrap dell'app: db.SCHEMA_VERSIONE)
+CREATE TABLE IF NOT EXISTS metadati_schema (
+    chiave VARCHAR(64) PRIMARY KEY,
+    valore VARCHAR(255)
+);
+INSERT OR REPLACE INTO metadati_schema (chiave, valore) VALUES ('versione_schema', '8');
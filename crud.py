@@ -1,24 +1,212 @@
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
 from db import get_session, Utente, Location, Oggetto, Attivita, OggettoAttivita, Nota, LogOperazione
+from sqlalchemy import bindparam, delete, insert, select, update
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from eventi import pubblica_evento
+from audit import scrittore as scrittore_audit
+from anagrafiche import invalida as invalida_anagrafiche
+import config
 
-def log_operazione(utente_id, azione, entita, entita_id=None, dettagli=None):
-    with get_session() as session:
-        log = LogOperazione(
-            utente_id=utente_id,
-            azione=azione,
-            entita=entita,
-            entita_id=entita_id,
-            dettagli=dettagli,
-        )
-        session.add(log)
+# Unità di lavoro attiva nel contesto corrente (thread o task asyncio)
+_unita = ContextVar("unita_di_lavoro", default=None)
+
+class _UnitaDiLavoro:
+    def __init__(self, session):
+        self.session = session
+        self.eventi = []
+
+@contextmanager
+def unit_of_work():
+    """Raggruppa più chiamate add_*/update_*/delete_* in una sola transazione.
+
+    Dentro il blocco tutte le funzioni usano la stessa sessione e fanno solo
+    flush; il commit avviene una volta all'uscita, il rollback se il blocco
+    solleva un'eccezione. In caso di errore del database le funzioni
+    rilanciano l'eccezione invece di restituire None/False. Gli eventi del
+    change feed e l'invalidazione delle cache avvengono solo dopo il
+    commit. Un blocco annidato
+    partecipa all'unità esterna.
+
+        with unit_of_work():
+            loc_id = add_location("Magazzino", "Via Roma 1", "")
+            for nome in nomi:
+                add_oggetto(nome, "", "da_rimuovere", "oggetto", loc_id)
+    """
+    esterna = _unita.get()
+    if esterna is not None:
+        yield esterna.session
+        return
+    unita = _UnitaDiLavoro(get_session())
+    token = _unita.set(unita)
+    try:
+        yield unita.session
+        unita.session.commit()
+    except BaseException:
+        unita.session.rollback()
+        raise
+    finally:
+        _unita.reset(token)
+        unita.session.close()
+    for evento in unita.eventi:
+        _applica_modifica(*evento)
+
+@contextmanager
+def _sessione():
+    """Sessione dell'unità di lavoro attiva, altrimenti una sessione nuova"""
+    unita = _unita.get()
+    if unita is None:
+        with get_session() as session:
+            yield session
+    else:
+        yield unita.session
+
+def _conferma(session):
+    # Dentro un'unità di lavoro il commit è rimandato all'uscita dal blocco
+    if _unita.get() is None:
         session.commit()
+        for campi in session.info.pop("audit_in_attesa", []):
+            scrittore_audit.registra(**campi)
+    else:
+        session.flush()
+
+def _annulla(session):
+    # Fuori da un'unità di lavoro la sessione è propria: annulla subito la
+    # transazione fallita; dentro, il rollback spetta a unit_of_work
+    if _unita.get() is None:
+        session.rollback()
+
+def _applica_modifica(entita, azione, entita_id=None):
+    # Dopo il commit: cache delle anagrafiche e change feed
+    invalida_anagrafiche(entita)
+    pubblica_evento(entita, azione, entita_id)
+
+def _notifica_modifica(entita, azione, entita_id=None):
+    """Notifica una modifica confermata, o la accoda fino al commit dell'unità"""
+    unita = _unita.get()
+    if unita is None:
+        _applica_modifica(entita, azione, entita_id)
+    else:
+        unita.eventi.append((entita, azione, entita_id))
+
+# Entità indicate con il nome della tabella (operazioni bulk e fast path)
+MODELLI = {
+    m.__tablename__: m
+    for m in (Utente, Location, Oggetto, Attivita, OggettoAttivita, Nota)
+}
+
+# Numero massimo di parametri per istruzione
+_MAX_PARAMETRI = {
+    "sqlite": 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999,
+    "postgresql": 32767,
+    "mysql": 65535,
+}
+
+def _modello(entita):
+    try:
+        return MODELLI[entita]
+    except KeyError:
+        raise ValueError(f"Entità non supportata: {entita}")
+
+def _blocchi(elementi, dimensione):
+    for i in range(0, len(elementi), dimensione):
+        yield elementi[i : i + dimensione]
+
+def _max_parametri(session):
+    return _MAX_PARAMETRI.get(session.get_bind().dialect.name, 999)
+
+def _non_nulli(**campi):
+    return {k: v for k, v in campi.items() if v is not None}
+
+def aggiorna_riga(entita, riga_id, valori):
+    """Aggiorna una riga con una sola ``UPDATE ... WHERE id = :id``.
+
+    Restituisce la riga aggiornata come dict (via RETURNING dove il database
+    lo supporta, altrimenti rileggendola) o None se l'id non esiste. Se i
+    valori violano un vincolo (es. una foreign key verso una riga
+    inesistente) rilancia ``IntegrityError``.
+    """
+    tabella = _modello(entita).__table__
+    with _sessione() as session:
+        if not valori:
+            query = select(tabella).where(tabella.c.id == riga_id)
+            riga = session.execute(query).mappings().first()
+            return dict(riga) if riga else None
+        query = update(tabella).where(tabella.c.id == riga_id).values(**valori)
+        try:
+            if session.get_bind().dialect.update_returning:
+                query = query.returning(*tabella.c)
+                riga = session.execute(query).mappings().first()
+            else:
+                riga = None
+                if session.execute(query).rowcount:
+                    query = select(tabella).where(tabella.c.id == riga_id)
+                    riga = session.execute(query).mappings().first()
+            if riga is None:
+                return None
+            riga = dict(riga)
+            _conferma(session)
+        except IntegrityError:
+            _annulla(session)
+            raise
+        _notifica_modifica(entita, "update", riga_id)
+        return riga
+
+def cancella_riga(entita, riga_id):
+    """Cancella una riga con una sola ``DELETE ... WHERE id = :id``.
+
+    Le righe collegate seguono le clausole ON DELETE del database (CASCADE o
+    SET NULL). Restituisce False se l'id non esiste; se la riga è ancora
+    referenziata da un vincolo senza ON DELETE rilancia ``IntegrityError``.
+    """
+    tabella = _modello(entita).__table__
+    with _sessione() as session:
+        try:
+            query = delete(tabella).where(tabella.c.id == riga_id)
+            if not session.execute(query).rowcount:
+                return False
+            _conferma(session)
+        except IntegrityError:
+            _annulla(session)
+            raise
+        _notifica_modifica(entita, "delete", riga_id)
+        return True
+
+def log_operazione(
+    utente_id, azione, entita, entita_id=None, dettagli=None, session=None
+):
+    """Registra un'operazione nel log.
+
+    Con ``session`` la riga segue la transazione della modifica: viene
+    scritta nella stessa transazione se ``config.AUDIT_SINCRONO`` è attivo o
+    dentro un'unità di lavoro, altrimenti passa allo scrittore asincrono solo
+    dopo il commit. Senza ``session`` viene accodata subito.
+    """
+    campi = dict(
+        utente_id=utente_id,
+        azione=azione,
+        entita=entita,
+        entita_id=entita_id,
+        dettagli=dettagli,
+    )
+    if session is not None and (config.AUDIT_SINCRONO or _unita.get() is not None):
+        session.add(LogOperazione(**campi))
+    elif session is not None:
+        session.info.setdefault("audit_in_attesa", []).append(campi)
+    elif config.AUDIT_SINCRONO:
+        with _sessione() as session:
+            session.add(LogOperazione(**campi))
+            _conferma(session)
+    else:
+        scrittore_audit.registra(**campi)
 
 def add_utente(nome, ruolo, email, current_user_id=None):
     try:
-        with get_session() as session:
+        with _sessione() as session:
             utente = Utente(nome=nome, ruolo=ruolo, email=email)
             session.add(utente)
-            session.commit()
+            session.flush()
             if current_user_id:
                 log_operazione(
                     current_user_id,
@@ -26,32 +214,44 @@ def add_utente(nome, ruolo, email, current_user_id=None):
                     "utente",
                     utente.id,
                     f"Aggiunto utente {nome} ({email}) con ruolo {ruolo}",
+                    session=session,
                 )
+            _conferma(session)
+            _notifica_modifica("utenti", "create", utente.id)
             return utente.id
     except IntegrityError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore di integrità (utente): {e}")
         return None
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (utente): {e}")
         return None
 
 def add_location(nome, indirizzo, note):
     try:
-        with get_session() as session:
+        with _sessione() as session:
             location = Location(nome=nome, indirizzo=indirizzo, note=note)
             session.add(location)
-            session.commit()
+            _conferma(session)
+            _notifica_modifica("locations", "create", location.id)
             return location.id
     except IntegrityError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore di integrità (location): {e}")
         return None
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (location): {e}")
         return None
 
 def add_oggetto(nome, descrizione, stato, tipo, location_id, contenitore_id=None):
     try:
-        with get_session() as session:
+        with _sessione() as session:
             oggetto = Oggetto(
                 nome=nome,
                 descrizione=descrizione,
@@ -61,32 +261,42 @@ def add_oggetto(nome, descrizione, stato, tipo, location_id, contenitore_id=None
                 contenitore_id=contenitore_id,
             )
             session.add(oggetto)
-            session.commit()
+            _conferma(session)
+            _notifica_modifica("oggetti", "create", oggetto.id)
             return oggetto.id
     except IntegrityError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore di integrità (oggetto): {e}")
         return None
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (oggetto): {e}")
         return None
 
 def add_attivita(nome, descrizione):
     try:
-        with get_session() as session:
+        with _sessione() as session:
             attivita = Attivita(nome=nome, descrizione=descrizione)
             session.add(attivita)
-            session.commit()
+            _conferma(session)
+            _notifica_modifica("attivita", "create", attivita.id)
             return attivita.id
     except IntegrityError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore di integrità (attivita): {e}")
         return None
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (attivita): {e}")
         return None
 
 def add_oggetto_attivita(oggetto_id, attivita_id, data_prevista, assegnato_a=None):
     try:
-        with get_session() as session:
+        with _sessione() as session:
             oa = OggettoAttivita(
                 oggetto_id=oggetto_id,
                 attivita_id=attivita_id,
@@ -94,12 +304,17 @@ def add_oggetto_attivita(oggetto_id, attivita_id, data_prevista, assegnato_a=Non
                 assegnato_a=assegnato_a,
             )
             session.add(oa)
-            session.commit()
+            _conferma(session)
+            _notifica_modifica("oggetto_attivita", "create", oa.id)
             return oa.id
     except IntegrityError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore di integrità (oggetto_attivita): {e}")
         return None
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (oggetto_attivita): {e}")
         return None
 
@@ -107,7 +322,7 @@ def add_nota(
     testo, oggetto_id=None, attivita_id=None, location_id=None, autore_id=None
 ):
     try:
-        with get_session() as session:
+        with _sessione() as session:
             nota = Nota(
                 testo=testo,
                 oggetto_id=oggetto_id,
@@ -116,18 +331,23 @@ def add_nota(
                 autore_id=autore_id,
             )
             session.add(nota)
-            session.commit()
+            _conferma(session)
+            _notifica_modifica("note", "create", nota.id)
             return nota.id
     except IntegrityError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore di integrità (nota): {e}")
         return None
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (nota): {e}")
         return None
 
 def update_utente(utente_id, nome=None, ruolo=None, email=None, current_user_id=None):
     try:
-        with get_session() as session:
+        with _sessione() as session:
             utente = session.get(Utente, utente_id)
             if not utente:
                 print(f"Utente con id {utente_id} non trovato")
@@ -142,208 +362,298 @@ def update_utente(utente_id, nome=None, ruolo=None, email=None, current_user_id=
             if email is not None and utente.email != email:
                 cambiamenti.append(f"email: {utente.email} -> {email}")
                 utente.email = email
-            session.commit()
             if current_user_id and cambiamenti:
                 log_operazione(
                     current_user_id,
                     "update",
                     "utente",
                     utente_id,
-                    f"Modifiche: {', '.join(cambiamenti)}"
+                    f"Modifiche: {', '.join(cambiamenti)}",
+                    session=session,
                 )
+            _conferma(session)
+            _notifica_modifica("utenti", "update", utente_id)
             return True
     except IntegrityError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore di integrità (update utente): {e}")
         return False
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (update utente): {e}")
         return False
 
 def delete_utente(utente_id, current_user_id=None):
     try:
-        with get_session() as session:
-            utente = session.get(Utente, utente_id)
-            if not utente:
+        # DELETE e riga di log nella stessa transazione
+        with unit_of_work() as session:
+            if not cancella_riga("utenti", utente_id):
                 print(f"Utente con id {utente_id} non trovato")
                 return False
-            session.delete(utente)
-            session.commit()
             if current_user_id:
                 log_operazione(
                     current_user_id,
                     "delete",
                     "utente",
                     utente_id,
-                    f"Eliminato utente con id {utente_id}"
+                    f"Eliminato utente con id {utente_id}",
+                    session=session,
                 )
             return True
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (delete utente): {e}")
         return False
 
 def update_location(location_id, nome=None, indirizzo=None, note=None):
     try:
-        with get_session() as session:
-            location = session.get(Location, location_id)
-            if not location:
-                print(f"Location con id {location_id} non trovata")
-                return False
-            if nome is not None:
-                location.nome = nome
-            if indirizzo is not None:
-                location.indirizzo = indirizzo
-            if note is not None:
-                location.note = note
-            session.commit()
-            return location_id
+        valori = _non_nulli(nome=nome, indirizzo=indirizzo, note=note)
+        if aggiorna_riga("locations", location_id, valori) is None:
+            print(f"Location con id {location_id} non trovata")
+            return False
+        return location_id
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (update location): {e}")
         return False
 
 def delete_location(location_id):
     try:
-        with get_session() as session:
-            location = session.get(Location, location_id)
-            if not location:
-                print(f"Location con id {location_id} non trovata")
-                return False
-            session.delete(location)
-            session.commit()
-            return True
+        if not cancella_riga("locations", location_id):
+            print(f"Location con id {location_id} non trovata")
+            return False
+        return True
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (delete location): {e}")
         return False
 
-def update_oggetto(oggetto_id, nome=None, descrizione=None, stato=None, tipo=None, location_id=None, contenitore_id=None):
+def update_oggetto(
+    oggetto_id,
+    nome=None,
+    descrizione=None,
+    stato=None,
+    tipo=None,
+    location_id=None,
+    contenitore_id=None,
+):
     try:
-        with get_session() as session:
-            oggetto = session.get(Oggetto, oggetto_id)
-            if not oggetto:
-                print(f"Oggetto con id {oggetto_id} non trovato")
-                return False
-            if nome is not None:
-                oggetto.nome = nome
-            if descrizione is not None:
-                oggetto.descrizione = descrizione
-            if stato is not None:
-                oggetto.stato = stato
-            if tipo is not None:
-                oggetto.tipo = tipo
-            if location_id is not None:
-                oggetto.location_id = location_id
-            if contenitore_id is not None:
-                oggetto.contenitore_id = contenitore_id
-            session.commit()
-            return oggetto_id
+        valori = _non_nulli(
+            nome=nome,
+            descrizione=descrizione,
+            stato=stato,
+            tipo=tipo,
+            location_id=location_id,
+            contenitore_id=contenitore_id,
+        )
+        if aggiorna_riga("oggetti", oggetto_id, valori) is None:
+            print(f"Oggetto con id {oggetto_id} non trovato")
+            return False
+        return oggetto_id
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (update oggetto): {e}")
         return False
 
 def delete_oggetto(oggetto_id):
     try:
-        with get_session() as session:
-            oggetto = session.get(Oggetto, oggetto_id)
-            if not oggetto:
-                print(f"Oggetto con id {oggetto_id} non trovato")
-                return False
-            session.delete(oggetto)
-            session.commit()
-            return True
+        if not cancella_riga("oggetti", oggetto_id):
+            print(f"Oggetto con id {oggetto_id} non trovato")
+            return False
+        return True
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (delete oggetto): {e}")
         return False
 
 def update_attivita(attivita_id, nome=None, descrizione=None):
     try:
-        with get_session() as session:
-            attivita = session.get(Attivita, attivita_id)
-            if not attivita:
-                print(f"Attività con id {attivita_id} non trovata")
-                return False
-            if nome is not None:
-                attivita.nome = nome
-            if descrizione is not None:
-                attivita.descrizione = descrizione
-            session.commit()
-            return attivita_id
+        valori = _non_nulli(nome=nome, descrizione=descrizione)
+        if aggiorna_riga("attivita", attivita_id, valori) is None:
+            print(f"Attività con id {attivita_id} non trovata")
+            return False
+        return attivita_id
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (update attivita): {e}")
         return False
 
 def delete_attivita(attivita_id):
     try:
-        with get_session() as session:
-            attivita = session.get(Attivita, attivita_id)
-            if not attivita:
-                print(f"Attività con id {attivita_id} non trovata")
-                return False
-            session.delete(attivita)
-            session.commit()
-            return True
+        if not cancella_riga("attivita", attivita_id):
+            print(f"Attività con id {attivita_id} non trovata")
+            return False
+        return True
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (delete attivita): {e}")
         return False
 
-def update_oggetto_attivita(oa_id, completata=None, data_prevista=None, data_completamento=None, assegnato_a=None):
+def update_oggetto_attivita(
+    oa_id,
+    completata=None,
+    data_prevista=None,
+    data_completamento=None,
+    assegnato_a=None,
+):
     try:
-        with get_session() as session:
-            oa = session.get(OggettoAttivita, oa_id)
-            if not oa:
-                print(f"OggettoAttivita con id {oa_id} non trovato")
-                return False
-            if completata is not None:
-                oa.completata = completata
-            if data_prevista is not None:
-                oa.data_prevista = data_prevista
-            if data_completamento is not None:
-                oa.data_completamento = data_completamento
-            if assegnato_a is not None:
-                oa.assegnato_a = assegnato_a
-            session.commit()
-            return oa_id
+        valori = _non_nulli(
+            completata=completata,
+            data_prevista=data_prevista,
+            data_completamento=data_completamento,
+            assegnato_a=assegnato_a,
+        )
+        if aggiorna_riga("oggetto_attivita", oa_id, valori) is None:
+            print(f"OggettoAttivita con id {oa_id} non trovato")
+            return False
+        return oa_id
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (update oggetto_attivita): {e}")
         return False
 
 def delete_oggetto_attivita(oa_id):
     try:
-        with get_session() as session:
-            oa = session.get(OggettoAttivita, oa_id)
-            if not oa:
-                print(f"OggettoAttivita con id {oa_id} non trovato")
-                return False
-            session.delete(oa)
-            session.commit()
-            return True
+        if not cancella_riga("oggetto_attivita", oa_id):
+            print(f"OggettoAttivita con id {oa_id} non trovato")
+            return False
+        return True
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (delete oggetto_attivita): {e}")
         return False
 
 def update_nota(nota_id, testo=None):
     try:
-        with get_session() as session:
-            nota = session.get(Nota, nota_id)
-            if not nota:
-                print(f"Nota con id {nota_id} non trovata")
-                return False
-            if testo is not None:
-                nota.testo = testo
-            session.commit()
-            return nota_id
+        valori = _non_nulli(testo=testo)
+        if aggiorna_riga("note", nota_id, valori) is None:
+            print(f"Nota con id {nota_id} non trovata")
+            return False
+        return nota_id
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (update nota): {e}")
         return False
 
 def delete_nota(nota_id):
     try:
-        with get_session() as session:
-            nota = session.get(Nota, nota_id)
-            if not nota:
-                print(f"Nota con id {nota_id} non trovata")
-                return False
-            session.delete(nota)
-            session.commit()
-            return True
+        if not cancella_riga("note", nota_id):
+            print(f"Nota con id {nota_id} non trovata")
+            return False
+        return True
     except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
         print(f"Errore database (delete nota): {e}")
-        return False 
\ No newline at end of file
+        return False
+
+def add_many(entita, righe):
+    """Inserisce ``righe`` (lista di dict) con INSERT multi-riga.
+
+    Restituisce gli id generati nello stesso ordine delle righe, o None in
+    caso di errore. Esempio: ``add_many("oggetti", [{"nome": ..., ...}])``.
+    """
+    modello = _modello(entita)
+    righe = list(righe)
+    if not righe:
+        return []
+    try:
+        with _sessione() as session:
+            colonne = max(len(r) for r in righe)
+            dimensione = max(1, _max_parametri(session) // max(1, colonne))
+            dialetto = session.get_bind().dialect
+            ids = []
+            for blocco in _blocchi(righe, dimensione):
+                if dialetto.insert_executemany_returning_sort_by_parameter_order:
+                    query = insert(modello).returning(
+                        modello.id, sort_by_parameter_order=True
+                    )
+                    risultato = session.execute(query, blocco)
+                    ids.extend(risultato.scalars().all())
+                else:
+                    # Dialetti senza RETURNING: flush dell'ORM, un id per riga
+                    oggetti = [modello(**r) for r in blocco]
+                    session.add_all(oggetti)
+                    session.flush()
+                    ids.extend(o.id for o in oggetti)
+            _conferma(session)
+            _notifica_modifica(entita, "create_many")
+            return ids
+    except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
+        print(f"Errore database (add_many {entita}): {e}")
+        return None
+
+def update_many(entita, righe):
+    """Aggiorna più righe: ogni dict contiene ``id`` e i campi da modificare.
+
+    Le righe con gli stessi campi sono inviate insieme come executemany di
+    ``UPDATE ... WHERE id = :id``. Restituisce il numero di righe aggiornate
+    (False in caso di errore).
+    """
+    modello = _modello(entita)
+    tabella = modello.__table__
+    gruppi = {}
+    for r in righe:
+        valori = {k: v for k, v in r.items() if k != "id"}
+        if valori:
+            parametri = {f"p_{k}": v for k, v in valori.items()}
+            parametri["p__id"] = r["id"]
+            gruppi.setdefault(tuple(sorted(valori)), []).append(parametri)
+    try:
+        with _sessione() as session:
+            aggiornate = 0
+            for campi, parametri in gruppi.items():
+                query = (
+                    update(tabella)
+                    .where(tabella.c.id == bindparam("p__id"))
+                    .values({c: bindparam(f"p_{c}") for c in campi})
+                )
+                aggiornate += session.execute(query, parametri).rowcount
+            _conferma(session)
+            if aggiornate:
+                _notifica_modifica(entita, "update_many")
+            return aggiornate
+    except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
+        print(f"Errore database (update_many {entita}): {e}")
+        return False
+
+def delete_many(entita, ids):
+    """Cancella le righe con gli ``ids`` indicati con ``DELETE ... WHERE id IN``.
+
+    Gli id sono divisi in blocchi entro il limite di parametri del database.
+    Restituisce il numero di righe cancellate (False in caso di errore).
+    """
+    modello = _modello(entita)
+    ids = list(ids)
+    try:
+        with _sessione() as session:
+            cancellate = 0
+            tabella = modello.__table__
+            for blocco in _blocchi(ids, _max_parametri(session)):
+                query = delete(tabella).where(tabella.c.id.in_(blocco))
+                cancellate += session.execute(query).rowcount
+            _conferma(session)
+            if cancellate:
+                _notifica_modifica(entita, "delete_many")
+            return cancellate
+    except SQLAlchemyError as e:
+        if _unita.get() is not None:
+            raise
+        print(f"Errore database (delete_many {entita}): {e}")
+        return False
@@ -0,0 +1,149 @@
+"""Istantanea condivisa dei widget della Dashboard.
+
+Attività urgenti, oggetti più movimentati, attività per utente e log
+recente sono uguali per tutti i Coordinatori: invece di ricalcolarli a ogni
+rerun di ogni sessione, un unico thread di processo li ricalcola ogni
+``config.DASHBOARD_INTERVALLO_SEC`` secondi oppure, con un'attesa minima di
+``config.DASHBOARD_ATTESA_MIN_SEC`` secondi tra due ricalcoli, quando il bus
+eventi segnala una modifica (oggetti, note, assegnazioni, location; le altre
+tabelle seguono l'intervallo). Le sessioni leggono solo la memoria, quindi
+dieci dashboard aperte costano al database quanto una.
+
+Ogni sezione conserva l'istante del proprio calcolo, così l'interfaccia può
+mostrare quanto sono vecchi i dati.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import config
+import statistiche
+from eventi import bus
+
+
+def _senza_cache(fn):
+    # Le funzioni di statistiche hanno una propria cache TTL: l'istantanea
+    # deve leggere dati freschi
+    return getattr(fn, "__wrapped__", fn)
+
+
+SEZIONI = {
+    "attivita_urgenti": lambda: _senza_cache(statistiche.attivita_urgenti)(
+        giorni=3, limit=10
+    ),
+    "oggetti_piu_movimentati": lambda: _senza_cache(
+        statistiche.oggetti_piu_movimentati
+    )(limit=5),
+    "attivita_per_utente": lambda: _senza_cache(statistiche.attivita_per_utente)(),
+    "log_recenti": lambda: _senza_cache(statistiche.log_recenti)(limit=20),
+}
+
+COLONNE_ATTIVITA_UTENTE = ["nome", "totale_attivita", "completate", "in_corso"]
+
+
+def filtra_attivita_per_utente(righe, utenti, stati=(), testo=""):
+    """DataFrame della sezione ``attivita_per_utente`` filtrato come nella
+    Dashboard: utenti scelti, stato (``completate``/``in_corso``) e testo nel
+    nome. Con ``righe`` vuote o None (sezione non calcolata) il DataFrame è
+    vuoto ma con le colonne attese."""
+    df = pd.DataFrame(righe or [], columns=COLONNE_ATTIVITA_UTENTE)
+    df = df[df["nome"].isin(utenti)]
+    if "completate" in stati and "in_corso" not in stati:
+        df = df[df["completate"] > 0]
+    elif "in_corso" in stati and "completate" not in stati:
+        df = df[df["in_corso"] > 0]
+    if testo:
+        df = df[df["nome"].str.contains(testo, case=False, regex=False)]
+    return df
+
+
+class IstantaneaDashboard:
+    """Dati della Dashboard ricalcolati da un thread in background."""
+
+    def __init__(self, sezioni=None, intervallo=60.0, attesa_min=2.0):
+        self.sezioni = dict(sezioni or SEZIONI)
+        self.intervallo = intervallo
+        self.attesa_min = attesa_min
+        self._lock = threading.Lock()
+        self._dati = {}
+        self._modificato = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.aggiornamenti = 0
+        self.errori = 0
+
+    def avvia(self):
+        """Avvia il thread e l'ascolto del bus eventi (idempotente)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._ciclo, name="istantanea-dashboard", daemon=True
+            )
+            self._thread.start()
+        bus.aggiungi_ascoltatore(self._su_evento)
+
+    def ferma(self, timeout=5.0):
+        bus.rimuovi_ascoltatore(self._su_evento)
+        self._stop.set()
+        self._modificato.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _su_evento(self, evento):
+        self._modificato.set()
+
+    def _ciclo(self):
+        while not self._stop.is_set():
+            self.aggiorna()
+            self._modificato.wait(self.intervallo)
+            if self._stop.is_set():
+                break
+            self._modificato.clear()
+            # Raggruppa le modifiche ravvicinate in un solo ricalcolo
+            self._stop.wait(self.attesa_min)
+
+    def aggiorna(self, nomi=None):
+        """Ricalcola le sezioni indicate (tutte se None)"""
+        for nome in nomi or self.sezioni:
+            try:
+                valore = self.sezioni[nome]()
+            except Exception as e:
+                # Resta in memoria l'ultimo valore buono
+                self.errori += 1
+                print(f"Errore aggiornamento dashboard ({nome}): {e}")
+                continue
+            with self._lock:
+                self._dati[nome] = (valore, datetime.now())
+        self.aggiornamenti += 1
+
+    def leggi(self, nome):
+        """Restituisce ``(valore, aggiornato_il)`` per la sezione ``nome``.
+
+        Se la sezione non è ancora stata calcolata (thread appena avviato)
+        la calcola subito per non mostrare una dashboard vuota.
+        """
+        with self._lock:
+            voce = self._dati.get(nome)
+        if voce is None:
+            self.aggiorna([nome])
+            with self._lock:
+                voce = self._dati.get(nome, (None, None))
+        return voce
+
+    def attendi_aggiornamento(self, dopo, timeout=5.0):
+        """Attende che ``aggiornamenti`` superi ``dopo`` (per i test)"""
+        scadenza = time.monotonic() + timeout
+        while self.aggiornamenti <= dopo and time.monotonic() < scadenza:
+            time.sleep(0.01)
+        return self.aggiornamenti > dopo
+
+
+istantanea = IstantaneaDashboard(
+    intervallo=config.DASHBOARD_INTERVALLO_SEC,
+    attesa_min=config.DASHBOARD_ATTESA_MIN_SEC,
+)
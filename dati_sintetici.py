@@ -0,0 +1,463 @@
+"""Generatore deterministico di dati sintetici per test di capacità.
+
+Con gli stessi parametri, lo stesso seme e la stessa data di riferimento
+produce sempre lo stesso database. Le distribuzioni cercano di somigliare a
+un'attività reale di sgombero:
+
+- oggetti per location con distribuzione log-normale (pochi magazzini molto
+  pieni, molte cantine piccole), di cui circa il 15% contenitori annidati
+  fino a ``profondita`` livelli;
+- nomi, attività e autori scelti con pesi di tipo Zipf (pochi molto
+  frequenti, una lunga coda);
+- assegnazioni distribuite sugli ultimi ``giorni`` e sul mese successivo,
+  completate per lo più quando la data prevista è passata;
+- log operazioni con timestamp crescenti.
+
+Le righe sono inserite a blocchi di ``blocco`` righe, una transazione per
+blocco, con id espliciti (i riferimenti non richiedono di rileggere nulla).
+Tabelle e indici secondari sono creati a parte: le tabelle prima del
+caricamento, indici, full-text e versione dello schema alla fine con
+``db.bootstrap_schema``.
+
+    python dati_sintetici.py --database sintetico.db --locations 1000 \\
+        --oggetti-per-location 1000 --assegnazioni 1000000 --seme 1
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.schema import CreateTable
+
+from db import (
+    Attivita,
+    Base,
+    Location,
+    LogOperazione,
+    Nota,
+    Oggetto,
+    OggettoAttivita,
+    Utente,
+    bootstrap_schema,
+)
+
+PARAMETRI_DEFAULT = {
+    "utenti": 50,
+    "locations": 100,
+    "oggetti_per_location": 100,
+    "profondita": 3,
+    "assegnazioni": 20_000,
+    "note": 10_000,
+    "log": 50_000,
+    "giorni": 730,
+}
+
+ATTIVITA = [
+    "Sgombero",
+    "Trasporto",
+    "Smaltimento",
+    "Catalogazione",
+    "Imballaggio",
+    "Vendita",
+    "Pulizia",
+    "Riparazione",
+    "Donazione",
+    "Valutazione",
+]
+OGGETTI = [
+    "Sedia",
+    "Tavolo",
+    "Lampada",
+    "Armadio",
+    "Libro",
+    "Quadro",
+    "Specchio",
+    "Comodino",
+    "Poltrona",
+    "Tappeto",
+    "Vaso",
+    "Radio",
+    "Bicicletta",
+    "Materasso",
+    "Orologio",
+    "Servizio di piatti",
+    "Valigia",
+    "Televisore",
+    "Macchina da cucire",
+    "Giradischi",
+]
+CONTENITORI = ["Scatola", "Baule", "Cassetta", "Scatolone", "Cesta", "Cassettiera"]
+AGGETTIVI = [
+    "in legno",
+    "in metallo",
+    "antico",
+    "vintage",
+    "rotto",
+    "grande",
+    "piccolo",
+    "in plastica",
+    "da restaurare",
+    "in buono stato",
+]
+LUOGHI = ["Cantina", "Soffitta", "Box", "Magazzino", "Appartamento", "Garage"]
+CITTA = ["Roma", "Milano", "Torino", "Napoli", "Bologna", "Firenze", "Genova"]
+FRASI = [
+    "Verificare le condizioni prima del ritiro",
+    "Il proprietario chiede una valutazione",
+    "Fragile, imballare con cura",
+    "Da fotografare per la vendita online",
+    "Accesso solo al mattino",
+    "Serve un secondo operatore per il trasporto",
+    "Contiene documenti da restituire",
+    "Segnalato danno durante lo spostamento",
+]
+# Pesi degli stati degli oggetti
+STATI = {
+    "in_attesa": 35,
+    "da_rimuovere": 30,
+    "smaltito": 15,
+    "venduto": 10,
+    "completato": 10,
+}
+AZIONI = {"create": 50, "update": 35, "delete": 15}
+ENTITA_LOG = {"oggetti": 50, "oggetto_attivita": 20, "note": 15, "locations": 10}
+QUOTA_CONTENITORI = 0.15
+
+
+def _rnd(seme, entita):
+    # Un generatore per entità: cambiare il numero di note non cambia oggetti
+    return random.Random(f"{seme}-{entita}")
+
+
+def _pesi_zipf(n, s=1.0):
+    return [1 / (k**s) for k in range(1, n + 1)]
+
+
+def _scelte_zipf(rnd, n, k):
+    """``k`` indici in ``range(n)`` con popolarità decrescente"""
+    return rnd.choices(range(n), weights=_pesi_zipf(n), k=k)
+
+
+def _utenti(n):
+    for i in range(1, n + 1):
+        yield {
+            "id": i,
+            "nome": f"Operatore {i:04d}" if i % 10 else f"Coordinatore {i:04d}",
+            "ruolo": "Operatore" if i % 10 else "Coordinatore",
+            "email": f"utente{i}@sintetico.boxboard",
+        }
+
+
+def _locations(rnd, n, oggi):
+    for i in range(1, n + 1):
+        yield {
+            "id": i,
+            "nome": f"{rnd.choice(LUOGHI)} {rnd.choice(CITTA)} {i}",
+            "indirizzo": f"Via {rnd.choice(CITTA)} {rnd.randint(1, 200)}",
+            "note": "",
+            "data_creazione": datetime.combine(oggi, datetime.min.time())
+            - timedelta(days=rnd.randint(0, 900)),
+        }
+
+
+def _oggetti(rnd, locations, media, profondita, giorni, oggi):
+    """Oggetti location per location; i contenitori di un livello precedono
+    quelli del livello successivo e gli oggetti, così ogni riferimento punta
+    a un id già inserito."""
+    sigma = 0.8
+    # Media della log-normale = exp(sigma²/2): la si riporta a ``media``
+    scala = media / math.exp(sigma**2 / 2)
+    nomi = _pesi_zipf(len(OGGETTI))
+    inizio = datetime.combine(oggi, datetime.min.time()) - timedelta(days=giorni)
+    prossimo_id = 1
+    for location_id in range(1, locations + 1):
+        totale = max(1, round(scala * rnd.lognormvariate(0, sigma)))
+        n_contenitori = round(totale * QUOTA_CONTENITORI) if profondita else 0
+        livelli = []
+        for livello in range(profondita):
+            # I livelli più profondi hanno meno contenitori
+            quanti = max(0, round(n_contenitori / 2 ** (livello + 1)))
+            if livello == 0:
+                quanti = max(quanti, 1 if n_contenitori else 0)
+            ids = []
+            for _ in range(quanti):
+                padre = rnd.choice(livelli[-1]) if livelli and livelli[-1] else None
+                yield {
+                    "id": prossimo_id,
+                    "nome": f"{rnd.choice(CONTENITORI)} {prossimo_id}",
+                    "descrizione": None,
+                    "tipo": "contenitore",
+                    "stato": "in_attesa",
+                    "location_id": location_id,
+                    "contenitore_id": padre,
+                    "data_rilevamento": inizio
+                    + timedelta(seconds=rnd.randint(0, giorni * 86400)),
+                }
+                ids.append(prossimo_id)
+                prossimo_id += 1
+            livelli.append(ids)
+        tutti_contenitori = [i for ids in livelli for i in ids]
+        fatti = len(tutti_contenitori)
+        for _ in range(max(0, totale - fatti)):
+            nome = OGGETTI[rnd.choices(range(len(OGGETTI)), weights=nomi)[0]]
+            yield {
+                "id": prossimo_id,
+                "nome": f"{nome} {rnd.choice(AGGETTIVI)} {prossimo_id}",
+                "descrizione": None,
+                "tipo": "oggetto",
+                "stato": rnd.choices(list(STATI), weights=list(STATI.values()))[0],
+                "location_id": location_id,
+                "contenitore_id": (
+                    rnd.choice(tutti_contenitori)
+                    if tutti_contenitori and rnd.random() < 0.6
+                    else None
+                ),
+                "data_rilevamento": inizio
+                + timedelta(seconds=rnd.randint(0, giorni * 86400)),
+            }
+            prossimo_id += 1
+
+
+def _assegnazioni(rnd, n, oggetti, utenti, giorni, oggi):
+    attivita = _scelte_zipf(rnd, len(ATTIVITA), n)
+    assegnatari = _scelte_zipf(rnd, utenti, n)
+    for i in range(n):
+        prevista = oggi + timedelta(days=rnd.randint(-giorni, 30))
+        completata = prevista < oggi and rnd.random() < 0.8
+        yield {
+            "id": i + 1,
+            "oggetto_id": rnd.randint(1, oggetti),
+            "attivita_id": attivita[i] + 1,
+            "assegnato_a": assegnatari[i] + 1 if rnd.random() < 0.9 else None,
+            "completata": completata,
+            "data_prevista": prevista,
+            "data_completamento": (
+                min(oggi, prevista + timedelta(days=rnd.randint(-3, 10)))
+                if completata
+                else None
+            ),
+        }
+
+
+def _note(rnd, n, oggetti, locations, utenti, giorni, oggi):
+    autori = _scelte_zipf(rnd, utenti, n)
+    inizio = datetime.combine(oggi, datetime.min.time()) - timedelta(days=giorni)
+    for i in range(n):
+        legame = rnd.random()
+        yield {
+            "id": i + 1,
+            "testo": rnd.choice(FRASI),
+            "oggetto_id": rnd.randint(1, oggetti) if legame < 0.7 else None,
+            "location_id": (rnd.randint(1, locations) if 0.7 <= legame < 0.9 else None),
+            "attivita_id": (rnd.randint(1, len(ATTIVITA)) if legame >= 0.9 else None),
+            "autore_id": autori[i] + 1,
+            "data": inizio + timedelta(seconds=rnd.randint(0, giorni * 86400)),
+        }
+
+
+def _log(rnd, n, utenti, oggetti, giorni, oggi):
+    autori = _scelte_zipf(rnd, utenti, n)
+    inizio = datetime.combine(oggi, datetime.min.time()) - timedelta(days=giorni)
+    passo = giorni * 86400 / max(n, 1)
+    for i in range(n):
+        # Timestamp crescenti: gli indici su timestamp si riempiono in coda
+        yield {
+            "id": i + 1,
+            "utente_id": autori[i] + 1,
+            "azione": rnd.choices(list(AZIONI), weights=list(AZIONI.values()))[0],
+            "entita": rnd.choices(list(ENTITA_LOG), weights=list(ENTITA_LOG.values()))[
+                0
+            ],
+            "entita_id": rnd.randint(1, oggetti),
+            "dettagli": None,
+            "timestamp": inizio + timedelta(seconds=i * passo + rnd.random() * passo),
+        }
+
+
+def _inserisci(engine, modello, righe, blocco):
+    """Inserisce ``righe`` a blocchi, una transazione per blocco"""
+    totale = 0
+    righe = iter(righe)
+    while True:
+        parte = list(islice(righe, blocco))
+        if not parte:
+            return totale
+        with engine.begin() as conn:
+            conn.execute(insert(modello), parte)
+        totale += len(parte)
+
+
+def _caricamento_veloce(dbapi_connection, connection_record):
+    # Database usa-e-getta: niente fsync durante il caricamento
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+def genera(engine, seme=1, oggi=None, blocco=50_000, progresso=None, **parametri):
+    """Popola ``engine`` (database vuoto) e restituisce le righe per tabella.
+
+    ``parametri`` sovrascrive ``PARAMETRI_DEFAULT``; ``oggi`` (default la
+    data corrente) è la data di riferimento per date e scadenze.
+    ``progresso(tabella, righe, secondi)`` è chiamata a fine tabella.
+    """
+    sconosciuti = set(parametri) - set(PARAMETRI_DEFAULT)
+    if sconosciuti:
+        raise ValueError(f"Parametri sconosciuti: {', '.join(sorted(sconosciuti))}")
+    p = {**PARAMETRI_DEFAULT, **parametri}
+    oggi = oggi or date.today()
+    veloce = engine.dialect.name == "sqlite"
+    if veloce:
+        event.listen(engine, "connect", _caricamento_veloce)
+        engine.dispose()
+    try:
+        conteggi = _carica_tutto(engine, seme, oggi, blocco, progresso, p)
+    finally:
+        if veloce:
+            # Chi continua a usare l'engine torna a scrivere con fsync
+            event.remove(engine, "connect", _caricamento_veloce)
+            engine.dispose()
+    return conteggi
+
+
+def _carica_tutto(engine, seme, oggi, blocco, progresso, p):
+    # Solo le tabelle: gli indici secondari rallenterebbero il caricamento
+    with engine.begin() as conn:
+        for tabella in Base.metadata.sorted_tables:
+            conn.execute(CreateTable(tabella, if_not_exists=True))
+
+    conteggi = {}
+
+    def carica(modello, righe):
+        inizio = time.perf_counter()
+        n = _inserisci(engine, modello, righe, blocco)
+        conteggi[modello.__tablename__] = n
+        if progresso:
+            progresso(modello.__tablename__, n, time.perf_counter() - inizio)
+        return n
+
+    giorni = p["giorni"]
+    carica(Utente, _utenti(p["utenti"]))
+    carica(Location, _locations(_rnd(seme, "locations"), p["locations"], oggi))
+    carica(Attivita, ({"id": i, "nome": nome} for i, nome in enumerate(ATTIVITA, 1)))
+    oggetti = carica(
+        Oggetto,
+        _oggetti(
+            _rnd(seme, "oggetti"),
+            p["locations"],
+            p["oggetti_per_location"],
+            p["profondita"],
+            giorni,
+            oggi,
+        ),
+    )
+    carica(
+        OggettoAttivita,
+        _assegnazioni(
+            _rnd(seme, "assegnazioni"),
+            p["assegnazioni"],
+            oggetti,
+            p["utenti"],
+            giorni,
+            oggi,
+        ),
+    )
+    carica(
+        Nota,
+        _note(
+            _rnd(seme, "note"),
+            p["note"],
+            oggetti,
+            p["locations"],
+            p["utenti"],
+            giorni,
+            oggi,
+        ),
+    )
+    carica(
+        LogOperazione,
+        _log(_rnd(seme, "log"), p["log"], p["utenti"], oggetti, giorni, oggi),
+    )
+
+    inizio = time.perf_counter()
+    bootstrap_schema(bind=engine, forza=True)
+    _allinea_sequenze(engine)
+    if progresso:
+        progresso("indici", None, time.perf_counter() - inizio)
+    return conteggi
+
+
+def _allinea_sequenze(engine):
+    # Con id espliciti le sequenze di PostgreSQL restano indietro
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for tabella in Base.metadata.sorted_tables:
+            if "id" in tabella.c:
+                conn.execute(
+                    text(
+                        "SELECT setval(pg_get_serial_sequence("
+                        f"'{tabella.name}', 'id'), coalesce(max(id), 1)) "
+                        f"FROM {tabella.name}"
+                    )
+                )
+
+
+def crea_database(
+    percorso, seme=1, oggi=None, blocco=50_000, progresso=None, **parametri
+):
+    """Nuovo file SQLite in ``percorso`` popolato con ``genera``; restituisce
+    l'engine"""
+    if os.path.exists(percorso):
+        raise FileExistsError(percorso)
+    engine = create_engine(f"sqlite:///{percorso}")
+    genera(engine, seme, oggi, blocco, progresso, **parametri)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True, help="file SQLite da creare")
+    parser.add_argument("--sovrascrivi", action="store_true")
+    parser.add_argument("--seme", type=int, default=1)
+    parser.add_argument(
+        "--oggi", type=date.fromisoformat, help="data di riferimento (AAAA-MM-GG)"
+    )
+    parser.add_argument("--blocco", type=int, default=50_000)
+    for nome, valore in PARAMETRI_DEFAULT.items():
+        parser.add_argument(f"--{nome.replace('_', '-')}", type=int, default=valore)
+    args = parser.parse_args()
+
+    if args.sovrascrivi and os.path.exists(args.database):
+        os.remove(args.database)
+    parametri = {nome: getattr(args, nome) for nome in PARAMETRI_DEFAULT}
+
+    def progresso(tabella, righe, secondi):
+        if righe is None:
+            print(f"{tabella:<18} {secondi:8.1f} s")
+        else:
+            velocita = righe / secondi if secondi else 0
+            print(
+                f"{tabella:<18} {righe:>10} righe {secondi:8.1f} s"
+                f" ({velocita:,.0f} righe/s)"
+            )
+
+    inizio = time.perf_counter()
+    crea_database(
+        args.database,
+        seme=args.seme,
+        oggi=args.oggi,
+        blocco=args.blocco,
+        progresso=progresso,
+        **parametri,
+    )
+    print(f"Totale: {time.perf_counter() - inizio:.1f} s -> {args.database}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,15 +9,44 @@ from sqlalchemy import (
     ForeignKey,
     Boolean,
     Date,
+    Index,
     text,
+    event,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
 )
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.pool import QueuePool
 from datetime import datetime
 from sqlalchemy import Enum as SqlEnum
+import sqlite3
 import config
 
 Base = declarative_base()
 
+
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite applica vincoli e clausole ON DELETE solo con foreign_keys attivo
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+# Pool di connessioni: con più richieste concorrenti di pool_size +
+# max_overflow le successive attendono fino a pool_timeout secondi
+OPZIONI_POOL = {
+    "pool_size": config.DB_POOL_SIZE,
+    "max_overflow": config.DB_POOL_MAX_OVERFLOW,
+    "pool_timeout": config.DB_POOL_TIMEOUT_SEC,
+}
+
 try:
     if config.DB_TYPE == "mariadb" or config.DB_TYPE == "mysql":
         DB_URL = f"mysql+pymysql://{config.DB_USER}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
@@ -27,7 +56,7 @@ try:
         DB_URL = f"sqlite:///{config.DB_NAME}.db"
     else:
         raise ValueError(f"Tipo di database non supportato: {config.DB_TYPE}")
-    engine = create_engine(DB_URL, echo=False, future=True)
+    engine = create_engine(DB_URL, echo=False, future=True, **OPZIONI_POOL)
     # Test connessione immediata
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
@@ -35,7 +64,7 @@ except Exception as e:
     if getattr(config, "DB_FALLBACK_TO_SQLITE", False):
         print(f"[WARN] Connessione al DB fallita ({e}), passo a SQLite locale!")
         DB_URL = f"sqlite:///boxboard.db"
-        engine = create_engine(DB_URL, echo=False, future=True)
+        engine = create_engine(DB_URL, echo=False, future=True, **OPZIONI_POOL)
     else:
         raise
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
@@ -46,10 +75,134 @@ def get_session():
     return SessionLocal()
 
 
+def stato_pool(bind=None):
+    """Connessioni del pool in uso e saturazione (in uso / massimo)"""
+    pool = (bind or engine).pool
+    if not isinstance(pool, QueuePool):
+        return {"tipo": type(pool).__name__}
+    massimo = pool.size() + max(pool._max_overflow, 0)
+    return {
+        "tipo": type(pool).__name__,
+        "dimensione": pool.size(),
+        "massimo": massimo,
+        "in_uso": pool.checkedout(),
+        "libere": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturazione": round(pool.checkedout() / massimo, 3),
+    }
+
+
+# Versione dello schema dichiarato nei modelli: va incrementata a ogni
+# modifica di tabelle o indici, così il bootstrap la applica al riavvio
+SCHEMA_VERSIONE = 8
+
+
+def crea_indici_mancanti(bind=None):
+    """Crea gli indici dichiarati nei modelli che mancano su tabelle già esistenti"""
+    for tabella in Base.metadata.sorted_tables:
+        for indice in tabella.indexes:
+            indice.create(bind or engine, checkfirst=True)
+
+
+def _clausole_on_delete(conn, tabella):
+    """Clausola ON DELETE presente nel database per ogni colonna con foreign key"""
+    if conn.dialect.name == "sqlite":
+        # Il riflesso di SQLAlchemy non riporta ON DELETE su SQLite
+        righe = conn.exec_driver_sql(f"PRAGMA foreign_key_list({tabella})")
+        return {r[3]: r[6].upper() for r in righe}
+    return {
+        fk["constrained_columns"][0]: (fk["options"].get("ondelete") or "").upper()
+        for fk in inspect(conn).get_foreign_keys(tabella)
+    }
+
+
+def chiavi_esterne_obsolete(bind=None):
+    """Foreign key che nei modelli hanno una clausola ON DELETE e nel database no.
+
+    ``create_all`` non modifica le tabelle esistenti: nei database creati
+    prima delle clausole ON DELETE le cancellazioni con una sola DELETE
+    (``crud.cancella_riga``) falliscono per i vincoli o lasciano righe
+    orfane. Restituisce una lista di ``"tabella.colonna"``.
+    """
+    obsolete = []
+    with (bind or engine).connect() as conn:
+        esistenti = set(inspect(conn).get_table_names())
+        for tabella in Base.metadata.sorted_tables:
+            attese = {
+                fk.parent.name: fk.ondelete.upper()
+                for fk in tabella.foreign_keys
+                if fk.ondelete
+            }
+            if not attese or tabella.name not in esistenti:
+                continue
+            presenti = _clausole_on_delete(conn, tabella.name)
+            obsolete.extend(
+                f"{tabella.name}.{colonna}"
+                for colonna, clausola in attese.items()
+                if presenti.get(colonna) != clausola
+            )
+    return obsolete
+
+
+def versione_schema(bind=None):
+    """Versione registrata in ``metadati_schema``, None se assente"""
+    try:
+        with (bind or engine).connect() as conn:
+            valore = conn.execute(
+                select(MetadatiSchema.valore).where(
+                    MetadatiSchema.chiave == "versione_schema"
+                )
+            ).scalar()
+    except SQLAlchemyError:
+        # Tabella mancante: database nuovo o precedente al bootstrap
+        return None
+    return int(valore) if valore is not None else None
+
+
+def bootstrap_schema(popola=None, bind=None, forza=False):
+    """Porta il database alla versione ``SCHEMA_VERSIONE``.
+
+    Se la versione registrata è già quella corrente costa una sola SELECT;
+    altrimenti crea tabelle, indici e strutture full-text mancanti,
+    segnala le foreign key da ricreare (``chiavi_esterne_obsolete``) e
+    registra la versione. ``popola`` viene chiamata solo su un database
+    appena creato e senza utenti. Restituisce True se lo schema è stato
+    (ri)applicato.
+    """
+    bind = bind or engine
+    versione = versione_schema(bind)
+    if versione == SCHEMA_VERSIONE and not forza:
+        return False
+    Base.metadata.create_all(bind)
+    crea_indici_mancanti(bind)
+    obsolete = chiavi_esterne_obsolete(bind)
+    if obsolete:
+        print(
+            "[WARN] Foreign key senza la clausola ON DELETE dei modelli: "
+            f"{', '.join(obsolete)}. Ricreare le tabelle dagli script createdb-*.sql"
+        )
+    from ricerca import inizializza_ricerca
+
+    inizializza_ricerca(bind)
+    with bind.begin() as conn:
+        conn.execute(
+            delete(MetadatiSchema).where(MetadatiSchema.chiave == "versione_schema")
+        )
+        conn.execute(
+            insert(MetadatiSchema).values(
+                chiave="versione_schema", valore=str(SCHEMA_VERSIONE)
+            )
+        )
+        vuoto = conn.execute(select(func.count()).select_from(Utente)).scalar() == 0
+    if popola is not None and versione is None and vuoto:
+        popola()
+    return True
+
+
 def test_db_connection():
     """Crea le tabelle e testa la connessione al database configurato."""
     try:
-        Base.metadata.create_all(engine)
+        bootstrap_schema(forza=True)
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
         print(f"Connessione e creazione tabelle riuscita su {config.DB_TYPE}!")
@@ -57,6 +210,25 @@ def test_db_connection():
         print(f"Errore di connessione o creazione tabelle: {e}")
 
 
+def _indici_prefisso(tabella):
+    """Indici per la ricerca ``nome LIKE 'prefisso%'`` senza distinzione di
+    maiuscole (vedi ``letture.cerca_per_nome``).
+
+    SQLite usa l'indice per LIKE solo se è in collazione NOCASE; PostgreSQL
+    cerca su ``lower(nome)`` e ha bisogno della classe di operatori
+    ``varchar_pattern_ops``. MariaDB/MySQL usano l'indice semplice su
+    ``nome``, già case-insensitive nella collazione di default.
+    """
+    return (
+        Index(f"ix_{tabella}_nome_nocase", text("nome COLLATE NOCASE")).ddl_if(
+            dialect="sqlite"
+        ),
+        Index(
+            f"ix_{tabella}_nome_prefisso", text("lower(nome) varchar_pattern_ops")
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
 class Utente(Base):
     __tablename__ = "utenti"
     id = Column(Integer, primary_key=True)
@@ -69,8 +241,16 @@ class Utente(Base):
     )
     email = Column(String(255), unique=True)
     # relazioni
-    note = relationship("Nota", back_populates="autore")
-    oggetto_attivita = relationship("OggettoAttivita", back_populates="utente")
+    note = relationship("Nota", back_populates="autore", passive_deletes=True)
+    oggetto_attivita = relationship(
+        "OggettoAttivita", back_populates="utente", passive_deletes=True
+    )
+
+    __table_args__ = (
+        # Ordinamento per nome nelle tabelle e ricerca per prefisso nei selettori
+        Index("ix_utenti_nome", "nome", "id"),
+        *_indici_prefisso("utenti"),
+    )
 
 
 class Location(Base):
@@ -81,8 +261,14 @@ class Location(Base):
     note = Column(Text)
     data_creazione = Column(DateTime, default=datetime.utcnow)
     # relazioni
-    oggetti = relationship("Oggetto", back_populates="location")
-    note_rel = relationship("Nota", back_populates="location")
+    oggetti = relationship("Oggetto", back_populates="location", passive_deletes=True)
+    note_rel = relationship("Nota", back_populates="location", passive_deletes=True)
+
+    __table_args__ = (
+        # Ordinamento per nome nelle tabelle e ricerca per prefisso nei selettori
+        Index("ix_locations_nome", "nome", "id"),
+        *_indici_prefisso("locations"),
+    )
 
 
 class Oggetto(Base):
@@ -106,14 +292,27 @@ class Oggetto(Base):
         SqlEnum("oggetto", "contenitore", name="tipo_enum", native_enum=False),
         default="oggetto",
     )
-    location_id = Column(Integer, ForeignKey("locations.id"))
-    contenitore_id = Column(Integer, ForeignKey("oggetti.id"))
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="SET NULL"))
+    contenitore_id = Column(Integer, ForeignKey("oggetti.id", ondelete="SET NULL"))
     data_rilevamento = Column(DateTime, default=datetime.utcnow)
     # relazioni
     location = relationship("Location", back_populates="oggetti")
     contenitore = relationship("Oggetto", remote_side=[id])
-    attivita = relationship("OggettoAttivita", back_populates="oggetto")
-    note = relationship("Nota", back_populates="oggetto")
+    attivita = relationship(
+        "OggettoAttivita", back_populates="oggetto", passive_deletes=True
+    )
+    note = relationship("Nota", back_populates="oggetto", passive_deletes=True)
+
+    __table_args__ = (
+        # Ordinamento e paginazione keyset per nome nelle tabelle
+        Index("ix_oggetti_nome", "nome", "id"),
+        *_indici_prefisso("oggetti"),
+        # Filtri per location e per contenitore dell'elenco oggetti
+        Index("ix_oggetti_location_nome", "location_id", "nome", "id"),
+        Index("ix_oggetti_contenitore", "contenitore_id"),
+        # Andamento mensile dei rilevamenti (pagina Statistiche)
+        Index("ix_oggetti_data_rilevamento", "data_rilevamento"),
+    )
 
 
 class Attivita(Base):
@@ -122,33 +321,55 @@ class Attivita(Base):
     nome = Column(String(255), nullable=False)
     descrizione = Column(Text)
     # relazioni
-    oggetto_attivita = relationship("OggettoAttivita", back_populates="attivita")
-    note = relationship("Nota", back_populates="attivita")
+    oggetto_attivita = relationship(
+        "OggettoAttivita", back_populates="attivita", passive_deletes=True
+    )
+    note = relationship("Nota", back_populates="attivita", passive_deletes=True)
 
 
 class OggettoAttivita(Base):
     __tablename__ = "oggetto_attivita"
     id = Column(Integer, primary_key=True)
-    oggetto_id = Column(Integer, ForeignKey("oggetti.id"), nullable=False)
-    attivita_id = Column(Integer, ForeignKey("attivita.id"), nullable=False)
+    oggetto_id = Column(
+        Integer, ForeignKey("oggetti.id", ondelete="CASCADE"), nullable=False
+    )
+    attivita_id = Column(
+        Integer, ForeignKey("attivita.id", ondelete="CASCADE"), nullable=False
+    )
     completata = Column(Boolean, default=False)
     data_prevista = Column(Date)
     data_completamento = Column(Date)
-    assegnato_a = Column(Integer, ForeignKey("utenti.id"))
+    assegnato_a = Column(Integer, ForeignKey("utenti.id", ondelete="SET NULL"))
     # relazioni
     oggetto = relationship("Oggetto", back_populates="attivita")
     attivita = relationship("Attivita", back_populates="oggetto_attivita")
     utente = relationship("Utente", back_populates="oggetto_attivita")
 
+    __table_args__ = (
+        # Conteggio delle attività pendenti e scadenze imminenti in Dashboard
+        Index("ix_oggetto_attivita_completata_data", "completata", "data_prevista"),
+        # Andamento mensile dei completamenti (pagina Statistiche)
+        Index(
+            "ix_oggetto_attivita_completata_completamento",
+            "completata",
+            "data_completamento",
+        ),
+        # Cancellazioni a cascata (ON DELETE) da oggetti, attività e utenti e
+        # join per oggetto/utente delle statistiche
+        Index("ix_oggetto_attivita_oggetto", "oggetto_id"),
+        Index("ix_oggetto_attivita_attivita", "attivita_id"),
+        Index("ix_oggetto_attivita_assegnato", "assegnato_a"),
+    )
+
 
 class Nota(Base):
     __tablename__ = "note"
     id = Column(Integer, primary_key=True)
     testo = Column(Text, nullable=False)
-    oggetto_id = Column(Integer, ForeignKey("oggetti.id"))
-    attivita_id = Column(Integer, ForeignKey("attivita.id"))
-    location_id = Column(Integer, ForeignKey("locations.id"))
-    autore_id = Column(Integer, ForeignKey("utenti.id"))
+    oggetto_id = Column(Integer, ForeignKey("oggetti.id", ondelete="CASCADE"))
+    attivita_id = Column(Integer, ForeignKey("attivita.id", ondelete="CASCADE"))
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"))
+    autore_id = Column(Integer, ForeignKey("utenti.id", ondelete="SET NULL"))
     data = Column(DateTime, default=datetime.utcnow)
     # relazioni
     oggetto = relationship("Oggetto", back_populates="note")
@@ -156,14 +377,40 @@ class Nota(Base):
     location = relationship("Location", back_populates="note_rel")
     autore = relationship("Utente", back_populates="note")
 
+    # Note di un oggetto, un'attività o una location in ordine di data
+    # (tabella Note filtrata e paginata); servono anche le cancellazioni a
+    # cascata dalle tabelle collegate
+    __table_args__ = (
+        Index("ix_note_oggetto_data", "oggetto_id", "data", "id"),
+        Index("ix_note_attivita_data", "attivita_id", "data", "id"),
+        Index("ix_note_location_data", "location_id", "data", "id"),
+    )
+
 
 class LogOperazione(Base):
     __tablename__ = "log_operazioni"
     id = Column(Integer, primary_key=True)
-    utente_id = Column(Integer, ForeignKey("utenti.id"), nullable=False)
+    # NULL dopo la cancellazione dell'utente: il log resta integro
+    utente_id = Column(Integer, ForeignKey("utenti.id", ondelete="SET NULL"))
     azione = Column(String(50), nullable=False)  # es: 'create', 'update', 'delete'
     entita = Column(String(50), nullable=False)  # es: 'oggetto', 'utente', ...
     entita_id = Column(Integer, nullable=True)
     dettagli = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
     utente = relationship("Utente")
+
+    # Paginazione keyset su (timestamp, id) e filtri per utente/entità
+    __table_args__ = (
+        Index("ix_log_operazioni_timestamp_id", "timestamp", "id"),
+        Index("ix_log_operazioni_utente_timestamp", "utente_id", "timestamp"),
+        Index("ix_log_operazioni_entita_timestamp", "entita", "timestamp"),
+        Index("ix_log_operazioni_azione_timestamp", "azione", "timestamp"),
+    )
+
+
+class MetadatiSchema(Base):
+    """Chiave/valore sullo stato del database (es. ``versione_schema``)"""
+
+    __tablename__ = "metadati_schema"
+    chiave = Column(String(64), primary_key=True)
+    valore = Column(String(255))
@@ -0,0 +1,165 @@
+"""Bus eventi in-process per il change feed delle entità (SSE).
+
+Le scritture su oggetti, note, oggetto_attivita e locations pubblicano un
+evento con id progressivo. Gli eventi recenti restano in uno storico
+limitato, così un client che si riconnette può riprendere da un id noto.
+Ogni sottoscrizione ha un buffer limitato: se il client è troppo lento il
+buffer viene svuotato e il client riceve un evento ``reset`` che lo invita a
+rileggere i dati completi.
+
+Il bus è per-processo: con più worker ognuno ha il proprio feed.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+
+import config
+
+ENTITA_FEED = ("oggetti", "note", "oggetto_attivita", "locations")
+
+
+class Sottoscrizione:
+    """Coda eventi di un singolo client, con buffer limitato."""
+
+    def __init__(self, entita, max_buffer, loop=None):
+        self.entita = set(entita)
+        self.max_buffer = max_buffer
+        self._coda = deque()
+        self._reset = False
+        self._loop = loop
+        self._segnale = asyncio.Event() if loop is not None else None
+
+    def _consegna(self, evento):
+        # Chiamato dal bus con il lock acquisito
+        if evento["entita"] not in self.entita:
+            return
+        if len(self._coda) >= self.max_buffer:
+            # Client troppo lento: scarto il buffer e segnalo un reset
+            self._coda.clear()
+            self._reset = True
+        else:
+            self._coda.append(evento)
+        self._sveglia()
+
+    def _sveglia(self):
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._segnale.set)
+        except RuntimeError:
+            # Event loop già chiuso: il client è andato via
+            pass
+
+    def _svuota(self):
+        eventi = []
+        if self._reset:
+            eventi.append({"id": None, "entita": None, "azione": "reset"})
+            self._reset = False
+        eventi.extend(self._coda)
+        self._coda.clear()
+        return eventi
+
+
+class BusEventi:
+    """Pubblica gli eventi e li distribuisce alle sottoscrizioni attive."""
+
+    def __init__(self, storico_max=1000, buffer_client_max=100):
+        self._lock = threading.Lock()
+        self._ultimo_id = 0
+        self._storico = deque(maxlen=storico_max)
+        self._sottoscrizioni = set()
+        self._ascoltatori = []
+        self.buffer_client_max = buffer_client_max
+
+    def pubblica(self, entita, azione, entita_id=None):
+        """Registra un evento e lo consegna a tutti i sottoscrittori."""
+        if entita not in ENTITA_FEED:
+            return None
+        with self._lock:
+            self._ultimo_id += 1
+            evento = {
+                "id": self._ultimo_id,
+                "entita": entita,
+                "azione": azione,
+                "entita_id": entita_id,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+            self._storico.append(evento)
+            for sott in self._sottoscrizioni:
+                sott._consegna(evento)
+            ascoltatori = list(self._ascoltatori)
+        for callback in ascoltatori:
+            try:
+                callback(evento)
+            except Exception as e:
+                print(f"Errore ascoltatore eventi: {e}")
+        return evento
+
+    def sottoscrivi(self, entita=None, dal_id=None, loop=None):
+        """Crea una sottoscrizione, opzionalmente ripartendo da ``dal_id``.
+
+        Se ``dal_id`` è più vecchio dello storico disponibile il primo
+        evento consegnato è un ``reset``.
+        """
+        sott = Sottoscrizione(entita or ENTITA_FEED, self.buffer_client_max, loop=loop)
+        with self._lock:
+            if dal_id is not None:
+                inizio = (
+                    self._storico[0]["id"] if self._storico else self._ultimo_id + 1
+                )
+                # Eventi usciti dallo storico o id di un processo precedente
+                if dal_id > self._ultimo_id or inizio > dal_id + 1:
+                    sott._reset = True
+                for evento in self._storico:
+                    if evento["id"] > dal_id:
+                        sott._consegna(evento)
+            self._sottoscrizioni.add(sott)
+        return sott
+
+    def annulla(self, sott):
+        with self._lock:
+            self._sottoscrizioni.discard(sott)
+
+    def aggiungi_ascoltatore(self, callback):
+        """Registra una callback sincrona chiamata ad ogni evento."""
+        with self._lock:
+            self._ascoltatori.append(callback)
+
+    def rimuovi_ascoltatore(self, callback):
+        with self._lock:
+            if callback in self._ascoltatori:
+                self._ascoltatori.remove(callback)
+
+    def preleva(self, sott):
+        """Restituisce (e rimuove) gli eventi in coda per la sottoscrizione."""
+        with self._lock:
+            return sott._svuota()
+
+    async def attendi(self, sott, timeout):
+        """Attende nuovi eventi fino a ``timeout`` secondi (lista vuota se nessuno)."""
+        eventi = self.preleva(sott)
+        if eventi:
+            return eventi
+        try:
+            await asyncio.wait_for(sott._segnale.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        sott._segnale.clear()
+        return self.preleva(sott)
+
+    @property
+    def ultimo_id(self):
+        return self._ultimo_id
+
+
+bus = BusEventi(
+    storico_max=config.EVENTI_STORICO_MAX,
+    buffer_client_max=config.EVENTI_BUFFER_CLIENT,
+)
+
+
+def pubblica_evento(entita, azione, entita_id=None):
+    """Scorciatoia per pubblicare sul bus di processo."""
+    return bus.pubblica(entita, azione, entita_id)
@@ -0,0 +1,241 @@
+"""Query di sola lettura per l'interfaccia Streamlit.
+
+Le funzioni restituiscono liste di ``Riga``: dict semplici (quindi
+serializzabili per ``st.cache_data`` e pronti per ``pd.DataFrame``) che si
+leggono sia come ``riga["nome"]`` sia come ``riga.nome``. I nomi collegati
+(oggetto, attività, location, autore) arrivano già risolti con una join.
+
+Le tabelle dell'interfaccia leggono una pagina alla volta con ``pagina()``:
+paginazione keyset sulla colonna di ordinamento scelta, con l'id come
+spareggio, così il costo di una pagina non dipende da quanto è avanti.
+
+I selettori leggono con ``cerca_per_nome()`` solo le prime righe il cui nome
+inizia con il testo digitato, da un indice sul nome.
+"""
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import aliased
+
+from db import get_session, Utente, Location, Oggetto, Attivita, OggettoAttivita, Nota
+
+
+class Riga(dict):
+    """Riga di risultato: dict leggibile anche per attributo (``r.nome``)"""
+
+    __slots__ = ()
+
+    def __getattr__(self, nome):
+        try:
+            return self[nome]
+        except KeyError:
+            raise AttributeError(nome) from None
+
+
+def riga(oggetto):
+    """Converte un'istanza ORM in ``Riga`` con i valori delle colonne"""
+    return Riga({c.key: getattr(oggetto, c.key) for c in oggetto.__table__.columns})
+
+
+def _righe(query):
+    with get_session() as session:
+        return [Riga(r) for r in session.execute(query).mappings()]
+
+
+def _query_oggetti(location_id=None, stato=None, tipo=None, contenitore_id=None):
+    # Read model dell'elenco oggetti: colonne della tabella più i nomi di
+    # location e contenitore (self-join su oggetti), in una sola query
+    contenitore = aliased(Oggetto)
+    query = (
+        select(
+            *Oggetto.__table__.columns,
+            Location.nome.label("location_nome"),
+            contenitore.nome.label("contenitore_nome"),
+        )
+        .outerjoin(Location, Oggetto.location_id == Location.id)
+        .outerjoin(contenitore, Oggetto.contenitore_id == contenitore.id)
+    )
+    if location_id:
+        query = query.where(Oggetto.location_id == location_id)
+    if stato:
+        query = query.where(Oggetto.stato == stato)
+    if tipo:
+        query = query.where(Oggetto.tipo == tipo)
+    if contenitore_id:
+        query = query.where(Oggetto.contenitore_id == contenitore_id)
+    return query
+
+
+def oggetti(location_id=None, stato=None, tipo=None, contenitore_id=None):
+    """Oggetti con filtri opzionali e nomi di location e contenitore, per nome"""
+    query = _query_oggetti(location_id, stato, tipo, contenitore_id)
+    return _righe(query.order_by(Oggetto.nome))
+
+
+def oggetto_attivita():
+    """Assegnazioni con nome di oggetto, attività e utente assegnato"""
+    query = (
+        select(
+            *OggettoAttivita.__table__.columns,
+            Oggetto.nome.label("oggetto_nome"),
+            Attivita.nome.label("attivita_nome"),
+            Utente.nome.label("assegnato_nome"),
+        )
+        .join(Oggetto, OggettoAttivita.oggetto_id == Oggetto.id)
+        .join(Attivita, OggettoAttivita.attivita_id == Attivita.id)
+        .outerjoin(Utente, OggettoAttivita.assegnato_a == Utente.id)
+        .order_by(OggettoAttivita.data_prevista)
+    )
+    return _righe(query)
+
+
+def _query_note(oggetto_id=None, attivita_id=None, location_id=None):
+    query = (
+        select(
+            *Nota.__table__.columns,
+            Oggetto.nome.label("oggetto_nome"),
+            Attivita.nome.label("attivita_nome"),
+            Location.nome.label("location_nome"),
+            Utente.nome.label("autore_nome"),
+        )
+        .outerjoin(Oggetto, Nota.oggetto_id == Oggetto.id)
+        .outerjoin(Attivita, Nota.attivita_id == Attivita.id)
+        .outerjoin(Location, Nota.location_id == Location.id)
+        .outerjoin(Utente, Nota.autore_id == Utente.id)
+    )
+    if oggetto_id:
+        query = query.where(Nota.oggetto_id == oggetto_id)
+    if attivita_id:
+        query = query.where(Nota.attivita_id == attivita_id)
+    if location_id:
+        query = query.where(Nota.location_id == location_id)
+    return query
+
+
+def note(oggetto_id=None, attivita_id=None, location_id=None):
+    """Note con filtri opzionali e i nomi delle entità collegate"""
+    return _righe(_query_note(oggetto_id, attivita_id, location_id).order_by(Nota.data))
+
+
+def _query_utenti():
+    return select(Utente.id, Utente.nome, Utente.ruolo, Utente.email)
+
+
+def _query_locations():
+    return select(*Location.__table__.columns)
+
+
+# Elenchi paginabili: costruttore della query filtrata e colonna id
+ELENCHI = {
+    "oggetti": (_query_oggetti, Oggetto.id),
+    "note": (_query_note, Nota.id),
+    "utenti": (_query_utenti, Utente.id),
+    "locations": (_query_locations, Location.id),
+}
+
+
+# Entità dei selettori con ricerca per prefisso: query di base e modello
+CERCABILI = {
+    "oggetti": (lambda: select(*Oggetto.__table__.columns), Oggetto),
+    "utenti": (_query_utenti, Utente),
+    "locations": (_query_locations, Location),
+}
+
+
+def _escape_like(testo):
+    return testo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def cerca_per_nome(entita, prefisso="", limit=20, **filtri):
+    """Prime ``limit`` righe di ``entita`` il cui nome inizia con ``prefisso``.
+
+    Il confronto non distingue maiuscole e minuscole; le righe sono in
+    ordine di nome. ``filtri`` sono uguaglianze su colonne del modello
+    (es. ``tipo="contenitore"``). La condizione è ``nome LIKE 'prefisso%'``
+    con il pattern come unico parametro, nella forma che ogni database sa
+    servire dagli indici di ``db._indici_prefisso``.
+    """
+    try:
+        costruttore, modello = CERCABILI[entita]
+    except KeyError:
+        raise ValueError(f"Entità non ricercabile per nome: {entita}") from None
+    query = costruttore()
+    for colonna, valore in filtri.items():
+        query = query.where(getattr(modello, colonna) == valore)
+    with get_session() as session:
+        dialetto = session.get_bind().dialect.name
+        if dialetto == "sqlite":
+            # LIKE è già case-insensitive: l'indice NOCASE serve anche l'ordine
+            chiave, ordine = modello.nome, modello.nome.collate("NOCASE")
+        elif dialetto == "postgresql":
+            chiave = ordine = func.lower(modello.nome)
+            prefisso = prefisso.lower()
+        else:
+            chiave = ordine = modello.nome
+        if prefisso:
+            query = query.where(chiave.like(_escape_like(prefisso) + "%", escape="\\"))
+        query = query.order_by(ordine, modello.id).limit(limit)
+        return [Riga(r) for r in session.execute(query).mappings()]
+
+
+def _elenco(entita, filtri):
+    try:
+        costruttore, chiave = ELENCHI[entita]
+    except KeyError:
+        raise ValueError(f"Elenco non paginabile: {entita}") from None
+    return costruttore(**(filtri or {})), chiave
+
+
+def conta(entita, filtri=None):
+    """Numero di righe dell'elenco ``entita`` con i filtri dati"""
+    query, _ = _elenco(entita, filtri)
+    totale = select(func.count()).select_from(query.subquery())
+    with get_session() as session:
+        return session.execute(totale).scalar()
+
+
+def pagina(entita, filtri=None, ordina="id", discendente=False, limit=50, dopo=None):
+    """Restituisce ``(righe, prossimo)`` per una pagina dell'elenco ``entita``.
+
+    ``ordina`` è il nome di una colonna dell'elenco (anche un nome collegato
+    come ``autore_nome``); i NULL stanno in fondo in ordine crescente e in
+    cima in ordine decrescente su ogni database. ``dopo`` è il ``prossimo``
+    della pagina precedente, una tupla ``(valore, id)``; ``prossimo`` è None
+    sull'ultima pagina.
+    """
+    query, chiave = _elenco(entita, filtri)
+    try:
+        colonna = query.selected_columns[ordina]
+    except KeyError:
+        raise ValueError(f"Colonna di ordinamento non valida: {ordina}") from None
+    # Le colonne NOT NULL non hanno bisogno della chiave "è nullo", che
+    # impedirebbe di usare un indice per l'ordinamento
+    annullabile = getattr(colonna, "nullable", True)
+    if dopo is not None:
+        valore, ultimo_id = dopo
+        if discendente and valore is None:
+            condizione = or_(
+                colonna.is_not(None), and_(colonna.is_(None), chiave < ultimo_id)
+            )
+        elif discendente:
+            condizione = or_(
+                colonna < valore, and_(colonna == valore, chiave < ultimo_id)
+            )
+        elif valore is None:
+            condizione = and_(colonna.is_(None), chiave > ultimo_id)
+        else:
+            successive = [colonna > valore, and_(colonna == valore, chiave > ultimo_id)]
+            if annullabile:
+                successive.append(colonna.is_(None))
+            condizione = or_(*successive)
+        query = query.where(condizione)
+    ordine = (colonna, chiave)
+    if annullabile:
+        ordine = (case((colonna.is_(None), 1), else_=0),) + ordine
+    if discendente:
+        ordine = tuple(c.desc() for c in ordine)
+    righe = _righe(query.order_by(*ordine).limit(limit + 1))
+    prossimo = None
+    if len(righe) > limit:
+        ultima = righe[limit - 1]
+        prossimo = (ultima[ordina], ultima[chiave.key])
+    return righe[:limit], prossimo
@@ -1,89 +1,189 @@
-from crud import add_utente, add_location, add_oggetto, add_attivita, add_oggetto_attivita, add_nota
+from crud import add_many, unit_of_work
 from datetime import datetime
 
 # Rimuovo 'from app import (' se non usato
 
 
+def _data(testo):
+    return datetime.strptime(testo, "%Y-%m-%d").date()
+
+
 def popola_mock():
     print("Popolamento dati di esempio...")
-    # Utenti
-    u1 = add_utente("Mario Rossi", "Operatore", "mario@example.com")
-    u2 = add_utente("Luigi Bianchi", "Coordinatore", "luigi@example.com")
-    u3 = add_utente("Anna Verdi", "Altro", "anna@example.com")
+    # Un'unica transazione, una INSERT multi-riga per entità
+    with unit_of_work():
+        # Utenti
+        u1, u2, u3 = add_many(
+            "utenti",
+            [
+                {
+                    "nome": "Mario Rossi",
+                    "ruolo": "Operatore",
+                    "email": "mario@example.com",
+                },
+                {
+                    "nome": "Luigi Bianchi",
+                    "ruolo": "Coordinatore",
+                    "email": "luigi@example.com",
+                },
+                {"nome": "Anna Verdi", "ruolo": "Altro", "email": "anna@example.com"},
+            ],
+        )
 
-    # Location
-    l1 = add_location("Magazzino Centrale", "Via Roma 1", "Sede principale")
-    l2 = add_location("Deposito Nord", "Via Milano 10", "")
-    l3 = add_location("Cantina Sud", "Via Napoli 5", "")
-    l4 = add_location("Box Garage", "Via Torino 22", "")
+        # Location
+        l1, l2, l3, l4 = add_many(
+            "locations",
+            [
+                {
+                    "nome": "Magazzino Centrale",
+                    "indirizzo": "Via Roma 1",
+                    "note": "Sede principale",
+                },
+                {"nome": "Deposito Nord", "indirizzo": "Via Milano 10", "note": ""},
+                {"nome": "Cantina Sud", "indirizzo": "Via Napoli 5", "note": ""},
+                {"nome": "Box Garage", "indirizzo": "Via Torino 22", "note": ""},
+            ],
+        )
 
-    # Attività
-    a1 = add_attivita("Valutazione", "Valutare il valore dell'oggetto")
-    a2 = add_attivita("Trasporto", "Trasportare l'oggetto al deposito")
-    a3 = add_attivita("Pulizia", "Pulire e igienizzare l'oggetto")
-    a4 = add_attivita("Catalogazione", "Catalogare e fotografare l'oggetto")
+        # Attività
+        a1, a2, a3, a4 = add_many(
+            "attivita",
+            [
+                {
+                    "nome": "Valutazione",
+                    "descrizione": "Valutare il valore dell'oggetto",
+                },
+                {
+                    "nome": "Trasporto",
+                    "descrizione": "Trasportare l'oggetto al deposito",
+                },
+                {"nome": "Pulizia", "descrizione": "Pulire e igienizzare l'oggetto"},
+                {
+                    "nome": "Catalogazione",
+                    "descrizione": "Catalogare e fotografare l'oggetto",
+                },
+            ],
+        )
 
-    # Contenitori
-    c1 = add_oggetto(
-        "Scatola Grande Cartone",
-        "Scatola di cartone 60x40x40cm",
-        "da_rimuovere",
-        "contenitore",
-        l1,
-    )
-    c2 = add_oggetto(
-        "Baule Antico", "Baule in legno d'epoca", "in_attesa", "contenitore", l2
-    )
-    c3 = add_oggetto(
-        "Cassetta Plastica",
-        "Cassetta in plastica trasparente",
-        "da_rimuovere",
-        "contenitore",
-        l1,
-    )
-    c4 = add_oggetto(
-        "Valigia Vintage", "Valigia anni '70 in pelle", "venduto", "contenitore", l3
-    )
+        # Contenitori
+        c1, c2, c3, c4 = add_many(
+            "oggetti",
+            [
+                {
+                    "nome": "Scatola Grande Cartone",
+                    "descrizione": "Scatola di cartone 60x40x40cm",
+                    "stato": "da_rimuovere",
+                    "tipo": "contenitore",
+                    "location_id": l1,
+                },
+                {
+                    "nome": "Baule Antico",
+                    "descrizione": "Baule in legno d'epoca",
+                    "stato": "in_attesa",
+                    "tipo": "contenitore",
+                    "location_id": l2,
+                },
+                {
+                    "nome": "Cassetta Plastica",
+                    "descrizione": "Cassetta in plastica trasparente",
+                    "stato": "da_rimuovere",
+                    "tipo": "contenitore",
+                    "location_id": l1,
+                },
+                {
+                    "nome": "Valigia Vintage",
+                    "descrizione": "Valigia anni '70 in pelle",
+                    "stato": "venduto",
+                    "tipo": "contenitore",
+                    "location_id": l3,
+                },
+            ],
+        )
 
-    # Oggetti semplici
-    o1 = add_oggetto(
-        "Lampada da Tavolo",
-        "Lampada vintage in ottone",
-        "da_rimuovere",
-        "oggetto",
-        l1,
-        c1,
-    )
-    o3 = add_oggetto(
-        "Orologio da Parete", "Orologio a pendolo", "in_attesa", "oggetto", l2, c2
-    )
-    o6 = add_oggetto(
-        "Poltrona", "Poltrona in pelle marrone", "da_rimuovere", "oggetto", l4
-    )
-    o8 = add_oggetto(
-        "Specchio", "Specchio con cornice dorata", "in_attesa", "oggetto", l1, c3
-    )
+        # Oggetti semplici
+        o1, o3, o6, o8 = add_many(
+            "oggetti",
+            [
+                {
+                    "nome": "Lampada da Tavolo",
+                    "descrizione": "Lampada vintage in ottone",
+                    "stato": "da_rimuovere",
+                    "tipo": "oggetto",
+                    "location_id": l1,
+                    "contenitore_id": c1,
+                },
+                {
+                    "nome": "Orologio da Parete",
+                    "descrizione": "Orologio a pendolo",
+                    "stato": "in_attesa",
+                    "tipo": "oggetto",
+                    "location_id": l2,
+                    "contenitore_id": c2,
+                },
+                {
+                    "nome": "Poltrona",
+                    "descrizione": "Poltrona in pelle marrone",
+                    "stato": "da_rimuovere",
+                    "tipo": "oggetto",
+                    "location_id": l4,
+                },
+                {
+                    "nome": "Specchio",
+                    "descrizione": "Specchio con cornice dorata",
+                    "stato": "in_attesa",
+                    "tipo": "oggetto",
+                    "location_id": l1,
+                    "contenitore_id": c3,
+                },
+            ],
+        )
 
-    # Assegnazioni attività
-    add_oggetto_attivita(o1, a1, datetime.strptime("2024-07-01", "%Y-%m-%d").date(), u1)
-    add_oggetto_attivita(o1, a3, datetime.strptime("2024-06-15", "%Y-%m-%d").date(), u2)
-    add_oggetto_attivita(o3, a2, datetime.strptime("2024-07-10", "%Y-%m-%d").date(), u1)
-    add_oggetto_attivita(o6, a1, datetime.strptime("2024-07-05", "%Y-%m-%d").date(), u3)
-    add_oggetto_attivita(o8, a4, datetime.strptime("2024-06-20", "%Y-%m-%d").date(), u2)
+        # Assegnazioni attività
+        add_many(
+            "oggetto_attivita",
+            [
+                {
+                    "oggetto_id": oggetto_id,
+                    "attivita_id": attivita_id,
+                    "data_prevista": _data(data_prevista),
+                    "assegnato_a": utente_id,
+                }
+                for oggetto_id, attivita_id, data_prevista, utente_id in [
+                    (o1, a1, "2024-07-01", u1),
+                    (o1, a3, "2024-06-15", u2),
+                    (o3, a2, "2024-07-10", u1),
+                    (o6, a1, "2024-07-05", u3),
+                    (o8, a4, "2024-06-20", u2),
+                ]
+            ],
+        )
 
-    # Note
-    add_nota(
-        "Oggetto in buone condizioni, da valutare per vendita", o1, None, None, u1
-    )
-    add_nota("Trasporto programmato per venerdì mattina", None, a2, None, u2)
-    add_nota("Location molto umida, attenzione alla muffa", None, None, l3, u1)
-    add_nota(
-        "Attività completata in anticipo rispetto alla scadenza",
-        None,
-        a1,
-        None,
-        u3,
-    )
+        # Note
+        add_many(
+            "note",
+            [
+                {
+                    "testo": "Oggetto in buone condizioni, da valutare per vendita",
+                    "oggetto_id": o1,
+                    "autore_id": u1,
+                },
+                {
+                    "testo": "Trasporto programmato per venerdì mattina",
+                    "attivita_id": a2,
+                    "autore_id": u2,
+                },
+                {
+                    "testo": "Location molto umida, attenzione alla muffa",
+                    "location_id": l3,
+                    "autore_id": u1,
+                },
+                {
+                    "testo": "Attività completata in anticipo rispetto alla scadenza",
+                    "attivita_id": a1,
+                    "autore_id": u3,
+                },
+            ],
+        )
 
     print("Dati di esempio inseriti!")
 
@@ -0,0 +1,285 @@
+"""Piani di esecuzione delle query più frequenti e controllo degli indici.
+
+``QUERY_CALDE`` registra le query che reggono le pagine e le API più usate,
+costruite con gli stessi costruttori del codice applicativo (``letture``,
+``audit``) o con la stessa forma delle query di ``api.py``. Per ognuna
+indica la tabella principale e se ci si aspetta che sia letta tramite un
+indice oppure per intero (gli export leggono tutta la tabella per
+definizione).
+
+``spiega()`` esegue ``EXPLAIN QUERY PLAN`` su SQLite ed ``EXPLAIN`` su
+PostgreSQL e MariaDB/MySQL e riduce il piano a una lista di accessi
+``(tabella, tipo, indice)``, con tipo ``indice`` (ricerca per chiave o
+intervallo), ``scansione indice`` (lettura completa di un indice) o
+``scansione`` (lettura completa della tabella).
+
+    python piani.py                 # piani del database configurato
+    python piani.py --verifica      # esce con 1 se un indice atteso manca
+    python piani.py --database sintetico.db --dettagli
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+import audit
+import letture
+from db import Nota, Oggetto, OggettoAttivita, Utente
+
+INDICE = "indice"
+SCANSIONE = "scansione"
+SCANSIONE_INDICE = "scansione indice"
+
+
+class Spiega(Executable, ClauseElement):
+    """``EXPLAIN`` di una query, compilato secondo il dialetto"""
+
+    inherit_cache = False
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiles(Spiega)
+def _spiega(elemento, compilatore, **kw):
+    return "EXPLAIN " + compilatore.process(elemento.query, **kw)
+
+
+@compiles(Spiega, "sqlite")
+def _spiega_sqlite(elemento, compilatore, **kw):
+    return "EXPLAIN QUERY PLAN " + compilatore.process(elemento.query, **kw)
+
+
+class QueryCalda:
+    """Query registrata: costruttore, tabella principale e accesso atteso"""
+
+    def __init__(self, costruisci, tabella, atteso=INDICE, descrizione=""):
+        self.costruisci = costruisci
+        self.tabella = tabella
+        self.atteso = atteso
+        self.descrizione = descrizione
+
+
+_oggetti = letture.ELENCHI["oggetti"][0]
+_note = letture.ELENCHI["note"][0]
+# Cursore di una pagina successiva della paginazione keyset del log
+_CURSORE_LOG = (datetime(2026, 1, 1), 1000)
+
+QUERY_CALDE = {
+    "oggetti_per_location": QueryCalda(
+        lambda: _oggetti(location_id=1).order_by(Oggetto.nome),
+        "oggetti",
+        descrizione="GET /oggetti?location_id, tabella Oggetti filtrata",
+    ),
+    "oggetti_per_contenitore": QueryCalda(
+        lambda: _oggetti(contenitore_id=1).order_by(Oggetto.nome),
+        "oggetti",
+        descrizione="contenuto di un contenitore",
+    ),
+    "note_per_oggetto": QueryCalda(
+        lambda: _note(oggetto_id=1).order_by(Nota.data),
+        "note",
+        descrizione="note di un oggetto (tabella Note filtrata)",
+    ),
+    "note_per_location": QueryCalda(
+        lambda: _note(location_id=1).order_by(Nota.data),
+        "note",
+        descrizione="note di una location (tabella Note filtrata)",
+    ),
+    "assegnazioni_per_oggetto": QueryCalda(
+        lambda: select(OggettoAttivita.id).where(OggettoAttivita.oggetto_id == 1),
+        "oggetto_attivita",
+        descrizione="ON DELETE CASCADE da oggetti (delete_oggetto, delete_many)",
+    ),
+    "assegnazioni_per_attivita": QueryCalda(
+        lambda: select(OggettoAttivita.id).where(OggettoAttivita.attivita_id == 1),
+        "oggetto_attivita",
+        descrizione="ON DELETE CASCADE da attivita",
+    ),
+    "assegnazioni_per_utente": QueryCalda(
+        lambda: select(OggettoAttivita.id).where(OggettoAttivita.assegnato_a == 1),
+        "oggetto_attivita",
+        descrizione="ON DELETE SET NULL da utenti, attività per utente",
+    ),
+    "log_pagina": QueryCalda(
+        lambda: audit.query_log(dopo=_CURSORE_LOG, limit=101),
+        "log_operazioni",
+        descrizione="pagina del log operazioni (keyset)",
+    ),
+    "log_per_utente": QueryCalda(
+        lambda: audit.query_log(utente_id=1, limit=101),
+        "log_operazioni",
+        descrizione="log operazioni filtrato per utente",
+    ),
+    "auth_per_email": QueryCalda(
+        lambda: select(Utente).where(Utente.email == "utente@boxboard").limit(1),
+        "utenti",
+        descrizione="api.get_user_by_email, a ogni richiesta autenticata",
+    ),
+    "export_oggetti": QueryCalda(
+        lambda: select(Oggetto),
+        "oggetti",
+        SCANSIONE,
+        descrizione="GET /export/oggetti, tutta la tabella",
+    ),
+    "export_note": QueryCalda(
+        lambda: select(Nota),
+        "note",
+        SCANSIONE,
+        descrizione="GET /export/note, tutta la tabella",
+    ),
+}
+
+
+# --- LETTURA DEI PIANI ---
+_SQLITE = re.compile(
+    r"^(?P<op>SCAN|SEARCH) (?:TABLE )?(?P<tabella>\S+)"
+    r"(?: AS \S+)?"
+    r"(?: USING (?P<tipo>.*?INDEX|INTEGER PRIMARY KEY)(?: (?P<indice>\S+))?)?"
+)
+_PG = re.compile(
+    r"(?P<op>Seq Scan|Index Only Scan|Index Scan|Bitmap Heap Scan)"
+    r"(?: Backward)?(?: using (?P<indice>\S+))? on (?P<tabella>\S+)"
+)
+
+
+def _accessi_sqlite(righe):
+    accessi = []
+    for riga in righe:
+        m = _SQLITE.match(riga[-1])
+        if not m:
+            continue
+        if m["op"] == "SEARCH":
+            tipo = INDICE
+        else:
+            tipo = SCANSIONE_INDICE if m["tipo"] else SCANSIONE
+        indice = m["indice"] or ("rowid" if m["tipo"] else None)
+        accessi.append((m["tabella"], tipo, indice))
+    return accessi
+
+
+def _accessi_pg(righe):
+    accessi = []
+    for (riga,) in righe:
+        m = _PG.search(riga)
+        if not m:
+            continue
+        tipo = SCANSIONE if m["op"] == "Seq Scan" else INDICE
+        accessi.append((m["tabella"], tipo, m["indice"]))
+    return accessi
+
+
+def _accessi_mysql(righe):
+    accessi = []
+    for riga in righe:
+        tipo_join = riga.get("type")
+        if tipo_join == "ALL":
+            tipo = SCANSIONE
+        elif tipo_join == "index":
+            tipo = SCANSIONE_INDICE
+        else:
+            tipo = INDICE
+        accessi.append((riga["table"], tipo, riga.get("key")))
+    return accessi
+
+
+def spiega(query, bind):
+    """Restituisce ``(righe del piano come testo, accessi)`` di ``query``"""
+    with bind.connect() as conn:
+        dialetto = conn.dialect.name
+        # Righe lette dal cursore DBAPI: il risultato applicherebbe i tipi
+        # delle colonne della query alle colonne del piano
+        cursore = conn.execute(Spiega(query)).cursor
+        colonne = [c[0] for c in cursore.description]
+        righe = cursore.fetchall()
+    if dialetto in ("mysql", "mariadb"):
+        righe = [dict(zip(colonne, r)) for r in righe]
+        return [str(r) for r in righe], _accessi_mysql(righe)
+    if dialetto == "sqlite":
+        return [r[-1] for r in righe], _accessi_sqlite(righe)
+    return [r[0] for r in righe], _accessi_pg(righe)
+
+
+def analizza(bind, nomi=None):
+    """Piano di ogni query registrata (o di quelle in ``nomi``).
+
+    Ogni voce ha ``nome``, ``tabella``, ``atteso``, ``accesso`` (come viene
+    letta la tabella principale), ``indici``, ``piano`` e ``regressione``:
+    True se era atteso un indice e la tabella è letta per intero.
+    """
+    risultati = []
+    for nome, voce in QUERY_CALDE.items():
+        if nomi and nome not in nomi:
+            continue
+        piano, accessi = spiega(voce.costruisci(), bind)
+        propri = [a for a in accessi if a[0] == voce.tabella]
+        if not propri:
+            accesso = "?"
+        elif any(tipo != INDICE for _, tipo, _ in propri):
+            accesso = next(tipo for _, tipo, _ in propri if tipo != INDICE)
+        else:
+            accesso = INDICE
+        risultati.append(
+            {
+                "nome": nome,
+                "tabella": voce.tabella,
+                "atteso": voce.atteso,
+                "accesso": accesso,
+                "indici": sorted({a[2] for a in propri if a[2]}),
+                "piano": piano,
+                "regressione": voce.atteso == INDICE and accesso != INDICE,
+            }
+        )
+    return risultati
+
+
+def stampa(risultati, dettagli=False):
+    for r in risultati:
+        segno = "REGRESSIONE" if r["regressione"] else ""
+        indici = ", ".join(r["indici"]) or "-"
+        print(
+            f"{r['nome']:<26} {r['tabella']:<15} {r['accesso']:<17}"
+            f" {indici:<36} {segno}"
+        )
+        if dettagli or r["regressione"]:
+            for riga in r["piano"]:
+                print(f"    {riga}")
+    regressioni = sum(r["regressione"] for r in risultati)
+    print(f"{len(risultati)} query, {regressioni} senza l'indice atteso")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="file SQLite (default: DB configurato)")
+    parser.add_argument("--query", help="nomi separati da virgola (default: tutte)")
+    parser.add_argument("--dettagli", action="store_true", help="piani completi")
+    parser.add_argument(
+        "--verifica", action="store_true", help="esce con 1 se manca un indice atteso"
+    )
+    args = parser.parse_args()
+    if args.database:
+        if not os.path.exists(args.database):
+            parser.error(f"{args.database} non esiste")
+        bind = create_engine(f"sqlite:///{args.database}")
+    else:
+        from db import engine as bind
+    nomi = [n.strip() for n in args.query.split(",")] if args.query else None
+    sconosciute = [n for n in nomi or [] if n not in QUERY_CALDE]
+    if sconosciute:
+        parser.error(f"query sconosciute: {', '.join(sconosciute)}")
+    risultati = analizza(bind, nomi)
+    stampa(risultati, args.dettagli)
+    if args.verifica and any(r["regressione"] for r in risultati):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
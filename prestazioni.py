@@ -0,0 +1,142 @@
+"""Misura dei tempi di render delle pagine Streamlit.
+
+``misura(pagina)`` avvolge una funzione di pagina di ``app.py`` e registra:
+
+- il tempo totale;
+- numero e tempo delle query SQL eseguite nel thread della pagina (listener
+  ``before/after_cursor_execute`` su tutti gli engine; le letture servite
+  da ``st.cache_data`` o da ``anagrafiche`` non costano query);
+- righe, colonne e memoria dei DataFrame passati a ``mostra()``, con il
+  tempo delle chiamate Streamlit che li serializzano (``st.dataframe``,
+  ``st.bar_chart``...).
+
+Il resto del tempo è Python e pandas. Le ultime
+``config.PRESTAZIONI_STORICO`` misure di ogni pagina sono conservate in
+memoria per processo, condivise tra le sessioni.
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+_locale = threading.local()
+_lock = threading.Lock()
+_storico = {}
+
+
+class MisuraPagina:
+    """Tempi, query e DataFrame di un render di pagina"""
+
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.totale_ms = 0.0
+        self.query = 0
+        self.sql_ms = 0.0
+        self.rendering_ms = 0.0
+        self.dataframe = []  # (funzione, righe, colonne, byte)
+
+    @property
+    def python_ms(self):
+        return max(self.totale_ms - self.sql_ms - self.rendering_ms, 0.0)
+
+
+def corrente():
+    """Misura in corso nel thread, o None"""
+    return getattr(_locale, "misura", None)
+
+
+@contextmanager
+def misura(pagina):
+    """Misura il blocco come render di ``pagina`` e lo aggiunge allo storico.
+
+    Se il blocco termina con un'eccezione (anche ``st.rerun()`` e
+    ``st.stop()``) il render è incompleto e non viene registrato.
+    """
+    risultato = MisuraPagina(pagina)
+    precedente = corrente()
+    _locale.misura = risultato
+    inizio = time.perf_counter()
+    try:
+        yield risultato
+    finally:
+        _locale.misura = precedente
+    risultato.totale_ms = (time.perf_counter() - inizio) * 1000
+    with _lock:
+        if pagina not in _storico:
+            _storico[pagina] = deque(maxlen=config.PRESTAZIONI_STORICO)
+        _storico[pagina].append(risultato)
+
+
+def mostra(funzione, dati, *args, **kwargs):
+    """``funzione(dati, ...)`` (es. ``st.dataframe``), misurandone tempo e
+    dimensione dei dati se c'è una misura in corso"""
+    misura_corrente = corrente()
+    if misura_corrente is None:
+        return funzione(dati, *args, **kwargs)
+    if isinstance(dati, (pd.DataFrame, pd.Series)):
+        colonne = dati.shape[1] if dati.ndim == 2 else 1
+        byte = int(dati.memory_usage(deep=True).sum())
+        misura_corrente.dataframe.append((funzione.__name__, len(dati), colonne, byte))
+    elif isinstance(dati, list):
+        colonne = len(dati[0]) if dati and isinstance(dati[0], dict) else 1
+        misura_corrente.dataframe.append((funzione.__name__, len(dati), colonne, 0))
+    inizio = time.perf_counter()
+    try:
+        return funzione(dati, *args, **kwargs)
+    finally:
+        misura_corrente.rendering_ms += (time.perf_counter() - inizio) * 1000
+
+
+def storico(pagina):
+    """Misure conservate di ``pagina``, dalla più vecchia"""
+    with _lock:
+        return list(_storico.get(pagina, ()))
+
+
+def riepilogo():
+    """Per ogni pagina: render misurati, mediana e p95 del tempo, query medie"""
+    with _lock:
+        copie = {pagina: list(misure) for pagina, misure in _storico.items()}
+    righe = []
+    for pagina, misure in sorted(copie.items()):
+        tempi = sorted(m.totale_ms for m in misure)
+        righe.append(
+            {
+                "pagina": pagina,
+                "render": len(misure),
+                "mediana_ms": round(statistics.median(tempi), 1),
+                "p95_ms": round(tempi[min(len(tempi) - 1, int(0.95 * len(tempi)))], 1),
+                "query_medie": round(statistics.mean(m.query for m in misure), 1),
+                "sql_ms_medio": round(statistics.mean(m.sql_ms for m in misure), 1),
+            }
+        )
+    return righe
+
+
+def azzera():
+    with _lock:
+        _storico.clear()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _inizio_query(conn, cursor, statement, parameters, context, executemany):
+    if corrente() is not None:
+        conn.info.setdefault("prestazioni_inizio", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _fine_query(conn, cursor, statement, parameters, context, executemany):
+    misura_corrente = corrente()
+    inizi = conn.info.get("prestazioni_inizio")
+    if misura_corrente is None or not inizi:
+        return
+    misura_corrente.query += 1
+    misura_corrente.sql_ms += (time.perf_counter() - inizi.pop()) * 1000
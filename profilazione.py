@@ -0,0 +1,155 @@
+"""Profilazione su richiesta delle chiamate API lente.
+
+Il middleware di ``api.py`` decide quali richieste profilare: tutte quelle
+campionate quando ``config.PROFILAZIONE_ATTIVA`` è vero, oppure quelle di un
+Coordinatore con l'header ``X-Profila: 1``. Per queste imposta un
+``cProfile.Profile`` nella variabile di contesto ``profilo_corrente``; le
+rotte create con ``RottaProfilata`` eseguono il corpo dell'endpoint sotto
+quel profilo, nel thread del threadpool in cui gira. Dipendenze (come
+l'autenticazione) e serializzazione della risposta restano fuori dal
+profilo; la durata registrata è quella dell'intera richiesta.
+
+I profili più lenti di ``config.PROFILAZIONE_SOGLIA_MS`` (o richiesti con
+l'header, qualunque durata) sono salvati in formato ``pstats`` nella
+cartella ``config.PROFILAZIONE_DIR``, con un file JSON di metadati accanto;
+oltre ``config.PROFILAZIONE_MAX`` profili i più vecchi vengono cancellati.
+Si leggono con ``python -m pstats <file>.prof`` o con snakeviz.
+"""
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import uuid
+from datetime import datetime
+
+from fastapi.routing import APIRoute
+
+import config
+
+profilo_corrente = contextvars.ContextVar("profilo_corrente", default=None)
+
+_ID_VALIDO = re.compile(r"^[0-9A-Za-z-]+$")
+
+
+class Profilazione:
+    """Profilo di una richiesta: creato dal middleware, riempito dalla rotta"""
+
+    def __init__(self, motivo):
+        self.motivo = motivo
+        self.profilo = cProfile.Profile()
+        self.eseguito = False
+
+
+def profilato(endpoint):
+    """Esegue ``endpoint`` sotto il profilo della richiesta, se ce n'è uno.
+
+    Solo per endpoint sincroni: quelli asincroni girano nel thread
+    dell'event loop e il profilo raccoglierebbe anche le altre richieste.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def esegui(*args, **kwargs):
+        corrente = profilo_corrente.get()
+        if corrente is None or corrente.eseguito:
+            return endpoint(*args, **kwargs)
+        try:
+            corrente.profilo.enable()
+        except ValueError:
+            # Un altro profiler è già attivo (Python 3.12+: uno per processo)
+            return endpoint(*args, **kwargs)
+        corrente.eseguito = True
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            corrente.profilo.disable()
+
+    return esegui
+
+
+class RottaProfilata(APIRoute):
+    """Rotta FastAPI il cui endpoint può essere profilato per richiesta"""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profilato(endpoint), **kwargs)
+
+
+class ArchivioProfili:
+    """Anello limitato di profili su disco, condivisibile tra processi"""
+
+    def __init__(self, cartella, massimo):
+        self.cartella = cartella
+        self.massimo = massimo
+        self._lock = threading.Lock()
+
+    def _percorso(self, id_profilo, estensione):
+        return os.path.join(self.cartella, f"{id_profilo}.{estensione}")
+
+    def salva(self, profilazione, metadati):
+        """Scrive profilo e metadati, scarta i più vecchi; restituisce l'id"""
+        adesso = datetime.now()
+        # Prefisso temporale: l'ordine dei nomi è l'ordine di salvataggio
+        id_profilo = f"{adesso:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            os.makedirs(self.cartella, exist_ok=True)
+            profilazione.profilo.dump_stats(self._percorso(id_profilo, "prof"))
+            voce = dict(
+                metadati,
+                id=id_profilo,
+                data=adesso.isoformat(timespec="seconds"),
+                motivo=profilazione.motivo,
+            )
+            with open(self._percorso(id_profilo, "json"), "w", encoding="utf-8") as f:
+                json.dump(voce, f)
+            for vecchio in self._id()[: -self.massimo or None]:
+                for estensione in ("prof", "json"):
+                    try:
+                        os.remove(self._percorso(vecchio, estensione))
+                    except FileNotFoundError:
+                        pass  # già rimosso da un altro processo
+        return id_profilo
+
+    def _id(self):
+        try:
+            nomi = os.listdir(self.cartella)
+        except FileNotFoundError:
+            return []
+        return sorted(n[: -len(".json")] for n in nomi if n.endswith(".json"))
+
+    def elenco(self):
+        """Metadati dei profili conservati, dal più recente"""
+        voci = []
+        for id_profilo in reversed(self._id()):
+            try:
+                with open(self._percorso(id_profilo, "json"), encoding="utf-8") as f:
+                    voci.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue  # cancellato o in scrittura
+        return voci
+
+    def file(self, id_profilo):
+        """Percorso del file ``.prof``, o None se l'id non esiste"""
+        if not _ID_VALIDO.match(id_profilo):
+            return None
+        percorso = self._percorso(id_profilo, "prof")
+        return percorso if os.path.exists(percorso) else None
+
+    def testo(self, id_profilo, righe=50, ordina="cumulative"):
+        """Riepilogo ``pstats`` leggibile, o None se l'id non esiste"""
+        percorso = self.file(id_profilo)
+        if percorso is None:
+            return None
+        uscita = io.StringIO()
+        pstats.Stats(percorso, stream=uscita).sort_stats(ordina).print_stats(righe)
+        return uscita.getvalue()
+
+
+archivio = ArchivioProfili(config.PROFILAZIONE_DIR, config.PROFILAZIONE_MAX)
@@ -0,0 +1,220 @@
+"""Ricerca full-text su oggetti, note e location.
+
+Ogni dialetto usa il proprio motore:
+- SQLite: tabella virtuale FTS5 ``ricerca_fts`` mantenuta da trigger
+- PostgreSQL: indici GIN su ``to_tsvector`` delle colonne testuali
+- MariaDB/MySQL: indici FULLTEXT sulle colonne testuali
+
+Su PostgreSQL e MariaDB gli indici sono aggiornati dal database stesso; su
+SQLite i trigger tengono allineata la tabella FTS a ogni scrittura.
+"""
+
+import re
+
+from sqlalchemy import text
+
+import config
+from db import engine
+
+# Su SQLite il rowid FTS codifica entità e id: rowid = id * 4 + codice
+CODICI_ENTITA = {"oggetti": 1, "note": 2, "locations": 3}
+ENTITA_DA_CODICE = {v: k for k, v in CODICI_ENTITA.items()}
+
+# Colonne indicizzate per entità: (titolo, testo)
+COLONNE_RICERCA = {
+    "oggetti": ("nome", "descrizione"),
+    "note": (None, "testo"),
+    "locations": ("nome", "indirizzo"),
+}
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ricerca_fts USING fts5(
+        titolo, testo, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+
+def _sqlite_trigger(tabella, titolo, testo):
+    codice = CODICI_ENTITA[tabella]
+    valore_titolo = f"coalesce(new.{titolo}, '')" if titolo else "''"
+    inserisci = (
+        f"INSERT INTO ricerca_fts(rowid, titolo, testo) "
+        f"VALUES (new.id * 4 + {codice}, {valore_titolo}, coalesce(new.{testo}, ''));"
+    )
+    elimina = f"DELETE FROM ricerca_fts WHERE rowid = old.id * 4 + {codice};"
+    colonne = ", ".join(c for c in (titolo, testo) if c)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {tabella}_fts_ai AFTER INSERT ON {tabella} "
+        f"BEGIN {inserisci} END",
+        f"CREATE TRIGGER IF NOT EXISTS {tabella}_fts_au AFTER UPDATE OF {colonne} "
+        f"ON {tabella} BEGIN {elimina} {inserisci} END",
+        f"CREATE TRIGGER IF NOT EXISTS {tabella}_fts_ad AFTER DELETE ON {tabella} "
+        f"BEGIN {elimina} END",
+    ]
+
+
+def _pg_vettore(tabella, alias=None):
+    titolo, testo = COLONNE_RICERCA[tabella]
+    prefisso = f"{alias}." if alias else ""
+    parti = [f"coalesce({prefisso}{c}, '')" for c in (titolo, testo) if c]
+    documento = " || ' ' || ".join(parti)
+    return f"to_tsvector('{config.RICERCA_PG_CONFIG}'::regconfig, {documento})"
+
+
+def _mysql_colonne(tabella):
+    return ", ".join(c for c in COLONNE_RICERCA[tabella] if c)
+
+
+def inizializza_ricerca(bind=None):
+    """Crea (se mancano) le strutture full-text per il dialetto in uso."""
+    bind = bind or engine
+    dialetto = bind.dialect.name
+    with bind.begin() as conn:
+        if dialetto == "sqlite":
+            esiste = conn.execute(
+                text(
+                    "SELECT 1 FROM sqlite_master "
+                    "WHERE type = 'table' AND name = 'ricerca_fts'"
+                )
+            ).first()
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+            for tabella, (titolo, testo) in COLONNE_RICERCA.items():
+                for ddl in _sqlite_trigger(tabella, titolo, testo):
+                    conn.execute(text(ddl))
+            if not esiste:
+                _ricostruisci_sqlite(conn)
+        elif dialetto == "postgresql":
+            for tabella in COLONNE_RICERCA:
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{tabella}_fts ON {tabella} "
+                        f"USING GIN ({_pg_vettore(tabella)})"
+                    )
+                )
+        elif dialetto == "mysql":
+            for tabella in COLONNE_RICERCA:
+                esiste = conn.execute(
+                    text(
+                        "SELECT 1 FROM information_schema.statistics "
+                        "WHERE table_schema = DATABASE() AND table_name = :t "
+                        "AND index_name = :i"
+                    ),
+                    {"t": tabella, "i": f"ft_{tabella}"},
+                ).first()
+                if not esiste:
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE {tabella} ADD FULLTEXT INDEX ft_{tabella} "
+                            f"({_mysql_colonne(tabella)})"
+                        )
+                    )
+
+
+def _ricostruisci_sqlite(conn):
+    conn.execute(text("DELETE FROM ricerca_fts"))
+    for tabella, (titolo, testo) in COLONNE_RICERCA.items():
+        codice = CODICI_ENTITA[tabella]
+        valore_titolo = f"coalesce({titolo}, '')" if titolo else "''"
+        conn.execute(
+            text(
+                f"INSERT INTO ricerca_fts(rowid, titolo, testo) "
+                f"SELECT id * 4 + {codice}, {valore_titolo}, coalesce({testo}, '') "
+                f"FROM {tabella}"
+            )
+        )
+
+
+def ricostruisci_indice(bind=None):
+    """Ricostruisce l'indice FTS5 da zero (solo SQLite, altrove non serve)."""
+    bind = bind or engine
+    if bind.dialect.name == "sqlite":
+        with bind.begin() as conn:
+            _ricostruisci_sqlite(conn)
+
+
+def _termini(q):
+    return re.findall(r"\w+", q or "")
+
+
+def _query_sqlite(termini, entita, limit, offset):
+    # Ogni termine è quotato (niente sintassi FTS dall'utente) e cercato per prefisso
+    match = " ".join('"' + t.replace('"', '""') + '"*' for t in termini)
+    codici = ", ".join(str(CODICI_ENTITA[e]) for e in entita)
+    filtro = f"ricerca_fts MATCH :match AND (rowid % 4) IN ({codici})"
+    righe = text(f"""
+        SELECT rowid / 4 AS id, rowid % 4 AS codice, titolo,
+               snippet(ricerca_fts, 1, '[', ']', '…', 12) AS estratto,
+               -bm25(ricerca_fts, 10.0, 1.0) AS punteggio
+        FROM ricerca_fts
+        WHERE {filtro}
+        ORDER BY bm25(ricerca_fts, 10.0, 1.0)
+        LIMIT :limit OFFSET :offset
+        """)
+    totale = text(f"SELECT COUNT(*) FROM ricerca_fts WHERE {filtro}")
+    parametri = {"match": match, "limit": limit, "offset": offset}
+    return righe, totale, parametri
+
+
+def _query_union(dialetto, termini, entita, limit, offset):
+    parti = []
+    for tabella in entita:
+        titolo, testo = COLONNE_RICERCA[tabella]
+        col_titolo = f"t.{titolo}" if titolo else "''"
+        if dialetto == "postgresql":
+            vettore = _pg_vettore(tabella, "t")
+            query_ts = f"to_tsquery('{config.RICERCA_PG_CONFIG}'::regconfig, :match)"
+            condizione = f"{vettore} @@ {query_ts}"
+            punteggio = f"ts_rank({vettore}, {query_ts})"
+        else:
+            colonne = ", ".join(f"t.{c}" for c in (titolo, testo) if c)
+            condizione = f"MATCH ({colonne}) AGAINST (:match IN BOOLEAN MODE)"
+            punteggio = condizione
+        parti.append(
+            f"SELECT '{tabella}' AS entita, t.id AS id, {col_titolo} AS titolo, "
+            f"t.{testo} AS estratto, {punteggio} AS punteggio "
+            f"FROM {tabella} t WHERE {condizione}"
+        )
+    unione = " UNION ALL ".join(parti)
+    righe = text(
+        f"SELECT * FROM ({unione}) r ORDER BY punteggio DESC, id "
+        f"LIMIT :limit OFFSET :offset"
+    )
+    totale = text(f"SELECT COUNT(*) FROM ({unione}) r")
+    if dialetto == "postgresql":
+        match = " & ".join(f"{t}:*" for t in termini)
+    else:
+        match = " ".join(f"+{t}*" for t in termini)
+    return righe, totale, {"match": match, "limit": limit, "offset": offset}
+
+
+def cerca(q, entita=None, limit=20, offset=0, bind=None):
+    """Esegue la ricerca e restituisce risultati ordinati per rilevanza.
+
+    Restituisce un dict ``{"totale": int, "risultati": [...]}``; ogni
+    risultato ha ``entita``, ``id``, ``titolo``, ``estratto`` e ``punteggio``.
+    """
+    bind = bind or engine
+    termini = _termini(q)
+    entita = [e for e in (entita or COLONNE_RICERCA) if e in COLONNE_RICERCA]
+    if not termini or not entita:
+        return {"totale": 0, "risultati": []}
+    dialetto = bind.dialect.name
+    if dialetto == "sqlite":
+        righe, totale, parametri = _query_sqlite(termini, entita, limit, offset)
+    else:
+        righe, totale, parametri = _query_union(
+            dialetto, termini, entita, limit, offset
+        )
+    with bind.connect() as conn:
+        n = conn.execute(totale, parametri).scalar() or 0
+        risultati = []
+        for r in conn.execute(righe, parametri).mappings():
+            risultato = dict(r)
+            if dialetto == "sqlite":
+                risultato["entita"] = ENTITA_DA_CODICE[risultato.pop("codice")]
+            risultato["punteggio"] = float(risultato["punteggio"] or 0)
+            risultati.append(risultato)
+    return {"totale": n, "risultati": risultati}
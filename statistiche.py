@@ -0,0 +1,332 @@
+"""Statistiche aggregate calcolate dal database.
+
+Ogni funzione esegue una sola query GROUP BY portabile tra SQLite,
+PostgreSQL e MariaDB e restituisce una lista di dict pronta per l'API o
+per un DataFrame. I risultati restano in cache per
+``config.STATISTICHE_CACHE_TTL`` secondi.
+"""
+
+import functools
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Float, String, and_, case, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.expression import FunctionElement
+
+import config
+from db import (
+    engine,
+    Utente,
+    Location,
+    Oggetto,
+    Attivita,
+    OggettoAttivita,
+    LogOperazione,
+)
+
+
+# --- DIFFERENZA IN GIORNI TRA DATE (per dialetto) ---
+class giorni_tra(FunctionElement):
+    """``giorni_tra(a, b)`` = giorni da ``b`` ad ``a``"""
+
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(giorni_tra)
+def _giorni_tra_sqlite(element, compiler, **kw):
+    a, b = [compiler.process(c, **kw) for c in element.clauses]
+    return f"(julianday({a}) - julianday({b}))"
+
+
+@compiles(giorni_tra, "postgresql")
+def _giorni_tra_pg(element, compiler, **kw):
+    a, b = [compiler.process(c, **kw) for c in element.clauses]
+    return f"({a} - {b})"
+
+
+@compiles(giorni_tra, "mysql")
+def _giorni_tra_mysql(element, compiler, **kw):
+    a, b = [compiler.process(c, **kw) for c in element.clauses]
+    return f"DATEDIFF({a}, {b})"
+
+
+# --- MESE "AAAA-MM" DI UNA DATA (per dialetto) ---
+class mese_di(FunctionElement):
+    """``mese_di(d)`` = ``'AAAA-MM'``: una sola espressione per il GROUP BY"""
+
+    type = String()
+    inherit_cache = True
+
+
+@compiles(mese_di)
+def _mese_di_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m', {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(mese_di, "postgresql")
+def _mese_di_pg(element, compiler, **kw):
+    return f"to_char({compiler.process(element.clauses, **kw)}, 'YYYY-MM')"
+
+
+@compiles(mese_di, "mysql")
+def _mese_di_mysql(element, compiler, **kw):
+    return f"DATE_FORMAT({compiler.process(element.clauses, **kw)}, '%Y-%m')"
+
+
+# --- CACHE TTL ---
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def cache_ttl(fn):
+    """Memorizza il risultato per argomenti per ``STATISTICHE_CACHE_TTL`` secondi"""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        chiave = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        adesso = time.monotonic()
+        with _cache_lock:
+            voce = _cache.get(chiave)
+            if voce and adesso - voce[0] < config.STATISTICHE_CACHE_TTL:
+                return voce[1]
+        risultato = fn(*args, **kwargs)
+        with _cache_lock:
+            _cache[chiave] = (adesso, risultato)
+        return risultato
+
+    return wrapper
+
+
+def svuota_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _esegui(query):
+    with engine.connect() as conn:
+        return [dict(r) for r in conn.execute(query).mappings()]
+
+
+def _conta_se(condizione):
+    return func.sum(case((condizione, 1), else_=0))
+
+
+# --- STATISTICHE ---
+def conteggi_dashboard():
+    """Totali di utenti, location, oggetti e attività pendenti in una query.
+
+    Una sola SELECT di sottoquery scalari ``COUNT(*)``: nessuna riga viene
+    trasferita e il conteggio delle pendenti usa l'indice su
+    ``(completata, data_prevista)``. Non è in cache perché è economica e i
+    riquadri devono riflettere subito le scritture.
+    """
+
+    def conta(modello, *condizioni):
+        return (
+            select(func.count())
+            .select_from(modello)
+            .where(*condizioni)
+            .scalar_subquery()
+        )
+
+    query = select(
+        conta(Utente).label("utenti"),
+        conta(Location).label("locations"),
+        conta(Oggetto).label("oggetti"),
+        conta(OggettoAttivita, OggettoAttivita.completata.is_(False)).label(
+            "attivita_pendenti"
+        ),
+    )
+    return _esegui(query)[0]
+
+
+@cache_ttl
+def oggetti_per_location():
+    """Oggetti, contenitori e oggetti semplici per ogni location"""
+    totale = func.count(Oggetto.id).label("totale_oggetti")
+    query = (
+        select(
+            Location.nome.label("location"),
+            totale,
+            func.coalesce(_conta_se(Oggetto.tipo == "contenitore"), 0).label(
+                "contenitori"
+            ),
+            func.coalesce(_conta_se(Oggetto.tipo == "oggetto"), 0).label(
+                "oggetti_semplici"
+            ),
+        )
+        .select_from(Location)
+        .outerjoin(Oggetto, Oggetto.location_id == Location.id)
+        .group_by(Location.id, Location.nome)
+        .order_by(totale.desc(), Location.nome)
+    )
+    return _esegui(query)
+
+
+@cache_ttl
+def attivita_per_utente():
+    """Attività assegnate, completate e in corso per utente"""
+    totale = func.count(OggettoAttivita.id).label("totale_attivita")
+    query = (
+        select(
+            Utente.nome,
+            totale,
+            func.coalesce(_conta_se(OggettoAttivita.completata.is_(True)), 0).label(
+                "completate"
+            ),
+            func.coalesce(_conta_se(OggettoAttivita.completata.is_(False)), 0).label(
+                "in_corso"
+            ),
+        )
+        .select_from(Utente)
+        .outerjoin(OggettoAttivita, OggettoAttivita.assegnato_a == Utente.id)
+        .group_by(Utente.id, Utente.nome)
+        .order_by(totale.desc(), Utente.nome)
+    )
+    return _esegui(query)
+
+
+@cache_ttl
+def performance_utenti():
+    """Percentuale di completamento e ritardo medio per utente con attività"""
+    assegnate = func.count(OggettoAttivita.id)
+    completate = _conta_se(OggettoAttivita.completata.is_(True))
+    percentuale = completate * 100.0 / assegnate
+    query = (
+        select(
+            Utente.nome,
+            assegnate.label("attivita_assegnate"),
+            completate.label("completate"),
+            percentuale.label("percentuale_completamento"),
+            func.avg(
+                giorni_tra(
+                    OggettoAttivita.data_completamento, OggettoAttivita.data_prevista
+                )
+            ).label("ritardo_medio_giorni"),
+        )
+        .join(OggettoAttivita, OggettoAttivita.assegnato_a == Utente.id)
+        .group_by(Utente.id, Utente.nome)
+        .order_by(percentuale.desc(), Utente.nome)
+    )
+    righe = _esegui(query)
+    for r in righe:
+        for campo in ("percentuale_completamento", "ritardo_medio_giorni"):
+            if r[campo] is not None:
+                r[campo] = round(float(r[campo]), 2)
+    return righe
+
+
+def _per_mese(colonna, *condizioni):
+    # Un'unica chiave di raggruppamento già formattata: con l'indice sulla
+    # colonna data la query legge solo l'indice
+    mese = mese_di(colonna).label("mese")
+    return (
+        select(mese, func.count().label("count"))
+        .where(*condizioni)
+        .group_by(mese)
+        .order_by(mese)
+    )
+
+
+@cache_ttl
+def andamento_mensile(mesi=12):
+    """Oggetti rilevati e attività completate per mese negli ultimi ``mesi``"""
+    dal = date.today() - timedelta(days=mesi * 31)
+    rilevamenti = _per_mese(
+        Oggetto.data_rilevamento,
+        Oggetto.data_rilevamento >= datetime.combine(dal, datetime.min.time()),
+    ).select_from(Oggetto)
+    completamenti = _per_mese(
+        OggettoAttivita.data_completamento,
+        OggettoAttivita.completata.is_(True),
+        OggettoAttivita.data_completamento >= dal,
+    ).select_from(OggettoAttivita)
+    return {
+        "rilevamenti": _esegui(rilevamenti),
+        "completamenti": _esegui(completamenti),
+    }
+
+
+@cache_ttl
+def contenitori_piu_utilizzati(limit=10):
+    """Contenitori ordinati per numero di oggetti contenuti"""
+    contenuto = aliased(Oggetto)
+    conteggio = func.count(contenuto.id).label("oggetti_contenuti")
+    query = (
+        select(Oggetto.nome.label("contenitore"), conteggio)
+        .join(contenuto, contenuto.contenitore_id == Oggetto.id)
+        .where(Oggetto.tipo == "contenitore")
+        .group_by(Oggetto.id, Oggetto.nome)
+        .order_by(conteggio.desc(), Oggetto.nome)
+        .limit(limit)
+    )
+    return _esegui(query)
+
+
+@cache_ttl
+def oggetti_piu_movimentati(limit=5):
+    """Oggetti con più attività assegnate"""
+    movimenti = func.count(OggettoAttivita.id).label("movimenti")
+    query = (
+        select(Oggetto.nome, movimenti)
+        .join(OggettoAttivita, OggettoAttivita.oggetto_id == Oggetto.id)
+        .group_by(Oggetto.id, Oggetto.nome)
+        .order_by(movimenti.desc(), Oggetto.nome)
+        .limit(limit)
+    )
+    return _esegui(query)
+
+
+@cache_ttl
+def attivita_urgenti(giorni=3, limit=10):
+    """Attività non completate con scadenza entro ``giorni`` (incluse le scadute)"""
+    oggi = date.today()
+    query = (
+        select(
+            Oggetto.nome.label("oggetto"),
+            Attivita.nome.label("attivita"),
+            Utente.nome.label("assegnato_a"),
+            OggettoAttivita.data_prevista,
+        )
+        .select_from(OggettoAttivita)
+        .join(Oggetto, OggettoAttivita.oggetto_id == Oggetto.id)
+        .join(Attivita, OggettoAttivita.attivita_id == Attivita.id)
+        .outerjoin(Utente, OggettoAttivita.assegnato_a == Utente.id)
+        .where(
+            and_(
+                OggettoAttivita.completata.is_(False),
+                OggettoAttivita.data_prevista.is_not(None),
+                OggettoAttivita.data_prevista <= oggi + timedelta(days=giorni),
+            )
+        )
+        .order_by(OggettoAttivita.data_prevista)
+        .limit(limit)
+    )
+    righe = _esegui(query)
+    for r in righe:
+        r["giorni_rimanenti"] = (r["data_prevista"] - oggi).days
+    return righe
+
+
+@cache_ttl
+def log_recenti(limit=20):
+    """Ultime operazioni registrate con il nome dell'utente"""
+    query = (
+        select(
+            LogOperazione.id,
+            Utente.nome.label("utente"),
+            LogOperazione.azione,
+            LogOperazione.entita,
+            LogOperazione.entita_id,
+            LogOperazione.dettagli,
+            LogOperazione.timestamp,
+        )
+        .outerjoin(Utente, LogOperazione.utente_id == Utente.id)
+        .order_by(LogOperazione.timestamp.desc())
+        .limit(limit)
+    )
+    return _esegui(query)
@@ -0,0 +1,47 @@
+import pandas as pd
+import streamlit as st
+
+
+def st_pannello_prestazioni(misura, storico, riepilogo):
+    """Expander "Performance" nella sidebar.
+
+    ``misura`` è l'ultimo render della pagina (``prestazioni.MisuraPagina``,
+    None se incompleto), ``storico`` le misure precedenti della stessa
+    pagina e ``riepilogo`` le statistiche di tutte le pagine
+    (``prestazioni.riepilogo()``).
+    """
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        if misura is None:
+            st.caption("Render non misurato")
+            return
+        st.caption(f"Ultimo render di «{misura.pagina}»")
+        col1, col2 = st.columns(2)
+        col1.metric("Totale", f"{misura.totale_ms:.1f} ms")
+        col2.metric("SQL", f"{misura.sql_ms:.1f} ms", f"{misura.query} query", "off")
+        col1.metric("Streamlit", f"{misura.rendering_ms:.1f} ms")
+        col2.metric("Python/pandas", f"{misura.python_ms:.1f} ms")
+        if misura.dataframe:
+            st.dataframe(
+                pd.DataFrame(
+                    misura.dataframe, columns=["funzione", "righe", "colonne", "byte"]
+                ),
+                hide_index=True,
+            )
+        if len(storico) > 1:
+            st.caption(f"Ultimi {len(storico)} render (ms)")
+            st.line_chart(
+                pd.DataFrame(
+                    [
+                        {
+                            "totale": m.totale_ms,
+                            "sql": m.sql_ms,
+                            "streamlit": m.rendering_ms,
+                        }
+                        for m in storico
+                    ]
+                ),
+                height=150,
+            )
+        if riepilogo:
+            st.caption("Tutte le pagine")
+            st.dataframe(pd.DataFrame(riepilogo), hide_index=True)
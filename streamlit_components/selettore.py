@@ -0,0 +1,39 @@
+import streamlit as st
+
+LIMITE_OPZIONI = 20
+
+
+def st_selettore(
+    chiave, etichetta, cerca, formato=None, nessuno=None, limit=LIMITE_OPZIONI
+):
+    """Selectbox con ricerca per inizio del nome, servita dal database.
+
+    ``cerca(prefisso, limit)`` restituisce al più ``limit`` righe con ``id``
+    e ``nome`` (come ``letture.cerca_per_nome``): le opzioni sono sempre
+    poche decine, qualunque sia la dimensione della tabella. ``nessuno`` è
+    l'etichetta dell'opzione vuota (es. "Tutte le location"). Restituisce la
+    riga scelta, o None.
+
+    I rerun di Streamlit non partono dentro un ``st.form``: il selettore va
+    messo fuori dal form perché la ricerca si aggiorni mentre si digita.
+    """
+    formato = formato or (lambda r: r["nome"])
+    prefisso = st.text_input(
+        f"Cerca {etichetta.lower()}",
+        key=f"{chiave}_prefisso",
+        placeholder="Inizio del nome",
+    )
+    righe = {r["id"]: r for r in cerca(prefisso.strip(), limit)}
+    opzioni = ([None] if nessuno else []) + list(righe)
+    if not opzioni:
+        st.caption(f"{etichetta}: nessun risultato")
+        return None
+    scelta = st.selectbox(
+        etichetta,
+        opzioni,
+        format_func=lambda i: nessuno if i is None else formato(righe[i]),
+        key=f"{chiave}_scelta",
+    )
+    if len(righe) >= limit:
+        st.caption(f"Primi {limit} risultati: digita altre lettere per restringere")
+    return righe.get(scelta)
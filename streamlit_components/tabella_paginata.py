@@ -0,0 +1,70 @@
+import pandas as pd
+import streamlit as st
+
+import prestazioni
+
+DIMENSIONI_PAGINA = (25, 50, 100, 200)
+
+
+def st_tabella_paginata(
+    chiave, carica, conta, colonne, ordina="id", etichette=None, filtri=None
+):
+    """Tabella che legge dal server solo la pagina visibile.
+
+    ``carica(ordina, discendente, limit, dopo)`` restituisce
+    ``(righe, prossimo)`` come ``letture.pagina``; ``conta()`` il totale
+    delle righe. Le pagine già viste sono ricordate in ``st.session_state``
+    come pila di cursori keyset; cambiare ordinamento, dimensione della
+    pagina o ``filtri`` riparte dalla prima pagina.
+    """
+    etichette = etichette or {}
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        ordina = st.selectbox(
+            "Ordina per",
+            colonne,
+            index=colonne.index(ordina),
+            format_func=lambda c: etichette.get(c, c),
+            key=f"{chiave}_ordina",
+        )
+    with col2:
+        discendente = st.toggle("Decrescente", key=f"{chiave}_discendente")
+    with col3:
+        limit = st.selectbox(
+            "Righe per pagina", DIMENSIONI_PAGINA, key=f"{chiave}_limit"
+        )
+
+    stato_cursori = f"{chiave}_cursori"
+    firma = (ordina, discendente, limit, repr(filtri))
+    if st.session_state.get(f"{chiave}_firma") != firma:
+        st.session_state[f"{chiave}_firma"] = firma
+        st.session_state[stato_cursori] = [None]
+    cursori = st.session_state[stato_cursori]
+
+    righe, prossimo = carica(ordina, discendente, limit, cursori[-1])
+    totale = conta()
+    if righe:
+        df = pd.DataFrame(righe)
+        df = df[[c for c in colonne if c in df.columns]]
+        prestazioni.mostra(
+            st.dataframe,
+            df.rename(columns=etichette),
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("Nessun risultato.")
+
+    pagine = max(1, -(-totale // limit))
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        if st.button("◀ Precedente", key=f"{chiave}_prec", disabled=len(cursori) == 1):
+            cursori.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Pagina {len(cursori)} di {pagine} · {totale} righe")
+    with col3:
+        if st.button("Successiva ▶", key=f"{chiave}_succ", disabled=prossimo is None):
+            cursori.append(prossimo)
+            st.rerun()
+    return righe
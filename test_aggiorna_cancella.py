@@ -0,0 +1,130 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+import api
+import crud
+from db import Base, LogOperazione, Oggetto, OggettoAttivita, Nota, Utente
+from db import chiavi_esterne_obsolete
+
+
+def test_update_in_una_istruzione(motore):
+    loc_id = crud.add_location("Magazzino", "Via Roma 1", "")
+    riga = crud.aggiorna_riga("locations", loc_id, {"note": "Aggiornata"})
+    assert riga["nome"] == "Magazzino" and riga["note"] == "Aggiornata"
+    assert crud.aggiorna_riga("locations", 999, {"note": "x"}) is None
+    assert crud.update_location(loc_id, nome="Deposito") == loc_id
+    assert crud.update_location(999, nome="Deposito") is False
+    # Senza campi da modificare verifica solo l'esistenza
+    assert crud.update_location(loc_id) == loc_id
+
+
+def test_delete_segue_on_delete(motore):
+    loc_id = crud.add_location("Magazzino", "", "")
+    scatola = crud.add_oggetto("Scatola", "", "in_attesa", "contenitore", loc_id)
+    lampada = crud.add_oggetto("Lampada", "", "in_attesa", "oggetto", loc_id, scatola)
+    att_id = crud.add_attivita("Trasporto", "")
+    crud.add_oggetto_attivita(scatola, att_id, None)
+    crud.add_nota("Fragile", oggetto_id=scatola)
+
+    assert crud.delete_oggetto(scatola) is True
+    assert crud.delete_oggetto(scatola) is False
+    with motore.connect() as conn:
+        assert conn.execute(select(func.count(OggettoAttivita.id))).scalar() == 0
+        assert conn.execute(select(func.count(Nota.id))).scalar() == 0
+        contenitore = conn.execute(
+            select(Oggetto.contenitore_id).where(Oggetto.id == lampada)
+        ).scalar()
+    assert contenitore is None
+
+    assert crud.delete_location(loc_id) is True
+    with motore.connect() as conn:
+        posizione = conn.execute(
+            select(Oggetto.location_id).where(Oggetto.id == lampada)
+        ).scalar()
+    assert posizione is None
+
+
+def test_delete_utente_con_log(motore):
+    u_id = crud.add_utente("Mario", "Operatore", "mario@x.it")
+    crud.add_nota("Controllata", autore_id=u_id)
+    with sessionmaker(bind=motore)() as s:
+        s.add(LogOperazione(utente_id=u_id, azione="create", entita="nota"))
+        s.commit()
+    assert crud.delete_utente(u_id) is True
+    # Il log resta: la riga perde solo il riferimento all'utente
+    with motore.connect() as conn:
+        assert conn.execute(select(LogOperazione.utente_id)).all() == [(None,)]
+        assert conn.execute(select(Nota.autore_id)).scalar() is None
+
+
+def test_vincolo_violato(motore):
+    loc_id = crud.add_location("Magazzino", "", "")
+    ogg_id = crud.add_oggetto("Scatola", "", "in_attesa", "oggetto", loc_id)
+    with pytest.raises(IntegrityError):
+        crud.aggiorna_riga("oggetti", ogg_id, {"location_id": 999})
+    # La transazione fallita è annullata: la riga non cambia
+    assert crud.aggiorna_riga("oggetti", ogg_id, {})["location_id"] == loc_id
+    assert crud.update_oggetto(ogg_id, location_id=999) is False
+
+
+def test_api_utenti(motore, monkeypatch):
+    monkeypatch.setattr(api, "get_session", sessionmaker(bind=motore))
+    admin_id = crud.add_utente("Admin", "Coordinatore", "admin@x.it")
+    u_id = crud.add_utente("Mario", "Operatore", "mario@x.it")
+    with sessionmaker(bind=motore)() as s:
+        s.add(LogOperazione(utente_id=u_id, azione="create", entita="nota"))
+        s.commit()
+    token = api.create_access_token({"sub": "admin@x.it", "ruolo": "Coordinatore"})
+    client = TestClient(api.app)
+    intestazioni = {"Authorization": f"Bearer {token}"}
+
+    risposta = client.put(
+        f"/utenti/{u_id}",
+        json={"nome": "Mario R.", "password": "segreta"},
+        headers=intestazioni,
+    )
+    assert risposta.status_code == 200 and risposta.json()["nome"] == "Mario R."
+    risposta = client.put(
+        f"/utenti/{u_id}", json={"email": "admin@x.it"}, headers=intestazioni
+    )
+    assert risposta.status_code == 409
+    assert client.delete(f"/utenti/{u_id}", headers=intestazioni).status_code == 200
+    with motore.connect() as conn:
+        assert conn.execute(select(Utente.id)).scalars().all() == [admin_id]
+        assert conn.execute(select(func.count(LogOperazione.id))).scalar() == 1
+
+
+def test_api_me_utente_cancellato(motore, monkeypatch):
+    monkeypatch.setattr(api, "get_session", sessionmaker(bind=motore))
+    u_id = crud.add_utente("Mario", "Operatore", "mario@x.it")
+    token = api.create_access_token({"sub": "mario@x.it", "ruolo": "Operatore"})
+    client = TestClient(api.app)
+    # Utente cancellato tra l'autenticazione e l'UPDATE
+    utente = api.get_user_by_email("mario@x.it")
+    monkeypatch.setattr(api, "get_user_by_email", lambda email: utente)
+    crud.delete_utente(u_id)
+    risposta = client.put(
+        "/me", json={"nome": "Mario R."}, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert risposta.status_code == 404
+
+
+def test_chiavi_esterne_obsolete(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'nuovo.db'}")
+    Base.metadata.create_all(eng)
+    assert chiavi_esterne_obsolete(eng) == []
+    # Tabella creata prima delle clausole ON DELETE
+    with eng.begin() as conn:
+        conn.execute(text("DROP TABLE log_operazioni"))
+        conn.execute(
+            text(
+                "CREATE TABLE log_operazioni (id INTEGER PRIMARY KEY, "
+                "utente_id INTEGER NOT NULL REFERENCES utenti(id), "
+                "azione TEXT, entita TEXT, entita_id INTEGER, dettagli TEXT, "
+                "timestamp DATETIME)"
+            )
+        )
+    assert chiavi_esterne_obsolete(eng) == ["log_operazioni.utente_id"]
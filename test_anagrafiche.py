@@ -0,0 +1,67 @@
+import pytest
+
+import anagrafiche
+import crud
+
+
+@pytest.fixture()
+def motore(motore, monkeypatch):
+    monkeypatch.setattr(anagrafiche.config, "ANAGRAFICHE_CACHE_TTL", 300)
+    return motore
+
+
+def test_hit_e_invalidazione_da_crud(motore):
+    crud.add_location("Magazzino", "", "")
+    assert [loc.nome for loc in anagrafiche.get_locations()] == ["Magazzino"]
+    anagrafiche.get_locations()
+    stat = anagrafiche.statistiche()["locations"]
+    assert (stat["hit"], stat["miss"], stat["hit_rate"]) == (1, 1, 0.5)
+
+    # Ogni scrittura tramite crud invalida la tabella interessata
+    loc_id = crud.add_location("Cantina", "", "")
+    assert len(anagrafiche.get_locations()) == 2
+    crud.update_location(loc_id, nome="Box")
+    assert [loc.nome for loc in anagrafiche.get_locations()] == ["Box", "Magazzino"]
+    crud.delete_location(loc_id)
+    assert len(anagrafiche.get_locations()) == 1
+    assert anagrafiche.statistiche()["locations"]["invalidazioni"] == 4
+
+    # Le altre tabelle non vengono toccate
+    crud.add_attivita("Pulizia", "")
+    assert anagrafiche.statistiche()["locations"]["invalidazioni"] == 4
+
+
+def test_invalidazione_rimandata_al_commit(motore):
+    anagrafiche.get_utenti()
+    with crud.unit_of_work():
+        crud.add_utente("Anna", "Operatore", "anna@example.com")
+        assert anagrafiche.get_utenti() == []
+    assert [u.nome for u in anagrafiche.get_utenti()] == ["Anna"]
+
+
+def test_ttl(motore, monkeypatch):
+    anagrafiche.get_attivita()
+    monkeypatch.setattr(anagrafiche.config, "ANAGRAFICHE_CACHE_TTL", 0)
+    anagrafiche.get_attivita()
+    assert anagrafiche.statistiche()["attivita"]["miss"] == 2
+
+
+def test_derivato_e_indice_email(motore):
+    costruzioni = []
+
+    def per_nome(utenti):
+        costruzioni.append(len(utenti))
+        return {u.nome: u.id for u in utenti}
+
+    crud.add_utente("Anna", "Operatore", "Anna@Example.com")
+    assert anagrafiche.derivato("utenti", "per_nome", per_nome) == {"Anna": 1}
+    anagrafiche.derivato("utenti", "per_nome", per_nome)
+    assert costruzioni == [1]
+    assert anagrafiche.utente_per_email("anna@example.COM").nome == "Anna"
+    assert anagrafiche.utente_per_email("bruno@example.com") is None
+
+    # Una scrittura sugli utenti ricostruisce mappa e indice
+    crud.add_utente("Bruno", "Operatore", "bruno@example.com")
+    assert anagrafiche.derivato("utenti", "per_nome", per_nome)["Bruno"] == 2
+    assert costruzioni == [1, 2]
+    assert anagrafiche.utente_per_email("bruno@example.com").id == 2
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, func, select
+from sqlalchemy.orm import sessionmaker
+
+import anagrafiche
+import audit
+from db import LogOperazione, Utente
+
+
+@pytest.fixture()
+def motore(motore):
+    eng = motore
+    adesso = datetime.utcnow()
+    with eng.begin() as conn:
+        conn.execute(
+            insert(Utente),
+            [{"id": 1, "nome": "Mario"}, {"id": 2, "nome": "Luigi"}],
+        )
+        conn.execute(
+            insert(LogOperazione),
+            [
+                {
+                    "utente_id": 1 + i % 2,
+                    "azione": "aggiunta" if i % 3 else "cancellazione",
+                    "entita": "oggetti",
+                    "entita_id": i,
+                    # Ogni giorno due righe con lo stesso timestamp
+                    "timestamp": adesso - timedelta(days=i // 2),
+                }
+                for i in range(40)
+            ],
+        )
+    return eng
+
+
+def _tutte(**filtri):
+    righe, cursore = audit.cerca_log(limit=7, **filtri)
+    while cursore:
+        pagina, cursore = audit.cerca_log(limit=7, cursore=cursore, **filtri)
+        righe += pagina
+    return righe
+
+
+def test_paginazione_keyset(motore):
+    righe = _tutte()
+    assert len(righe) == 40
+    assert len({r["id"] for r in righe}) == 40
+    chiavi = [(r["timestamp"], r["id"]) for r in righe]
+    assert chiavi == sorted(chiavi, reverse=True)
+
+    filtrate = _tutte(utente_id=2, azione="aggiunta")
+    assert filtrate and all(
+        r["utente_id"] == 2 and r["azione"] == "aggiunta" for r in filtrate
+    )
+    with pytest.raises(ValueError):
+        audit.cerca_log(cursore="non-valido")
+
+
+def test_autore_in_join(motore):
+    query = []
+    event.listen(motore, "before_cursor_execute", lambda *a: query.append(a[2]))
+    for limit in (5, 40):
+        query.clear()
+        righe, _ = audit.cerca_log(limit=limit)
+        assert len(query) == 1
+        assert {r["utente_nome"] for r in righe} == {"Mario", "Luigi"}
+        assert all(
+            r["utente_nome"] == ("Mario" if r["utente_id"] == 1 else "Luigi")
+            for r in righe
+        )
+
+
+def test_archiviazione_e_consultazione(motore, tmp_path, monkeypatch):
+    directory = tmp_path / "archivio"
+    segmenti = audit.archivia_log(
+        giorni=10, directory=str(directory), righe_per_segmento=8
+    )
+    assert len(segmenti) == 3
+    with motore.connect() as conn:
+        rimaste = conn.execute(select(func.count(LogOperazione.id))).scalar()
+    assert rimaste == 20
+
+    assert len(_tutte()) == 20
+    # Con l'archivio la storia completa torna disponibile, nello stesso ordine
+    monkeypatch.setattr(audit.config, "AUDIT_ARCHIVIO_DIR", str(directory))
+    monkeypatch.setattr(anagrafiche, "get_session", sessionmaker(bind=motore))
+    anagrafiche.invalida()
+    complete = _tutte(includi_archivio=True)
+    vecchie = _tutte(includi_archivio=True, al=datetime.utcnow() - timedelta(days=12))
+    assert len(complete) == 40
+    chiavi = [(r["timestamp"], r["id"]) for r in complete]
+    assert chiavi == sorted(chiavi, reverse=True)
+    # Le righe d'archivio prendono il nome dell'autore dalla cache utenti
+    assert {r["utente_nome"] for r in complete} == {"Mario", "Luigi"}
+    assert vecchie and all(r["entita_id"] >= 24 for r in vecchie)
+
+
+def _conta_log(motore):
+    with motore.connect() as conn:
+        return conn.execute(select(func.count(LogOperazione.id))).scalar()
+
+
+def test_scrittore_batch_e_flush(motore):
+    scrittore = audit.ScrittoreAudit(batch=10, intervallo=60)
+    for i in range(25):
+        assert scrittore.registra(1, "update", "utente", i)
+    # Due batch pieni partono da soli, il resto solo con flush
+    assert scrittore.flush(timeout=5)
+    assert _conta_log(motore) == 40 + 25
+    assert scrittore.statistiche()["scritte"] == 25
+    assert scrittore.chiudi(timeout=5)
+
+
+def test_scrittore_coda_piena_scarta(motore, monkeypatch):
+    scrittore = audit.ScrittoreAudit(coda_max=2, politica="scarta")
+    # Thread non avviato: la coda si riempie senza essere svuotata
+    monkeypatch.setattr(scrittore, "_avvia", lambda: None)
+    esiti = [scrittore.registra(1, "update", "utente", i) for i in range(5)]
+    assert esiti == [True, True, False, False, False]
+    assert scrittore.statistiche()["scartate"] == 3
+    with pytest.raises(ValueError):
+        audit.ScrittoreAudit(politica="ignora")
+
+
+def test_log_nella_stessa_transazione(motore, monkeypatch):
+    import crud
+
+    monkeypatch.setattr(crud, "get_session", sessionmaker(bind=motore))
+    monkeypatch.setattr(crud.config, "AUDIT_SINCRONO", True)
+    u_id = crud.add_utente("Anna", "Operatore", "anna@example.com", current_user_id=1)
+    assert u_id is not None
+    # Scritta con il commit della modifica, senza passare dalla coda
+    assert _conta_log(motore) == 41
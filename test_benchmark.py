@@ -0,0 +1,35 @@
+import benchmark
+
+
+def _risultati(**metriche):
+    return {
+        "scale": {
+            "piccola": {
+                "metriche": {
+                    nome: {"valore": valore, "unita": unita, "migliore": migliore}
+                    for nome, (valore, unita, migliore) in metriche.items()
+                }
+            }
+        }
+    }
+
+
+def test_confronto_con_baseline():
+    baseline = _risultati(
+        lenta=(10.0, "ms", "basso"),
+        veloce=(0.2, "ms", "basso"),
+        crud=(1000.0, "op/s", "alto"),
+        nuova_in_baseline=(1.0, "ms", "basso"),
+    )
+    risultati = _risultati(
+        lenta=(14.0, "ms", "basso"),
+        # +100% ma solo 0.2 ms: rumore, non regressione
+        veloce=(0.4, "ms", "basso"),
+        crud=(700.0, "op/s", "alto"),
+        solo_nuova=(5.0, "ms", "basso"),
+    )
+    righe, regressioni = benchmark.confronta(baseline, risultati, soglia=0.25)
+    assert {r[1] for r in righe} == {"lenta", "veloce", "crud"}
+    assert [r[1] for r in regressioni] == ["lenta", "crud"]
+    _, regressioni = benchmark.confronta(baseline, risultati, soglia=0.5)
+    assert regressioni == []
@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import func, select
+
+import crud
+from db import Oggetto, Nota
+
+
+def test_add_update_delete_many(motore, monkeypatch):
+    # Limite basso per forzare più blocchi per INSERT e DELETE
+    monkeypatch.setitem(crud._MAX_PARAMETRI, "sqlite", 4)
+    (loc_id,) = crud.add_many("locations", [{"nome": "Magazzino"}])
+    righe = [
+        {"nome": f"Scatola {i}", "location_id": loc_id, "stato": "in_attesa"}
+        for i in range(9)
+    ]
+    righe[3]["descrizione"] = "righe con campi diversi"
+    ids = crud.add_many("oggetti", righe)
+    assert len(ids) == 9
+    with motore.connect() as conn:
+        nomi = dict(conn.execute(select(Oggetto.id, Oggetto.nome)).all())
+    assert [nomi[i] for i in ids] == [r["nome"] for r in righe]
+
+    aggiornate = crud.update_many(
+        "oggetti",
+        [
+            {"id": ids[0], "stato": "venduto"},
+            {"id": ids[1], "stato": "venduto", "nome": "Baule"},
+            {"id": 9999, "stato": "venduto"},
+        ],
+    )
+    assert aggiornate == 2
+    assert crud.delete_many("oggetti", ids[:7] + [9999]) == 7
+    with motore.connect() as conn:
+        assert conn.execute(select(func.count(Oggetto.id))).scalar() == 2
+
+    with pytest.raises(ValueError):
+        crud.add_many("sconosciuta", [{}])
+
+
+def test_popola_mock_in_una_transazione(motore):
+    from mock_data import popola_mock
+
+    popola_mock()
+    with motore.connect() as conn:
+        assert conn.execute(select(func.count(Oggetto.id))).scalar() == 8
+        autori = conn.execute(select(Nota.autore_id)).scalars().all()
+    assert None not in autori
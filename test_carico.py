@@ -0,0 +1,45 @@
+import pytest
+
+import carico
+
+
+def test_mix():
+    assert carico.leggi_mix("login=1, elenco=10,crea") == {
+        "login": 1.0,
+        "elenco": 10.0,
+        "crea": 1.0,
+    }
+    with pytest.raises(ValueError):
+        carico.leggi_mix("elenco=1,cancella=2")
+    with pytest.raises(ValueError):
+        carico.leggi_mix("elenco=0")
+
+
+def test_riepilogo_per_rotta_e_nel_tempo():
+    registro = carico.Registro()
+    registro.richieste = [
+        (0.1, "GET /oggetti/{id}", ms, 200) for ms in range(1, 101)
+    ] + [
+        (1.5, "POST /note", 50.0, 500),
+        (1.6, "POST /note", 60.0, "ReadTimeout"),
+        (1.7, "POST /note", 10.0, 200),
+    ]
+    registro.campioni = [
+        (0.0, 3, {"in_uso": 2, "massimo": 15, "saturazione": 0.133}),
+        (1.0, 9, {"in_uso": 15, "massimo": 15, "saturazione": 1.0}),
+        (1.9, 1, {"errore": "ReadTimeout"}),
+    ]
+    risultato = carico.riepilogo(registro, durata=2, intervallo=1)
+    dettaglio = risultato["rotte"]["GET /oggetti/{id}"]
+    assert (dettaglio["p50"], dettaglio["p95"], dettaglio["p99"]) == (50, 95, 99)
+    assert dettaglio["errori"] == 0 and dettaglio["rps"] == 50
+    note = risultato["rotte"]["POST /note"]
+    assert note["esiti_errore"] == {"500": 1, "ReadTimeout": 1}
+    assert risultato["errori"] == 2
+    primo, secondo = risultato["serie"]
+    assert (primo["rps"], primo["pool_in_uso"], primo["in_volo"]) == (100, 2, 3)
+    assert (secondo["errori"], secondo["saturazione"], secondo["in_volo"]) == (
+        2,
+        1.0,
+        9,
+    )
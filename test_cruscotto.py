@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+import crud
+import cruscotto
+
+
+@pytest.fixture()
+def motore(motore, monkeypatch):
+    monkeypatch.setattr(crud.config, "AUDIT_SINCRONO", True)
+    return motore
+
+
+def test_letture_dalla_memoria_e_ricalcolo_su_modifica(motore):
+    loc_id = crud.add_location("Magazzino", "", "")
+    ogg_id = crud.add_oggetto("Lampada", "", "in_attesa", "oggetto", loc_id)
+    att_id = crud.add_attivita("Pulizia", "")
+
+    istantanea = cruscotto.IstantaneaDashboard(intervallo=3600, attesa_min=0)
+    istantanea.avvia()
+    try:
+        assert istantanea.attendi_aggiornamento(0)
+        query = []
+        event.listen(motore, "before_cursor_execute", lambda *a: query.append(a[2]))
+        # Dieci "sessioni" leggono senza toccare il database
+        for _ in range(10):
+            valore, aggiornato_il = istantanea.leggi("oggetti_piu_movimentati")
+        assert (valore, query) == ([], [])
+        assert aggiornato_il is not None
+
+        # Una scrittura notificata sul bus fa ricalcolare il thread
+        prima = istantanea.aggiornamenti
+        crud.add_oggetto_attivita(ogg_id, att_id, date.today())
+        assert istantanea.attendi_aggiornamento(prima)
+        valore, nuovo = istantanea.leggi("oggetti_piu_movimentati")
+        assert valore == [{"nome": "Lampada", "movimenti": 1}]
+        assert nuovo >= aggiornato_il
+        (urgente,) = istantanea.leggi("attivita_urgenti")[0]
+        assert urgente["giorni_rimanenti"] == 0
+    finally:
+        istantanea.ferma()
+
+
+def test_errore_mantiene_ultimo_valore():
+    valori = iter([[1], RuntimeError("db giù")])
+
+    def sezione():
+        valore = next(valori)
+        if isinstance(valore, Exception):
+            raise valore
+        return valore
+
+    istantanea = cruscotto.IstantaneaDashboard(sezioni={"prova": sezione})
+    assert istantanea.leggi("prova")[0] == [1]
+    istantanea.aggiorna()
+    assert istantanea.leggi("prova")[0] == [1]
+    assert istantanea.errori == 1
+
+
+def test_sezione_in_errore_non_blocca_la_dashboard():
+    def guasta():
+        raise RuntimeError("db giù")
+
+    istantanea = cruscotto.IstantaneaDashboard(
+        sezioni={"attivita_per_utente": guasta, "log_recenti": lambda: []}
+    )
+    assert istantanea.leggi("attivita_per_utente") == (None, None)
+    assert istantanea.leggi("log_recenti")[0] == []
+    df = cruscotto.filtra_attivita_per_utente(None, ["Mario"], ["completate"], "ma")
+    assert df.empty and list(df.columns) == cruscotto.COLONNE_ATTIVITA_UTENTE
+
+    righe = [
+        {"nome": "Mario", "totale_attivita": 2, "completate": 1, "in_corso": 1},
+        {"nome": "Anna", "totale_attivita": 1, "completate": 0, "in_corso": 1},
+    ]
+    df = cruscotto.filtra_attivita_per_utente(righe, ["Mario", "Anna"], ["completate"])
+    assert list(df["nome"]) == ["Mario"]
+    df = cruscotto.filtra_attivita_per_utente(righe, ["Mario", "Anna"], testo="an")
+    assert list(df["nome"]) == ["Anna"]
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import event, func, select, text
+
+import dati_sintetici
+import db
+from db import Base, Oggetto
+
+PICCOLO = {
+    "utenti": 10,
+    "locations": 8,
+    "oggetti_per_location": 40,
+    "profondita": 3,
+    "assegnazioni": 300,
+    "note": 200,
+    "log": 500,
+}
+
+
+def _contenuto(engine):
+    with engine.connect() as conn:
+        return {
+            tabella.name: conn.execute(
+                select(tabella).order_by(*tabella.primary_key.columns)
+            ).all()
+            for tabella in Base.metadata.sorted_tables
+            if tabella.name != "metadati_schema"
+        }
+
+
+def test_deterministico(database_sintetico):
+    uno = _contenuto(database_sintetico(seme=1, **PICCOLO))
+    assert uno == _contenuto(database_sintetico(seme=1, blocco=7, **PICCOLO))
+    assert uno != _contenuto(database_sintetico(seme=2, **PICCOLO))
+
+
+def test_conteggi_integrita_e_annidamento(database_sintetico):
+    engine = database_sintetico(seme=1, **PICCOLO)
+    with engine.connect() as conn:
+        conteggi = {
+            t.name: conn.execute(select(func.count()).select_from(t)).scalar()
+            for t in Base.metadata.sorted_tables
+        }
+        assert conn.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+        profondita = conn.exec_driver_sql(
+            "WITH RECURSIVE livelli(id, livello) AS ("
+            " SELECT id, 1 FROM oggetti"
+            " WHERE tipo = 'contenitore' AND contenitore_id IS NULL"
+            " UNION ALL SELECT o.id, livello + 1 FROM oggetti o"
+            " JOIN livelli ON o.contenitore_id = livelli.id"
+            " WHERE o.tipo = 'contenitore')"
+            " SELECT max(livello) FROM livelli"
+        ).scalar()
+        # Ogni oggetto sta in un contenitore della stessa location
+        fuori_posto = conn.execute(
+            text(
+                "SELECT count(*) FROM oggetti o JOIN oggetti c"
+                " ON o.contenitore_id = c.id WHERE o.location_id != c.location_id"
+            )
+        ).scalar()
+    assert conteggi["utenti"] == 10 and conteggi["locations"] == 8
+    assert conteggi["oggetto_attivita"] == 300 and conteggi["note"] == 200
+    assert conteggi["log_operazioni"] == 500
+    assert 100 < conteggi["oggetti"] < 1000
+    assert profondita == 3 and fuori_posto == 0
+    # Schema completo: indici e versione scritti alla fine del caricamento
+    assert db.versione_schema(engine) == db.SCHEMA_VERSIONE
+    with engine.connect() as conn:
+        indici = conn.exec_driver_sql(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'ix_oggetti_nome'"
+        ).scalar()
+    assert indici == 1
+
+
+def test_engine_restituito_durevole(database_sintetico):
+    engine = database_sintetico(seme=1, **PICCOLO)
+    assert not event.contains(engine, "connect", dati_sintetici._caricamento_veloce)
+    with engine.connect() as conn:
+        # 0 = OFF, usato solo durante il caricamento
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() != 0
+
+
+def test_parametri_sconosciuti(tmp_path):
+    with pytest.raises(ValueError):
+        dati_sintetici.crea_database(str(tmp_path / "x.db"), oggetti=10)
+    with pytest.raises(FileExistsError):
+        (tmp_path / "y.db").touch()
+        dati_sintetici.crea_database(str(tmp_path / "y.db"))
+
+
+def test_contenitori_prima_del_contenuto(database_sintetico):
+    engine = database_sintetico(seme=1, **PICCOLO)
+    with engine.connect() as conn:
+        figli = conn.execute(
+            select(Oggetto.id, Oggetto.contenitore_id).where(
+                Oggetto.contenitore_id.is_not(None)
+            )
+        ).all()
+    assert figli and all(padre < figlio for figlio, padre in figli)
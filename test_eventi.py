@@ -0,0 +1,57 @@
+import asyncio
+
+from eventi import BusEventi
+
+
+def test_sottoscrizione_filtra_per_entita():
+    bus = BusEventi()
+    sott = bus.sottoscrivi(["oggetti"])
+    bus.pubblica("oggetti", "create", 1)
+    bus.pubblica("note", "create", 2)
+    bus.pubblica("utenti", "create", 3)  # non fa parte del feed
+    eventi = bus.preleva(sott)
+    assert [(e["entita"], e["entita_id"]) for e in eventi] == [("oggetti", 1)]
+
+
+def test_resume_da_id():
+    bus = BusEventi(storico_max=10)
+    for i in range(5):
+        bus.pubblica("locations", "update", i)
+    sott = bus.sottoscrivi(dal_id=3)
+    eventi = bus.preleva(sott)
+    assert [e["id"] for e in eventi] == [4, 5]
+
+
+def test_resume_troppo_vecchio_genera_reset():
+    bus = BusEventi(storico_max=2)
+    for i in range(5):
+        bus.pubblica("note", "delete", i)
+    sott = bus.sottoscrivi(dal_id=1)
+    eventi = bus.preleva(sott)
+    assert eventi[0]["azione"] == "reset"
+    assert [e["id"] for e in eventi[1:]] == [4, 5]
+
+
+def test_buffer_limitato_per_client_lento():
+    bus = BusEventi(buffer_client_max=3)
+    sott = bus.sottoscrivi()
+    for i in range(10):
+        bus.pubblica("oggetti", "update", i)
+    eventi = bus.preleva(sott)
+    assert eventi[0]["azione"] == "reset"
+    assert len(eventi) <= 4
+
+
+def test_attendi_riceve_evento_da_altro_thread():
+    async def scenario():
+        bus = BusEventi()
+        sott = bus.sottoscrivi(loop=asyncio.get_running_loop())
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, bus.pubblica, "oggetto_attivita", "create", 7)
+        eventi = await bus.attendi(sott, 2)
+        vuoto = await bus.attendi(sott, 0.05)
+        return eventi, vuoto
+
+    eventi, vuoto = asyncio.run(scenario())
+    assert eventi[0]["entita_id"] == 7
+    assert vuoto == []
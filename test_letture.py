@@ -0,0 +1,135 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event, insert
+
+import crud
+import letture
+from db import Oggetto
+
+
+def test_nomi_collegati_e_accesso_per_attributo(motore):
+    utente_id = crud.add_utente("Anna", "Operatore", "anna@example.com")
+    loc_id = crud.add_location("Magazzino", "", "")
+    scatola = crud.add_oggetto("Scatola", "", "in_attesa", "contenitore", loc_id)
+    lampada = crud.add_oggetto("Lampada", "", "in_attesa", "oggetto", loc_id, scatola)
+    att_id = crud.add_attivita("Pulizia", "")
+    crud.add_nota("Fragile", oggetto_id=lampada, autore_id=utente_id)
+
+    oggetti = letture.oggetti(location_id=loc_id)
+    assert [o.nome for o in oggetti] == ["Lampada", "Scatola"]
+    assert oggetti[0]["contenitore_id"] == scatola
+    assert (oggetti[0].location_nome, oggetti[0].contenitore_nome) == (
+        "Magazzino",
+        "Scatola",
+    )
+    assert oggetti[1].contenitore_nome is None
+    assert [o.nome for o in letture.oggetti(tipo="contenitore")] == ["Scatola"]
+    assert [o.nome for o in letture.oggetti(contenitore_id=scatola)] == ["Lampada"]
+    with pytest.raises(AttributeError):
+        oggetti[0].inesistente
+
+    (nota,) = letture.note(oggetto_id=lampada)
+    assert (nota.oggetto_nome, nota.autore_nome, nota.location_nome) == (
+        "Lampada",
+        "Anna",
+        None,
+    )
+    assert letture.note(attivita_id=att_id) == []
+
+    crud.add_oggetto_attivita(lampada, att_id, date(2024, 7, 1))
+    (ass,) = letture.oggetto_attivita()
+    assert (ass.oggetto_nome, ass.attivita_nome, ass.assegnato_nome) == (
+        "Lampada",
+        "Pulizia",
+        None,
+    )
+
+
+def _tutte_le_pagine(entita, ordina, discendente, filtri=None):
+    pagine, dopo = [], None
+    while True:
+        righe, dopo = letture.pagina(entita, filtri, ordina, discendente, 3, dopo)
+        pagine.append([r["id"] for r in righe])
+        if dopo is None:
+            return pagine
+
+
+def test_paginazione_keyset(motore):
+    loc_id = crud.add_location("Magazzino", "", "")
+    # Nomi ripetuti (spareggio sull'id) e descrizioni in parte NULL
+    ids = [
+        crud.add_oggetto(nome, descr, "in_attesa", "oggetto", loc_id)
+        for nome, descr in [
+            ("B", "x"),
+            ("A", None),
+            ("B", None),
+            ("C", "y"),
+            ("A", "x"),
+            ("B", "z"),
+            ("D", None),
+        ]
+    ]
+    assert letture.conta("oggetti", {"location_id": loc_id}) == 7
+
+    per_nome = sum(_tutte_le_pagine("oggetti", "nome", False), [])
+    atteso = [ids[i] for i in (1, 4, 0, 2, 5, 3, 6)]
+    assert per_nome == atteso
+    assert sum(_tutte_le_pagine("oggetti", "nome", True), []) == atteso[::-1]
+
+    # NULL in fondo in ordine crescente, in cima in decrescente
+    per_descr = sum(_tutte_le_pagine("oggetti", "descrizione", False), [])
+    assert per_descr == [ids[i] for i in (0, 4, 3, 5, 1, 2, 6)]
+    assert sum(_tutte_le_pagine("oggetti", "descrizione", True), []) == (
+        per_descr[::-1]
+    )
+    assert _tutte_le_pagine("oggetti", "id", False, {"contenitore_id": 999}) == [[]]
+
+    with pytest.raises(ValueError):
+        letture.pagina("oggetti", ordina="inesistente")
+
+
+def test_ricerca_per_prefisso(motore):
+    with motore.begin() as conn:
+        conn.execute(
+            insert(Oggetto),
+            [
+                {"nome": nome, "tipo": tipo}
+                for nome, tipo in [
+                    ("Scatola 10%", "contenitore"),
+                    ("scatola blu", "oggetto"),
+                    ("Scatola_A", "contenitore"),
+                    ("ScatolaB", "oggetto"),
+                    ("Sedia", "oggetto"),
+                ]
+            ],
+        )
+    assert [r.nome for r in letture.cerca_per_nome("oggetti", "scat")] == [
+        "Scatola 10%",
+        "scatola blu",
+        "Scatola_A",
+        "ScatolaB",
+    ]
+    # % e _ digitati sono caratteri, non jolly
+    assert [r.nome for r in letture.cerca_per_nome("oggetti", "scatola_")] == [
+        "Scatola_A"
+    ]
+    assert letture.cerca_per_nome("oggetti", "Scatola 1%") == []
+    assert len(letture.cerca_per_nome("oggetti", "", limit=2)) == 2
+    contenitori = letture.cerca_per_nome("oggetti", "S", tipo="contenitore")
+    assert [r.nome for r in contenitori] == ["Scatola 10%", "Scatola_A"]
+    with pytest.raises(ValueError):
+        letture.cerca_per_nome("note", "a")
+
+    # La ricerca legge dall'indice NOCASE, senza scansione né ordinamento
+    query = []
+    event.listen(motore, "before_cursor_execute", lambda *a: query.append(a[2:4]))
+    letture.cerca_per_nome("utenti", "an")
+    with motore.connect() as conn:
+        piano = " ".join(
+            r[3]
+            for r in conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + query[0][0], query[0][1]
+            )
+        )
+    assert "ix_utenti_nome_nocase" in piano and "TEMP B-TREE" not in piano
@@ -0,0 +1,40 @@
+from sqlalchemy import text
+
+import piani
+from db import crea_indici_mancanti
+
+SEMINATO = {
+    "utenti": 20,
+    "locations": 10,
+    "oggetti_per_location": 50,
+    "assegnazioni": 500,
+    "note": 500,
+    "log": 2000,
+}
+
+
+def test_query_calde_usano_gli_indici(database_sintetico):
+    risultati = piani.analizza(database_sintetico(**SEMINATO))
+    assert {r["nome"] for r in risultati} == set(piani.QUERY_CALDE)
+    regressioni = {r["nome"]: r["piano"] for r in risultati if r["regressione"]}
+    assert regressioni == {}
+    per_nome = {r["nome"]: r for r in risultati}
+    assert per_nome["export_oggetti"]["accesso"] == piani.SCANSIONE
+    assert per_nome["log_pagina"]["indici"] == ["ix_log_operazioni_timestamp_id"]
+    assert per_nome["assegnazioni_per_oggetto"]["indici"] == [
+        "ix_oggetto_attivita_oggetto"
+    ]
+
+
+def test_indice_mancante_segnalato(database_sintetico):
+    engine = database_sintetico(seme=2, **SEMINATO)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_note_oggetto_data"))
+    try:
+        [risultato] = piani.analizza(engine, ["note_per_oggetto"])
+        assert risultato["regressione"]
+        assert risultato["accesso"] == piani.SCANSIONE
+    finally:
+        crea_indici_mancanti(engine)
+    [risultato] = piani.analizza(engine, ["note_per_oggetto"])
+    assert not risultato["regressione"]
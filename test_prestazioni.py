@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+import prestazioni
+
+
+@pytest.fixture(autouse=True)
+def storico_vuoto():
+    prestazioni.azzera()
+    yield
+    prestazioni.azzera()
+
+
+def test_misura_query_e_dataframe():
+    eng = create_engine("sqlite://")
+    mostrati = []
+    df = pd.DataFrame({"a": range(10), "b": ["x"] * 10})
+    with eng.connect() as conn:
+        conn.execute(text("SELECT 1"))  # fuori dalla misura
+        with prestazioni.misura("oggetti") as misura:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+            prestazioni.mostra(lambda d, **kw: mostrati.append((d, kw)), df, x=1)
+    assert misura.query == 3 and misura.sql_ms > 0
+    assert mostrati == [(df, {"x": 1})]
+    [(_, righe, colonne, byte)] = misura.dataframe
+    assert (righe, colonne) == (10, 2) and byte > 0
+    assert misura.totale_ms >= misura.sql_ms + misura.rendering_ms
+    assert prestazioni.storico("oggetti") == [misura]
+    # Senza misura in corso mostra() si limita a chiamare la funzione
+    prestazioni.mostra(lambda d: mostrati.append(d), df)
+    assert len(misura.dataframe) == 1 and len(mostrati) == 2
+
+
+def test_render_interrotto_non_registrato(monkeypatch):
+    monkeypatch.setattr(prestazioni.config, "PRESTAZIONI_STORICO", 2)
+    with pytest.raises(RuntimeError):
+        with prestazioni.misura("note"):
+            raise RuntimeError("rerun")
+    assert prestazioni.corrente() is None
+    assert prestazioni.storico("note") == []
+    for _ in range(3):
+        with prestazioni.misura("note"):
+            pass
+    [riga] = prestazioni.riepilogo()
+    assert riga["pagina"] == "note" and riga["render"] == 2
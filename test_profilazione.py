@@ -0,0 +1,74 @@
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import api
+import profilazione
+from db import Base, Utente
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    eng = create_engine(f"sqlite:///{tmp_path / 'profili.db'}")
+    Base.metadata.create_all(eng)
+    Session = sessionmaker(bind=eng)
+    with Session() as s:
+        s.add_all(
+            [
+                Utente(nome="Admin", email="admin@x.it", ruolo="Coordinatore"),
+                Utente(nome="Op", email="op@x.it", ruolo="Operatore"),
+            ]
+        )
+        s.commit()
+    monkeypatch.setattr(api, "get_session", Session)
+    monkeypatch.setattr(
+        profilazione, "archivio", profilazione.ArchivioProfili(tmp_path / "p", 2)
+    )
+    monkeypatch.setattr(api.config, "PROFILAZIONE_ATTIVA", False)
+    return TestClient(api.app)
+
+
+def _intestazioni(email, ruolo, profila=False):
+    token = api.create_access_token({"sub": email, "ruolo": ruolo})
+    intestazioni = {"Authorization": f"Bearer {token}"}
+    if profila:
+        intestazioni["X-Profila"] = "1"
+    return intestazioni
+
+
+def test_profilo_richiesto_da_admin(client, tmp_path):
+    admin = _intestazioni("admin@x.it", "Coordinatore")
+    risposta = client.get("/me", headers=_intestazioni("op@x.it", "Operatore", True))
+    assert risposta.status_code == 200 and "X-Profilo" not in risposta.headers
+
+    risposta = client.get(
+        "/me", headers=_intestazioni("admin@x.it", "Coordinatore", True)
+    )
+    id_profilo = risposta.headers["X-Profilo"]
+    [voce] = client.get("/profili", headers=admin).json()
+    assert voce["id"] == id_profilo and voce["percorso"] == "/me"
+    assert voce["motivo"] == "richiesta" and voce["stato"] == 200
+
+    scaricato = tmp_path / "scaricato.prof"
+    scaricato.write_bytes(client.get(f"/profili/{id_profilo}", headers=admin).content)
+    funzioni = {f[2] for f in pstats.Stats(str(scaricato)).stats}
+    assert "read_users_me" in funzioni
+    testo = client.get(f"/profili/{id_profilo}?formato=testo", headers=admin).text
+    assert "read_users_me" in testo
+    assert client.get("/profili/..%2Fsegreto", headers=admin).status_code == 404
+
+
+def test_soglia_e_anello_limitato(client, monkeypatch):
+    admin = _intestazioni("admin@x.it", "Coordinatore")
+    monkeypatch.setattr(api.config, "PROFILAZIONE_ATTIVA", True)
+    monkeypatch.setattr(api.config, "PROFILAZIONE_SOGLIA_MS", 60_000)
+    assert "X-Profilo" not in client.get("/me", headers=admin).headers
+    assert profilazione.archivio.elenco() == []
+
+    monkeypatch.setattr(api.config, "PROFILAZIONE_SOGLIA_MS", 0)
+    salvati = [client.get("/me", headers=admin).headers["X-Profilo"] for _ in range(3)]
+    assert [v["id"] for v in profilazione.archivio.elenco()] == salvati[:0:-1]
+    assert profilazione.archivio.file(salvati[0]) is None
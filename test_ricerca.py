@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine, insert, update, delete
+
+from db import Base, Oggetto, Nota, Location
+from ricerca import inizializza_ricerca, cerca
+
+
+@pytest.fixture()
+def motore(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'ricerca.db'}")
+    Base.metadata.create_all(eng)
+    with eng.begin() as conn:
+        conn.execute(
+            insert(Location), [{"nome": "Cantina Sud", "indirizzo": "Via Napoli 5"}]
+        )
+    # Le righe esistenti vengono indicizzate alla creazione
+    inizializza_ricerca(eng)
+    with eng.begin() as conn:
+        conn.execute(
+            insert(Oggetto),
+            [
+                {
+                    "nome": "Lampada da Tavolo",
+                    "descrizione": "Lampada vintage in ottone",
+                },
+                {"nome": "Specchio", "descrizione": "Cornice in ottone dorato"},
+                {"nome": "Poltrona", "descrizione": "Pelle marrone"},
+            ],
+        )
+        conn.execute(insert(Nota), [{"testo": "Cantina umida, attenzione alla muffa"}])
+    return eng
+
+
+def test_ricerca_ordinata_per_rilevanza(motore):
+    risultato = cerca("lampada ottone", bind=motore)
+    assert risultato["totale"] == 1
+    assert risultato["risultati"][0]["titolo"] == "Lampada da Tavolo"
+
+    risultato = cerca("ottone", bind=motore)
+    assert risultato["totale"] == 2
+    # Il titolo pesa più della descrizione: "Lampada" compare due volte
+    assert [r["entita"] for r in risultato["risultati"]] == ["oggetti", "oggetti"]
+
+
+def test_ricerca_filtri_e_paginazione(motore):
+    assert cerca("cantina", bind=motore)["totale"] == 2
+    solo_note = cerca("cantina", entita=["note"], bind=motore)
+    assert [r["entita"] for r in solo_note["risultati"]] == ["note"]
+    pagina = cerca("cantina", limit=1, offset=1, bind=motore)
+    assert pagina["totale"] == 2 and len(pagina["risultati"]) == 1
+    assert cerca("   ", bind=motore) == {"totale": 0, "risultati": []}
+
+
+def test_indice_segue_update_e_delete(motore):
+    with motore.begin() as conn:
+        conn.execute(
+            update(Oggetto)
+            .where(Oggetto.nome == "Poltrona")
+            .values(descrizione="Velluto")
+        )
+    assert cerca("marrone", bind=motore)["totale"] == 0
+    assert cerca("velluto", bind=motore)["totale"] == 1
+    with motore.begin() as conn:
+        conn.execute(delete(Oggetto).where(Oggetto.nome == "Poltrona"))
+    assert cerca("velluto", bind=motore)["totale"] == 0
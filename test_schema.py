@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine, event, inspect
+
+import db
+
+
+def test_bootstrap_una_volta_per_versione(tmp_path, monkeypatch):
+    eng = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    popolamenti = []
+    assert db.versione_schema(eng) is None
+
+    assert db.bootstrap_schema(popola=lambda: popolamenti.append(1), bind=eng)
+    assert db.versione_schema(eng) == db.SCHEMA_VERSIONE
+    assert "ix_oggetti_nome" in {i["name"] for i in inspect(eng).get_indexes("oggetti")}
+    assert popolamenti == [1]
+
+    # Schema aggiornato: una sola query e nessun popolamento
+    query = []
+    event.listen(eng, "before_cursor_execute", lambda *a: query.append(a[2]))
+    assert not db.bootstrap_schema(popola=lambda: popolamenti.append(2), bind=eng)
+    assert len(query) == 1
+    assert popolamenti == [1]
+
+    # Nuova versione: lo schema viene riapplicato ma i dati non si toccano
+    monkeypatch.setattr(db, "SCHEMA_VERSIONE", db.SCHEMA_VERSIONE + 1)
+    assert db.bootstrap_schema(popola=lambda: popolamenti.append(3), bind=eng)
+    assert db.versione_schema(eng) == db.SCHEMA_VERSIONE
+    assert popolamenti == [1]
@@ -0,0 +1,44 @@
+from datetime import date
+
+from sqlalchemy import event
+
+import crud
+import statistiche
+
+
+def test_conteggi_dashboard_in_una_query(motore):
+    crud.add_utente("Anna", "Operatore", "anna@example.com")
+    loc_id = crud.add_location("Magazzino", "", "")
+    ogg_id = crud.add_oggetto("Lampada", "", "in_attesa", "oggetto", loc_id)
+    crud.add_oggetto("Baule", "", "in_attesa", "contenitore", loc_id)
+    att_id = crud.add_attivita("Pulizia", "")
+    crud.add_oggetto_attivita(ogg_id, att_id, date(2024, 7, 1))
+    fatta = crud.add_oggetto_attivita(ogg_id, att_id, date(2024, 6, 1))
+    crud.update_oggetto_attivita(fatta, completata=True)
+
+    query = []
+    event.listen(motore, "before_cursor_execute", lambda *a: query.append(a[2]))
+    assert statistiche.conteggi_dashboard() == {
+        "utenti": 1,
+        "locations": 1,
+        "oggetti": 2,
+        "attivita_pendenti": 1,
+    }
+    assert len(query) == 1
+
+
+def test_andamento_mensile_raggruppa_per_mese(motore):
+    loc_id = crud.add_location("Magazzino", "", "")
+    att_id = crud.add_attivita("Pulizia", "")
+    oggi = date.today()
+    inizio_mese = oggi.replace(day=1)
+    ogg_id = crud.add_oggetto("Lampada", "", "in_attesa", "oggetto", loc_id)
+    for giorno in (inizio_mese, oggi):
+        oa = crud.add_oggetto_attivita(ogg_id, att_id, giorno)
+        crud.update_oggetto_attivita(oa, completata=True, data_completamento=giorno)
+    crud.add_oggetto_attivita(ogg_id, att_id, oggi)
+
+    andamento = statistiche.andamento_mensile(12)
+    mese = oggi.strftime("%Y-%m")
+    assert andamento["rilevamenti"] == [{"mese": mese, "count": 1}]
+    assert andamento["completamenti"] == [{"mese": mese, "count": 2}]
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import func, select
+
+import crud
+from db import Location, Oggetto
+from eventi import bus
+
+
+def _conta(motore, modello):
+    with motore.connect() as conn:
+        return conn.execute(select(func.count(modello.id))).scalar()
+
+
+def test_commit_unico_ed_eventi_dopo_il_commit(motore):
+    sott = bus.sottoscrivi(entita=["locations", "oggetti"])
+    try:
+        with crud.unit_of_work():
+            loc_id = crud.add_location("Magazzino", "Via Roma 1", "")
+            ids = [
+                crud.add_oggetto(f"Scatola {i}", "", "da_rimuovere", "oggetto", loc_id)
+                for i in range(5)
+            ]
+            crud.update_oggetto(ids[0], nome="Scatola grande")
+            # Niente è ancora visibile fuori dalla transazione
+            assert _conta(motore, Oggetto) == 0
+            assert bus.preleva(sott) == []
+        assert _conta(motore, Oggetto) == 5
+        assert len(bus.preleva(sott)) == 7
+    finally:
+        bus.annulla(sott)
+
+
+def test_rollback_su_errore(motore):
+    with pytest.raises(RuntimeError):
+        with crud.unit_of_work():
+            crud.add_location("Temporanea", "", "")
+            raise RuntimeError("interrotto")
+    assert _conta(motore, Location) == 0
+
+    # Fuori dall'unità ogni chiamata fa il proprio commit
+    loc_id = crud.add_location("Definitiva", "", "")
+    assert loc_id is not None and _conta(motore, Location) == 1